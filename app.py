@@ -1,61 +1,211 @@
-from flask import Flask, render_template, request, redirect, session, flash, url_for
+from flask import Flask, render_template, request, redirect, session, flash, url_for, g, has_app_context, jsonify, Response, stream_with_context
+from flask.signals import before_render_template, template_rendered
 import sqlite3
-from datetime import datetime, date
+import threading
+import time
+import queue
+import random
+import heapq
+import atexit
+import collections
+import csv
+import io
+import json
+import click
+import hashlib
+import hmac
+import math
+import base64
+import gzip
+import shlex
+import shutil
+import subprocess
+from datetime import datetime, date, timedelta, timezone
 from functools import wraps
+from markupsafe import Markup
 import os
 
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+except ImportError:  # only needed for STORAGE_BACKEND = "postgres"
+    psycopg = None
+
+try:
+    import brotli
+except ImportError:  # optional; responses are gzip-compressed without it
+    brotli = None
+
 app = Flask(__name__)
-app.secret_key = "hotel_secret_key_2024_secure"
 
-# Database file path
-DATABASE = "hotel.db"
 
+class Config:
+    """Default settings; HOTEL_<NAME> environment variables override them"""
+    DATABASE = "hotel.db"
+    SECRET_KEY = "hotel_secret_key_2024_secure"  # development only
+    STORAGE_BACKEND = "sqlite"   # or "postgres" to share one database between nodes
+    POSTGRES_DSN = ""            # e.g. postgresql://hotel@db.internal/hotel
+    POSTGRES_POOL_SIZE = 10      # connections per worker process
+    COMPRESS_RESPONSES = True    # gzip/brotli here; turn off behind a compressing proxy
+    LOG_RETENTION_DAYS = 90      # activity log days kept in the database
+    LOG_ARCHIVE_DIR = ""         # default: log_archive/ next to DATABASE
+    LOG_ARCHIVE_INTERVAL = 0     # seconds between archiving runs; 0 = CLI only
+    BACKUP_DIR = ""              # default: backups/ next to DATABASE
+    BACKUP_INTERVAL = 0          # seconds between snapshots; 0 = CLI only
+    BACKUP_STEP_PAUSE = 0        # seconds between backup steps, to throttle I/O
+    BACKUP_KEEP_LAST = 24        # newest snapshots always kept
+    BACKUP_KEEP_DAILY = 14       # ...plus the newest of each of this many UTC days
 
-def get_db():
-    """Get database connection"""
+
+class ProductionConfig(Config):
+    """Settings for wsgi.py; the secret key must come from HOTEL_SECRET_KEY"""
+    SECRET_KEY = None
+
+
+# Database file path, taken from the DATABASE setting by configure()
+DATABASE = Config.DATABASE
+
+
+def configure(config=Config):
+    """Load config (an object or import path) and HOTEL_* overrides into app"""
+    global DATABASE
+    app.config.from_object(config)
+    app.config.from_prefixed_env("HOTEL")
+    DATABASE = app.config["DATABASE"]
+
+
+configure()
+
+# Connection pool settings
+DB_POOL_SIZE = 4                      # idle connections kept per worker thread
+DB_BUSY_TIMEOUT_MS = 5000             # wait this long on a locked database
+DB_MMAP_SIZE = 64 * 1024 * 1024       # bytes of the file to memory-map
+
+_pool = threading.local()
+
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection that is handed back to the pool instead of closed.
+
+    While a connection is checked out for an app context, close() is a
+    no-op; the connection is released in teardown_appcontext.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pooled = False
+        self.data_version_seen = None  # (PRAGMA data_version, data_version row) at the last read
+        self.bumped_version = None     # data version written by the open transaction
+
+    def close(self):
+        if not self.pooled:
+            super().close()
+
+    def commit(self):
+        super().commit()
+        if self.bumped_version is not None:
+            events.committed_locally(self.bumped_version)
+            self.bumped_version = None
+
+    def rollback(self):
+        super().rollback()
+        self.bumped_version = None
+
+    def execute(self, sql, parameters=()):
+        if not PROFILE_REQUESTS:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, parameters):
+        if not PROFILE_REQUESTS:
+            return super().executemany(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+
+def _connect():
+    """Open a new connection with the connection-time PRAGMAs applied"""
+    conn = sqlite3.connect(
+        DATABASE, timeout=DB_BUSY_TIMEOUT_MS / 1000, factory=PooledConnection
+    )
+    conn.row_factory = sqlite3.Row
     try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        # Test connection
-        conn.execute("SELECT 1")
-        return conn
+        # journal_mode reads the database header, so a damaged file fails
+        # here. The error propagates; the file is never deleted.
+        conn.execute("PRAGMA journal_mode = WAL")
     except sqlite3.DatabaseError:
-        # Database is corrupted, recreate it
-        if os.path.exists(DATABASE):
-            os.remove(DATABASE)
-        init_db()
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        return conn
+        conn.close()
+        raise
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    return conn
 
 
-def init_db():
-    """Initialize database with required tables"""
-    conn = None
-    try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Test if database is valid by trying to query
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        cursor.fetchall()
-    except (sqlite3.DatabaseError, sqlite3.OperationalError):
-        # Database is corrupted, delete and recreate
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
-        if os.path.exists(DATABASE):
-            try:
-                os.remove(DATABASE)
-            except:
-                pass
-        conn = get_db()
-        cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute("""
+def _idle_connections():
+    """Idle connections for the current thread, reset if DATABASE changed"""
+    if getattr(_pool, "database", None) != DATABASE:
+        for conn in getattr(_pool, "idle", []):
+            conn.pooled = False
+            conn.close()
+        _pool.database = DATABASE
+        _pool.idle = []
+    return _pool.idle
+
+
+def get_db():
+    """Get database connection
+
+    Inside an app context the same connection is returned for the whole
+    request and released to the thread's pool on teardown. Outside one
+    (startup, CLI) a fresh connection is returned and the caller closes it.
+    """
+    if not has_app_context():
+        return _connect()
+
+    conn = g.get("_db")
+    if conn is None:
+        idle = _idle_connections()
+        conn = idle.pop() if idle else _connect()
+        conn.pooled = True
+        g._db = conn
+    return conn
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    """Return the request's connection to the pool"""
+    conn = g.pop("_db", None)
+    if conn is None:
+        return
+    if conn.in_transaction:
+        conn.rollback()
+    idle = _idle_connections()
+    if len(idle) < DB_POOL_SIZE:
+        idle.append(conn)
+    else:
+        conn.pooled = False
+        conn.close()
+
+
+# Schema migrations. Each step brings the schema from version N-1 to N and
+# is recorded in PRAGMA user_version. Steps are written to be idempotent,
+# so databases created before versioning (user_version 0) upgrade cleanly.
+MIGRATION_BACKUP_DIR = os.environ.get("MIGRATION_BACKUP_DIR", "")  # default: next to DATABASE
+
+
+def _migrate_base_tables(conn):
+    """Users, rooms, bookings and activity logs, plus the seed data"""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
@@ -63,9 +213,7 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    
-    # Rooms table
-    cursor.execute("""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS rooms (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             room_number TEXT UNIQUE NOT NULL,
@@ -73,9 +221,7 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    
-    # Bookings table
-    cursor.execute("""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS bookings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             guest_name TEXT NOT NULL,
@@ -87,9 +233,7 @@ def init_db():
             FOREIGN KEY (room_id) REFERENCES rooms(id)
         )
     """)
-    
-    # Activity logs table
-    cursor.execute("""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS activity_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             action TEXT NOT NULL,
@@ -99,403 +243,3320 @@ def init_db():
         )
     """)
     
-    # Create default admin user if not exists
-    try:
-        cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute(
-                "INSERT INTO users (username, password) VALUES (?, ?)",
-                ("admin", "admin123")
-            )
-            # Log activity after tables are created
-            cursor.execute("""
-                INSERT INTO activity_logs (action, details, user) 
-                VALUES (?, ?, ?)
-            """, ("System", "Default admin user created", "System"))
-    except sqlite3.OperationalError:
-        pass  # Table might not exist yet, will be created on next run
-    
-    # Create sample rooms if database is empty
-    try:
-        cursor.execute("SELECT COUNT(*) FROM rooms")
-        if cursor.fetchone()[0] == 0:
-            sample_rooms = [
-                ("101", "Available"),
-                ("102", "Available"),
-                ("103", "Available"),
-                ("201", "Available"),
-                ("202", "Available"),
-                ("301", "Available"),
-                ("302", "Available"),
-                ("401", "Available"),
-            ]
-            for room_num, status in sample_rooms:
-                cursor.execute(
-                    "INSERT INTO rooms (room_number, status) VALUES (?, ?)",
-                    (room_num, status)
-                )
-            # Log activity after tables are created
-            cursor.execute("""
-                INSERT INTO activity_logs (action, details, user) 
-                VALUES (?, ?, ?)
-            """, ("System", "Sample rooms initialized", "System"))
-    except sqlite3.OperationalError:
-        pass  # Table might not exist yet, will be created on next run
+    # Default admin user
+    if conn.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'").fetchone()[0] == 0:
+        conn.execute(
+            "INSERT INTO users (username, password) VALUES (?, ?)",
+            ("admin", hash_password("admin123"))
+        )
+        conn.execute("""
+            INSERT INTO activity_logs (action, details, user) 
+            VALUES (?, ?, ?)
+        """, ("System", "Default admin user created", "System"))
     
-    conn.commit()
-    conn.close()
+    # Sample rooms for an empty database
+    if conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0] == 0:
+        conn.executemany(
+            "INSERT INTO rooms (room_number, status) VALUES (?, 'Available')",
+            [(n,) for n in ("101", "102", "103", "201", "202", "301", "302", "401")]
+        )
+        conn.execute("""
+            INSERT INTO activity_logs (action, details, user) 
+            VALUES (?, ?, ?)
+        """, ("System", "Sample rooms initialized", "System"))
 
 
-def log_activity(user, action, details=""):
-    """Log activity to database"""
-    try:
-        conn = get_db()
-        conn.execute(
-            "INSERT INTO activity_logs (action, details, user) VALUES (?, ?, ?)",
-            (action, details, user)
+def _migrate_indexes(conn):
+    """Booking overlap and activity log paging indexes"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_bookings_room_status_dates
+        ON bookings (room_id, status, check_in, check_out)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_activity_logs_timestamp
+        ON activity_logs (timestamp, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_activity_logs_user
+        ON activity_logs (user, timestamp, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_activity_logs_action
+        ON activity_logs (action, timestamp, id)
+    """)
+
+
+def _migrate_data_version(conn):
+    """Single-row counter bumped by every booking state change"""
+    # API ETags are derived from it
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
         )
-        conn.commit()
-        conn.close()
-    except sqlite3.OperationalError:
-        # Table might not exist yet, skip logging
-        pass
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
 
 
-def login_required(f):
-    """Decorator to protect routes requiring authentication"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if "user" not in session:
-            return redirect(url_for("login"))
-        return f(*args, **kwargs)
-    return decorated_function
+def _migrate_rates(conn):
+    """Room types, the rate calendar and the nightly occupancy rollup"""
+    room_columns = {row[1] for row in conn.execute("PRAGMA table_info(rooms)")}
+    if "room_type" not in room_columns:
+        conn.execute("ALTER TABLE rooms ADD COLUMN room_type TEXT NOT NULL DEFAULT 'Standard'")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rates (
+            room_type TEXT NOT NULL,
+            date DATE NOT NULL,
+            rate REAL NOT NULL,
+            PRIMARY KEY (room_type, date)
+        ) WITHOUT ROWID
+    """)
+    backfill_nights = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'booking_nights'"
+    ).fetchone() is None
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS booking_nights (
+            booking_id INTEGER NOT NULL REFERENCES bookings(id),
+            night DATE NOT NULL,
+            rate REAL NOT NULL,
+            PRIMARY KEY (booking_id, night)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            date DATE PRIMARY KEY,
+            rooms_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            arrivals INTEGER NOT NULL DEFAULT 0,
+            departures INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    if backfill_nights:
+        rebuild_daily_stats(conn, backfill=True)
 
 
-@app.route("/", methods=["GET", "POST"])
-def login():
-    """Handle user login"""
-    if "user" in session:
-        return redirect(url_for("dashboard"))
-    
-    if request.method == "POST":
-        username = request.form.get("username", "").strip()
-        password = request.form.get("password", "").strip()
-        
-        if not username or not password:
-            flash("Please enter both username and password", "error")
-            return render_template("login.html")
-        
-        conn = get_db()
-        user = conn.execute(
-            "SELECT * FROM users WHERE username = ? AND password = ?",
-            (username, password)
-        ).fetchone()
-        conn.close()
-        
-        if user:
-            session["user"] = username
-            log_activity(username, "Login", f"User {username} logged in")
-            flash("Login successful!", "success")
-            return redirect(url_for("dashboard"))
-        else:
-            flash("Invalid username or password", "error")
-    
-    return render_template("login.html")
+def _migrate_room_state(conn):
+    """Current status of each room, derived from bookings"""
+    # Filled by refresh_room_state; rooms.status is legacy and no longer written
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS room_state (
+            room_id INTEGER PRIMARY KEY REFERENCES rooms(id),
+            status TEXT NOT NULL,
+            booking_id INTEGER,
+            booking_status TEXT,
+            guest_name TEXT,
+            check_in DATE,
+            check_out DATE,
+            as_of DATE NOT NULL
+        )
+    """)
+    # Filled by reconcile_room_state() once every step has run
 
 
-@app.route("/logout")
-@login_required
-def logout():
-    """Handle user logout"""
-    username = session.get("user", "Unknown")
-    session.clear()
-    log_activity(username, "Logout", f"User {username} logged out")
-    flash("You have been logged out", "info")
-    return redirect(url_for("login"))
+def _migrate_password_hashes(conn):
+    """Hash any passwords still stored in plain text"""
+    for user_id, password in conn.execute("SELECT id, password FROM users").fetchall():
+        if not is_password_hash(password):
+            conn.execute("UPDATE users SET password = ? WHERE id = ?", (hash_password(password), user_id))
 
 
-@app.route("/dashboard")
-@login_required
-def dashboard():
-    """Admin dashboard with statistics"""
-    conn = get_db()
-    
-    # Get room statistics
-    total_rooms = conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
-    available_rooms = conn.execute(
-        "SELECT COUNT(*) FROM rooms WHERE status = 'Available'"
-    ).fetchone()[0]
-    booked_rooms = conn.execute(
-        "SELECT COUNT(*) FROM rooms WHERE status = 'Booked'"
-    ).fetchone()[0]
-    occupied_rooms = conn.execute(
-        "SELECT COUNT(*) FROM rooms WHERE status = 'Occupied'"
-    ).fetchone()[0]
-    
-    # Get active bookings
-    today = date.today().isoformat()
-    active_bookings = conn.execute("""
-        SELECT b.*, r.room_number 
-        FROM bookings b
-        JOIN rooms r ON b.room_id = r.id
-        WHERE b.status IN ('Booked', 'Checked In')
-        ORDER BY b.check_in ASC
-    """).fetchall()
-    
-    # Get all rooms with their current booking status
-    rooms = conn.execute("""
-        SELECT r.*, 
-               b.guest_name, 
-               b.check_in, 
-               b.check_out,
-               b.status as booking_status
-        FROM rooms r
-        LEFT JOIN bookings b ON r.id = b.room_id 
-            AND b.status IN ('Booked', 'Checked In')
-            AND date('now') BETWEEN b.check_in AND b.check_out
-        ORDER BY r.room_number
-    """).fetchall()
-    
-    # Get recent activity logs
-    recent_logs = conn.execute("""
-        SELECT * FROM activity_logs 
-        ORDER BY timestamp DESC 
-        LIMIT 10
-    """).fetchall()
-    
-    conn.close()
-    
-    return render_template(
-        "dashboard.html",
-        total_rooms=total_rooms,
-        available_rooms=available_rooms,
-        booked_rooms=booked_rooms,
-        occupied_rooms=occupied_rooms,
-        active_bookings=active_bookings,
-        rooms=rooms,
-        recent_logs=recent_logs
-    )
+def _migrate_housekeeping(conn):
+    """Housekeepers and the room turnover tasks opened by check-out"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS housekeepers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            last_assigned_at TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS housekeeping_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_id INTEGER NOT NULL REFERENCES rooms(id),
+            booking_id INTEGER REFERENCES bookings(id),
+            status TEXT NOT NULL DEFAULT 'Dirty',
+            housekeeper_id INTEGER REFERENCES housekeepers(id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            assigned_at TIMESTAMP,
+            inspected_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    """)
+    # Partial indexes cover only open tasks, so finished history doesn't
+    # slow the board or the scheduler. Queries must repeat the predicate.
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_housekeeping_open_room
+        ON housekeeping_tasks (room_id) WHERE status != 'Available'
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_housekeeping_open_status
+        ON housekeeping_tasks (status, housekeeper_id) WHERE status != 'Available'
+    """)
 
 
-@app.route("/rooms")
-@login_required
-def rooms():
-    """Display all rooms"""
-    conn = get_db()
-    rooms = conn.execute("""
-        SELECT r.*, 
-               b.guest_name, 
-               b.check_in, 
-               b.check_out,
-               b.status as booking_status
-        FROM rooms r
-        LEFT JOIN bookings b ON r.id = b.room_id 
-            AND b.status IN ('Booked', 'Checked In')
-            AND date('now') BETWEEN b.check_in AND b.check_out
-        ORDER BY r.room_number
-    """).fetchall()
-    conn.close()
-    return render_template("rooms.html", rooms=rooms)
+def _migrate_room_types(conn):
+    """Room types with guest capacity, and nightly rooms sold per type"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS room_types (
+            name TEXT PRIMARY KEY,
+            capacity INTEGER NOT NULL DEFAULT 2,
+            description TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO room_types (name) VALUES ('Standard')")
+    conn.execute("INSERT OR IGNORE INTO room_types (name) SELECT DISTINCT room_type FROM rooms")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_rooms_type ON rooms (room_type, room_number)")
+    # The availability search reads one row per type and night from here
+    # instead of expanding every overlapping booking
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS room_type_nights (
+            room_type TEXT NOT NULL,
+            night DATE NOT NULL,
+            rooms_sold INTEGER NOT NULL,
+            PRIMARY KEY (room_type, night)
+        ) WITHOUT ROWID
+    """)
+    rebuild_room_type_nights(conn)
 
 
-@app.route("/book", methods=["GET", "POST"])
-@login_required
-def book():
-    """Handle room booking"""
+def _migrate_stay_days(conn):
+    """Days guests actually checked in and out, for rebuild_daily_stats()"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+    for column in ("checked_in_on", "checked_out_on"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE bookings ADD COLUMN {column} DATE")
+    # Earlier rows only have the booked dates, and a cancelled reservation
+    # can't be told from a completed stay; both count as stays
+    record_stay_days(conn, "checked_in_on IS NULL AND checked_out_on IS NULL")
+    rebuild_stay_counts(conn)
+
+
+# Append new steps at the end; never reorder or edit a released one
+MIGRATIONS = [
+    _migrate_base_tables,
+    _migrate_indexes,
+    _migrate_data_version,
+    _migrate_rates,
+    _migrate_room_state,
+    _migrate_password_hashes,
+    _migrate_housekeeping,
+    _migrate_room_types,
+    _migrate_stay_days,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def backup_database(conn, path):
+    """Copy the live database to path with the online backup API"""
+    dest = sqlite3.connect(path)
     try:
-        conn = get_db()
-    except Exception as e:
-        flash(f"Database error: {str(e)}", "error")
-        return redirect(url_for("dashboard"))
+        conn.backup(dest)
+    finally:
+        dest.close()
+    return path
+
+
+def migrate_db(conn):
+    """Apply pending migrations in one transaction; returns (old, new) version
+
+    A database that already has tables is backed up first. Once the schema
+    is current this is a single PRAGMA read, whatever the database size.
+    """
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {current} is newer than this application ({SCHEMA_VERSION})"
+        )
+    if current == SCHEMA_VERSION:
+        return current, current
     
-    if request.method == "POST":
-        guest_name = request.form.get("guest_name", "").strip()
-        room_id = request.form.get("room_id")
-        check_in = request.form.get("check_in")
-        check_out = request.form.get("check_out")
-        
-        # Validation
-        if not all([guest_name, room_id, check_in, check_out]):
-            flash("Please fill in all fields", "error")
-            rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-            if rooms is None:
-                rooms = []
-            has_available = any(room["status"] == "Available" for room in rooms)
-            today = date.today().isoformat()
-            conn.close()
-            return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-        
-        # Check if dates are valid
-        try:
-            check_in_date = datetime.strptime(check_in, "%Y-%m-%d").date()
-            check_out_date = datetime.strptime(check_out, "%Y-%m-%d").date()
-            today = date.today()
-            
-            if check_in_date < today:
-                flash("Check-in date cannot be in the past", "error")
-                rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-                if rooms is None:
-                    rooms = []
-                has_available = any(room["status"] == "Available" for room in rooms)
-                today = date.today().isoformat()
-                conn.close()
-                return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-            
-            if check_out_date <= check_in_date:
-                flash("Check-out date must be after check-in date", "error")
-                rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-                if rooms is None:
-                    rooms = []
-                has_available = any(room["status"] == "Available" for room in rooms)
-                today = date.today().isoformat()
-                conn.close()
-                return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-        except ValueError:
-            flash("Invalid date format", "error")
-            rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-            if rooms is None:
-                rooms = []
-            has_available = any(room["status"] == "Available" for room in rooms)
-            today = date.today().isoformat()
-            conn.close()
-            return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-        
-        # Check for booking conflicts
-        conflict = conn.execute("""
-            SELECT * FROM bookings 
-            WHERE room_id = ? 
-            AND status IN ('Booked', 'Checked In')
-            AND (
-                (check_in <= ? AND check_out >= ?) OR
-                (check_in <= ? AND check_out >= ?) OR
-                (check_in >= ? AND check_out <= ?)
-            )
-        """, (room_id, check_in, check_in, check_out, check_out, check_in, check_out)).fetchone()
-        
-        if conflict:
-            room = conn.execute("SELECT room_number FROM rooms WHERE id = ?", (room_id,)).fetchone()
-            flash(f"Room {room['room_number']} is already booked for the selected dates", "error")
-            rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-            if rooms is None:
-                rooms = []
-            has_available = any(room["status"] == "Available" for room in rooms)
-            today = date.today().isoformat()
-            conn.close()
-            return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-        
-        # Check if room is available
-        room = conn.execute("SELECT * FROM rooms WHERE id = ?", (room_id,)).fetchone()
-        if room["status"] not in ["Available"]:
-            flash(f"Room {room['room_number']} is not available", "error")
-            rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-            if rooms is None:
-                rooms = []
-            has_available = any(room["status"] == "Available" for room in rooms)
-            today = date.today().isoformat()
-            conn.close()
-            return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-        
-        # Create booking
-        conn.execute("""
-            INSERT INTO bookings (guest_name, room_id, check_in, check_out, status)
-            VALUES (?, ?, ?, ?, ?)
-        """, (guest_name, room_id, check_in, check_out, "Booked"))
-        
-        # Update room status
-        conn.execute("UPDATE rooms SET status = 'Booked' WHERE id = ?", (room_id,))
-        
-        conn.commit()
-        username = session.get("user", "Unknown")
-        log_activity(username, "Booking Created", 
-                    f"Room {room['room_number']} booked for {guest_name} ({check_in} to {check_out})")
-        conn.close()
-        
-        flash(f"Room {room['room_number']} booked successfully for {guest_name}!", "success")
-        return redirect(url_for("dashboard"))
+    has_tables = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' LIMIT 1"
+    ).fetchone() is not None
+    if has_tables:
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        directory = MIGRATION_BACKUP_DIR or os.path.dirname(os.path.abspath(DATABASE))
+        name = f"{os.path.basename(DATABASE)}.v{current}-{stamp}.bak"
+        backup_database(conn, os.path.join(directory, name))
+    else:
+        # Lets incremental_vacuum() release the space freed by log archiving.
+        # The header is already written in WAL mode, so the setting needs a
+        # VACUUM to apply; on an empty file that is instant.
+        enable_incremental_vacuum(conn)
     
-    # GET request - show booking form
+    def txn(conn):
+        # Re-read inside the write lock in case another process migrated first
+        start = get_schema_version(conn)
+        for step in MIGRATIONS[start:]:
+            step(conn)
+        # user_version lives in the database header, so it commits atomically
+        # with the schema changes
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return start
+    
+    start = run_transaction(conn, txn)
+    app.logger.info("Migrated database schema from version %d to %d", start, SCHEMA_VERSION)
+    return start, SCHEMA_VERSION
+
+
+def init_db():
+    """Bring the database schema up to date; run once at startup"""
+    conn = _connect()
     try:
-        # Ensure rooms table exists
-        table_check = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='rooms'").fetchone()
-        if not table_check:
-            # Tables don't exist, initialize database
-            conn.close()
-            init_db()
-            conn = get_db()
-        
-        rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-        # Ensure rooms is always a list
-        if rooms is None:
-            rooms = []
-        
-        # Check if any rooms are available
-        has_available = any(room["status"] == "Available" for room in rooms)
-        
+        migrate_db(conn)
+        # Roll room statuses forward to today, one index probe per room
+        reconcile_room_state(conn)
+    finally:
         conn.close()
-        today = date.today().isoformat()
-        return render_template("booking.html", rooms=rooms or [], today=today, has_available=has_available)
-    except sqlite3.OperationalError as e:
-        # Database error - try to reinitialize
-        try:
-            conn.close()
-        except:
-            pass
+
+
+# Activity log writer settings
+ASYNC_ACTIVITY_LOG = os.environ.get("ASYNC_ACTIVITY_LOG", "0") == "1"
+LOG_QUEUE_SIZE = 10000       # entries buffered before new ones are dropped
+LOG_BATCH_SIZE = 200         # flush once this many entries are waiting
+LOG_FLUSH_INTERVAL = 0.5     # ...or once the oldest has waited this long (seconds)
+
+
+class ActivityLogWriter:
+    """Background thread that writes activity logs in batches.
+
+    Entries are queued with the time they happened and inserted with
+    executemany, one transaction per batch, so the request path never waits
+    on a commit. When the queue is full new entries are dropped and counted
+    rather than blocking the request.
+    """
+
+    _STOP = object()
+
+    def __init__(self, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        """Start the worker thread if it isn't running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, user, action, details=""):
+        """Queue an entry; returns False if it was dropped"""
+        self.start()
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
         try:
-            init_db()
-            conn = get_db()
-            rooms = conn.execute("SELECT * FROM rooms ORDER BY room_number").fetchall()
-            if rooms is None:
-                rooms = []
-            has_available = any(room["status"] == "Available" for room in rooms)
+            self._queue.put_nowait((action, details, user, timestamp))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def stop(self, timeout=5):
+        """Write out the queue and stop the worker thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    def _run(self):
+        conn = None
+        database = None
+        stopping = False
+        while not stopping:
+            batch = []
+            waiters = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            # Drain whatever is already queued when stopping or flushing
+            if stopping or waiters:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not self._STOP:
+                        batch.append(item)
+
+            if batch:
+                if conn is None or database != DATABASE:
+                    if conn is not None:
+                        conn.close()
+                    conn = _connect()
+                    database = DATABASE
+                self._write(conn, batch)
+            for waiter in waiters:
+                waiter.set()
+        if conn is not None:
             conn.close()
-            today = date.today().isoformat()
-            return render_template("booking.html", rooms=rooms, today=today, has_available=has_available)
-        except Exception as e2:
-            flash(f"Database error: {str(e2)}. Please restart the application.", "error")
-            return redirect(url_for("dashboard"))
-    except Exception as e:
+
+    def _write(self, conn, batch):
         try:
-            conn.close()
-        except:
-            pass
-        flash(f"Error loading rooms: {str(e)}. Please try again.", "error")
-        return redirect(url_for("dashboard"))
+            with conn:
+                conn.executemany(
+                    "INSERT INTO activity_logs (action, details, user, timestamp) VALUES (?, ?, ?, ?)",
+                    batch
+                )
+            self.written += len(batch)
+            self.batches += 1
+            invalidate_dashboard_cache()
+        except sqlite3.Error:
+            self.failed += len(batch)
 
 
-@app.route("/checkin/<int:booking_id>")
+activity_log_writer = ActivityLogWriter()
+atexit.register(activity_log_writer.stop)
+
+
+def write_activity(conn, user, action, details=""):
+    """Insert an activity log row on conn without committing"""
+    conn.execute(
+        "INSERT INTO activity_logs (action, details, user) VALUES (?, ?, ?)",
+        (action, details, user)
+    )
+
+
+def log_activity(user, action, details=""):
+    """Log activity to the configured storage backend
+
+    On SQLite with ASYNC_ACTIVITY_LOG set the entry is handed to the
+    background writer; otherwise it is committed before returning.
+    """
+    publish_log(user, action, details)
+    get_repo().log_activity(user, action, details)
+
+
+# Live dashboard updates
+EVENT_QUEUE_SIZE = 100       # events buffered per subscriber before it is dropped
+EVENT_KEEPALIVE = 15         # seconds between keep-alive comments
+EVENT_LOCAL_VERSIONS = 1000  # data versions committed here that are remembered
+
+
+class EventBroker:
+    """Fan-out of small JSON events to server-sent-event subscribers.
+
+    Each subscriber gets its own bounded queue. A subscriber that falls
+    behind is disconnected rather than allowed to slow down publishers; its
+    EventSource reconnects and the page reloads its state.
+
+    Events only reach subscribers in this process. The data versions
+    committed here are remembered, so a stream can tell when another
+    worker process changed the data and ask its page to reload.
+    """
+
+    def __init__(self, queue_size=EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._local_versions = collections.deque(maxlen=EVENT_LOCAL_VERSIONS)
+
+    def committed_locally(self, version):
+        """Note a data version written by this process, whose events were published here"""
+        with self._lock:
+            self._local_versions.append(version)
+
+    def changed_elsewhere(self, since, version):
+        """True if a data version after since, up to version, was committed by another process"""
+        if version - since > EVENT_LOCAL_VERSIONS:
+            return True
+        with self._lock:
+            local = set(self._local_versions)
+        return any(v not in local for v in range(since + 1, version + 1))
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(q)
+                # Make room for the sentinel that ends its stream
+                try:
+                    q.get_nowait()
+                    q.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self, q, data_version=None):
+        """Yield SSE messages for q until it is dropped or the client leaves
+
+        With data_version (a callable returning the current data version),
+        each keep-alive also checks for changes committed by other
+        processes and sends a reload event when there are any.
+        """
+        try:
+            yield "retry: 3000\n\n"
+            seen = data_version() if data_version else None
+            while True:
+                try:
+                    message = q.get(timeout=EVENT_KEEPALIVE)
+                except queue.Empty:
+                    if data_version:
+                        version = data_version()
+                        if self.changed_elsewhere(seen, version):
+                            yield "event: reload\ndata: {}\n\n"
+                        seen = version
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(q)
+
+
+events = EventBroker()
+
+
+def publish_log(user, action, details=""):
+    events.publish("log", {
+        "user": user,
+        "action": action,
+        "details": details,
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def publish_booking_change(conn, booking_id):
+    """Push the changed booking, its room and the new room counts"""
+    booking = _get_booking(conn, booking_id)
+    if booking is None:
+        return
+    room = get_rooms_overview(conn, booking["room_id"])
+    events.publish("booking", dict(booking))
+    if room:
+        events.publish("room", dict(room[0]))
+    events.publish("stats", dict(get_room_stats(conn)))
+
+
+def refresh_room_state(conn, room_ids=None):
+    """Recompute room_state for room_ids (every room if None) from bookings
+
+    A room is Occupied while it has a checked-in booking, Dirty, Cleaning
+    or Inspected while a turnover task is open, Booked when a reserved stay
+    covers today, and Available otherwise. Each room is one probe of
+    idx_bookings_room_status_dates. Call inside the writing transaction so
+    the state commits with the booking change.
+    """
+    today = date.today().isoformat()
+    where = ""
+    params = [today]
+    if room_ids is not None:
+        room_ids = list(room_ids)
+        if not room_ids:
+            return
+        where = f"WHERE r.id IN ({', '.join('?' * len(room_ids))})"
+        params.extend(room_ids)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO room_state
+            (room_id, status, booking_id, booking_status, guest_name, check_in, check_out, as_of)
+        SELECT r.id,
+               CASE WHEN b.status = 'Checked In' THEN 'Occupied'
+                    WHEN h.status IS NOT NULL THEN h.status
+                    WHEN b.status = 'Booked' THEN 'Booked'
+                    ELSE 'Available' END,
+               b.id, b.status, b.guest_name, b.check_in, b.check_out, t.today
+        FROM rooms r
+        CROSS JOIN (SELECT ? AS today) t
+        LEFT JOIN housekeeping_tasks h ON h.room_id = r.id AND h.status != 'Available'
+        LEFT JOIN bookings b ON b.id = COALESCE(
+            (SELECT id FROM bookings
+             WHERE room_id = r.id AND status = 'Checked In'
+             ORDER BY check_in DESC LIMIT 1),
+            (SELECT id FROM bookings
+             WHERE room_id = r.id AND status = 'Booked'
+             AND check_in <= t.today AND check_out > t.today
+             LIMIT 1))
+        {where}
+    """, params)
+
+
+# Date room_state was last reconciled in this process
+_room_state_date = None
+
+
+def reconcile_room_state(conn):
+    """Rebuild room_state for every room; returns the number of rooms
+
+    Statuses move on their own when the date changes (a reservation's
+    first night arrives, a stay ends), so this runs at startup, from the
+    reconcile-room-state command and on the first request of each day.
+    """
+    global _room_state_date
+    def txn(conn):
+        refresh_room_state(conn)
+        bump_data_version(conn)
+    
+    run_transaction(conn, txn)
+    invalidate_dashboard_cache()
+    _room_state_date = date.today()
+    return conn.execute("SELECT COUNT(*) FROM room_state").fetchone()[0]
+
+
+@app.before_request
+def reconcile_room_state_daily():
+    """Roll room_state forward on the first request after midnight"""
+    if app.config["STORAGE_BACKEND"] == "sqlite" and _room_state_date != date.today():
+        reconcile_room_state(get_db())
+
+
+def room_is_occupied(conn, room_id):
+    return conn.execute(
+        "SELECT 1 FROM room_state WHERE room_id = ? AND status = 'Occupied'", (room_id,)
+    ).fetchone() is not None
+
+
+def get_rooms_overview(conn, room_id=None):
+    """Return all rooms (or just room_id) with their current status and booking"""
+    return conn.execute(f"""
+        SELECT r.id, r.room_number, r.room_type, r.created_at,
+               COALESCE(s.status, 'Available') AS status,
+               s.booking_id,
+               s.guest_name, 
+               s.check_in, 
+               s.check_out,
+               s.booking_status
+        FROM rooms r
+        LEFT JOIN room_state s ON s.room_id = r.id
+        {"WHERE r.id = ?" if room_id is not None else ""}
+        ORDER BY r.room_number
+    """, () if room_id is None else (room_id,)).fetchall()
+
+
+def get_room_stats(conn):
+    """Return total/available/booked/occupied room counts in a single pass"""
+    return conn.execute("""
+        SELECT COUNT(*) AS total_rooms,
+               COALESCE(SUM(COALESCE(s.status, 'Available') = 'Available'), 0) AS available_rooms,
+               COALESCE(SUM(s.status = 'Booked'), 0) AS booked_rooms,
+               COALESCE(SUM(s.status = 'Occupied'), 0) AS occupied_rooms,
+               COALESCE(SUM(s.status IN ('Dirty', 'Cleaning', 'Inspected')), 0) AS turnover_rooms
+        FROM rooms r
+        LEFT JOIN room_state s ON s.room_id = r.id
+    """).fetchone()
+
+
+def get_active_bookings(conn):
+    """Return bookings that are booked or checked in, soonest first"""
+    return conn.execute("""
+        SELECT b.*, r.room_number 
+        FROM bookings b
+        JOIN rooms r ON b.room_id = r.id
+        WHERE b.status IN ('Booked', 'Checked In')
+        ORDER BY b.check_in ASC
+    """).fetchall()
+
+
+def find_booking_conflict(conn, room_id, check_in, check_out):
+    """Return an active booking of room_id overlapping [check_in, check_out)
+
+    Stays are half-open intervals: a guest checking out on a day does not
+    conflict with a new guest checking in on that same day.
+    """
+    return conn.execute("""
+        SELECT * FROM bookings
+        WHERE room_id = ?
+        AND status IN ('Booked', 'Checked In')
+        AND check_in < ?
+        AND check_out > ?
+        LIMIT 1
+    """, (room_id, check_out, check_in)).fetchone()
+
+
+def get_available_rooms(conn, check_in, check_out):
+    """Return every room with no active booking overlapping [check_in, check_out)"""
+    return conn.execute("""
+        SELECT r.id, r.room_number, r.room_type FROM rooms r
+        WHERE NOT EXISTS (
+            SELECT 1 FROM bookings b
+            WHERE b.room_id = r.id
+            AND b.status IN ('Booked', 'Checked In')
+            AND b.check_in < ?
+            AND b.check_out > ?
+        )
+        ORDER BY r.room_number
+    """, (check_out, check_in)).fetchall()
+
+
+# Room types and availability search. Free inventory per type comes from
+# room_type_nights: a type is free for a stay when its busiest night still
+# has an unsold room. A specific room is only chosen when booking.
+BEST_FIT_OPEN_GAP = 365  # days charged for the open-ended gap after a room's last booking
+
+
+def get_room_types(conn):
+    """Every room type with its capacity and number of rooms, smallest first"""
+    return conn.execute("""
+        SELECT t.name, t.capacity, t.description,
+               (SELECT COUNT(*) FROM rooms r WHERE r.room_type = t.name) AS inventory
+        FROM room_types t
+        ORDER BY t.capacity, t.name
+    """).fetchall()
+
+
+def search_availability(conn, check_in, check_out, guests=1):
+    """Free rooms per type for [check_in, check_out) that sleep at least guests
+
+    Returns dicts with the type's name, capacity, inventory, the most
+    rooms sold on any night of the stay and the rooms left to sell. Each
+    type costs one range scan of room_type_nights, whatever the number of
+    bookings. The count is an upper bound: a stay still needs one room
+    free for every night, which best_fit_room() checks when booking.
+    """
+    rows = conn.execute("""
+        SELECT t.name, t.capacity, t.description,
+               (SELECT COUNT(*) FROM rooms r WHERE r.room_type = t.name) AS inventory,
+               (SELECT COALESCE(MAX(n.rooms_sold), 0) FROM room_type_nights n
+                WHERE n.room_type = t.name AND n.night >= ? AND n.night < ?) AS peak_sold
+        FROM room_types t
+        WHERE t.capacity >= ?
+        ORDER BY t.capacity, t.name
+    """, (check_in, check_out, guests)).fetchall()
+    return [{**dict(row), "available": max(row["inventory"] - row["peak_sold"], 0)} for row in rows]
+
+
+def rank_best_fit(candidates, check_in, check_out):
+    """Order free rooms so the stay fills the smallest gap in a calendar
+
+    Each candidate has free_from (check-out of the room's previous active
+    booking, if any) and free_until (check-in of its next one). The gap a
+    stay leaves before it is counted from today, since past nights can't
+    be sold; an open-ended gap after it counts as BEST_FIT_OPEN_GAP days.
+    Filling short gaps first keeps long runs of free nights for long stays.
+    """
+    today = date.today().isoformat()
+    stay_in = date.fromisoformat(check_in)
+    stay_out = date.fromisoformat(check_out)
+    
+    def waste(room):
+        free_from = date.fromisoformat(max(room["free_from"] or today, today))
+        before = max((stay_in - free_from).days, 0)
+        after = (date.fromisoformat(room["free_until"]) - stay_out).days if room["free_until"] else BEST_FIT_OPEN_GAP
+        return before + after, room["room_number"]
+    
+    return sorted(candidates, key=waste)
+
+
+def best_fit_room(conn, room_type, check_in, check_out):
+    """The free room of room_type that best fits [check_in, check_out), or None
+
+    Call inside the booking transaction so the choice can't go stale.
+    For stays starting today, rooms still occupied are skipped and rooms
+    being turned over rank after clean ones, so a walk-in gets a room it
+    can check in to now whenever there is one.
+    """
+    occupied = ""
+    turning_over = "0"
+    params = []
+    if check_in <= date.today().isoformat():
+        occupied = "AND r.id NOT IN (SELECT room_id FROM room_state WHERE status = 'Occupied')"
+        turning_over = f"""r.id IN (SELECT room_id FROM room_state
+                                    WHERE status IN ({', '.join('?' * len(HOUSEKEEPING_STATUSES))}))"""
+        params.extend(HOUSEKEEPING_STATUSES)
+    candidates = conn.execute(f"""
+        SELECT r.id, r.room_number, r.room_type,
+               {turning_over} AS turning_over,
+               (SELECT MAX(b.check_out) FROM bookings b
+                WHERE b.room_id = r.id AND b.status IN ('Booked', 'Checked In')
+                AND b.check_out <= ?) AS free_from,
+               (SELECT MIN(b.check_in) FROM bookings b
+                WHERE b.room_id = r.id AND b.status IN ('Booked', 'Checked In')
+                AND b.check_in >= ?) AS free_until
+        FROM rooms r
+        WHERE r.room_type = ?
+        AND NOT EXISTS (
+            SELECT 1 FROM bookings b
+            WHERE b.room_id = r.id
+            AND b.status IN ('Booked', 'Checked In')
+            AND b.check_in < ?
+            AND b.check_out > ?
+        )
+        {occupied}
+    """, (*params, check_in, check_out, room_type, check_out, check_in)).fetchall()
+    # sorted() is stable, so clean rooms keep their best-fit order ahead of the rest
+    ranked = sorted(rank_best_fit(candidates, check_in, check_out), key=lambda room: room["turning_over"])
+    return ranked[0] if ranked else None
+
+
+def bump_data_version(conn):
+    """Record that rooms/bookings changed; call inside the writing transaction"""
+    rows = conn.execute(
+        "UPDATE data_version SET version = version + 1 WHERE id = 1 RETURNING version"
+    ).fetchall()
+    # PRAGMA data_version doesn't change for this connection's own commits
+    if isinstance(conn, PooledConnection):
+        conn.data_version_seen = None
+        conn.bumped_version = rows[0][0] if rows else None
+    if has_app_context():
+        g.pop("_data_version", None)
+
+
+def get_data_version(conn):
+    row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    return row["version"] if row else 0
+
+
+def validate_booking(guest_name, room, check_in, check_out):
+    """Return an error message for invalid booking input, or None
+
+    room is the room id or room type being booked.
+    """
+    if not all([guest_name, room, check_in, check_out]):
+        return "Please fill in all fields"
+    return validate_stay(check_in, check_out)
+
+
+def validate_stay(check_in, check_out):
+    """Return an error message for invalid stay dates, or None"""
+    try:
+        check_in_date = datetime.strptime(check_in, "%Y-%m-%d").date()
+        check_out_date = datetime.strptime(check_out, "%Y-%m-%d").date()
+    except (TypeError, ValueError):  # TypeError: not a string, e.g. a JSON number
+        return "Invalid date format"
+    
+    if check_in_date < date.today():
+        return "Check-in date cannot be in the past"
+    if check_out_date <= check_in_date:
+        return "Check-out date must be after check-in date"
+    return None
+
+
+# Transaction retry settings
+TXN_MAX_RETRIES = 5
+TXN_RETRY_BACKOFF = 0.01  # seconds, doubled on each retry
+
+
+class BookingError(Exception):
+    """A booking state change was rejected; the message is shown to the user"""
+
+
+class BookingNotFound(BookingError):
+    """The room or booking being changed does not exist"""
+
+
+def run_transaction(conn, fn, *args):
+    """Run fn(conn, *args) in a BEGIN IMMEDIATE transaction and commit it
+
+    The write lock is taken up front, so reads made inside fn can't be
+    invalidated by another writer before the commit. Retries with jittered
+    exponential backoff while the database is locked; any other error rolls
+    back and propagates.
+    """
+    for attempt in range(TXN_MAX_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if "locked" not in str(e) or attempt == TXN_MAX_RETRIES:
+                raise
+            time.sleep(TXN_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+
+def _book(conn, pick_room, guest_name, check_in, check_out, user):
+    """Book the room returned by pick_room(conn) in one transaction; returns (room, booking_id)"""
+    def txn(conn):
+        room = pick_room(conn)
+        cursor = conn.execute("""
+            INSERT INTO bookings (guest_name, room_id, check_in, check_out, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, (guest_name, room["id"], check_in, check_out, "Booked"))
+        refresh_room_state(conn, [room["id"]])
+        record_booking_nights(conn, "b.id = ?", (cursor.lastrowid,))
+        record_room_type_nights(conn, "b.id = ?", (cursor.lastrowid,))
+        bump_data_version(conn)
+        write_activity(conn, user, "Booking Created",
+                       f"Room {room['room_number']} booked for {guest_name} ({check_in} to {check_out})")
+        return room, cursor.lastrowid
+    
+    room, booking_id = run_transaction(conn, txn)
+    publish_booking_change(conn, booking_id)
+    publish_log(user, "Booking Created",
+                f"Room {room['room_number']} booked for {guest_name} ({check_in} to {check_out})")
+    return room, booking_id
+
+
+def create_booking(conn, guest_name, room_id, check_in, check_out, user):
+    """Book a room and record it in the activity log, atomically
+
+    Returns (room, booking_id). Raises BookingError if the room doesn't
+    exist, is already booked for the dates, or is still occupied on the
+    check-in date.
+    """
+    def pick_room(conn):
+        room = conn.execute("SELECT * FROM rooms WHERE id = ?", (room_id,)).fetchone()
+        if room is None:
+            raise BookingNotFound("Room not found")
+        
+        if find_booking_conflict(conn, room_id, check_in, check_out):
+            raise BookingError(f"Room {room['room_number']} is already booked for the selected dates")
+        
+        # A guest who has overstayed still holds the room until checked out
+        if check_in <= date.today().isoformat() and room_is_occupied(conn, room_id):
+            raise BookingError(f"Room {room['room_number']} is not available")
+        return room
+    
+    return _book(conn, pick_room, guest_name, check_in, check_out, user)
+
+
+def book_room_type(conn, guest_name, room_type, check_in, check_out, user, guests=1):
+    """Book the best-fitting free room of room_type; returns (room, booking_id)
+
+    Raises BookingNotFound for an unknown type and BookingError when the
+    type sleeps fewer than guests or no single room of it is free for the
+    whole stay.
+    """
+    def pick_room(conn):
+        row = conn.execute("SELECT capacity FROM room_types WHERE name = ?", (room_type,)).fetchone()
+        if row is None:
+            raise BookingNotFound("Room type not found")
+        if row["capacity"] < guests:
+            raise BookingError(f"A {room_type} room sleeps at most {row['capacity']}")
+        room = best_fit_room(conn, room_type, check_in, check_out)
+        if room is None:
+            raise BookingError(f"No {room_type} room is free for the selected dates")
+        return room
+    
+    return _book(conn, pick_room, guest_name, check_in, check_out, user)
+
+
+def _get_booking(conn, booking_id):
+    return conn.execute("""
+        SELECT b.*, r.room_number 
+        FROM bookings b
+        JOIN rooms r ON b.room_id = r.id
+        WHERE b.id = ?
+    """, (booking_id,)).fetchone()
+
+
+def check_in_booking(conn, booking_id, user):
+    """Mark a booking checked in and its room occupied; returns the booking"""
+    def txn(conn):
+        booking = _get_booking(conn, booking_id)
+        if not booking:
+            raise BookingNotFound("Booking not found")
+        if booking["status"] != "Booked":
+            raise BookingError("This booking cannot be checked in")
+        turnover = room_turnover_status(conn, booking["room_id"])
+        if turnover:
+            raise BookingError(f"Room {booking['room_number']} is not ready yet ({turnover})")
+        
+        today = date.today().isoformat()
+        conn.execute(
+            "UPDATE bookings SET status = 'Checked In', checked_in_on = ? WHERE id = ?", (today, booking_id)
+        )
+        refresh_room_state(conn, [booking["room_id"]])
+        _add_daily_stat(conn, today, "arrivals")
+        bump_data_version(conn)
+        write_activity(conn, user, "Check-In",
+                       f"Room {booking['room_number']} checked in for {booking['guest_name']}")
+        return booking
+    
+    booking = run_transaction(conn, txn)
+    publish_booking_change(conn, booking_id)
+    publish_log(user, "Check-In", f"Room {booking['room_number']} checked in for {booking['guest_name']}")
+    return booking
+
+
+def check_out_booking(conn, booking_id, user):
+    """Complete a booking and queue its room for cleaning; returns the booking
+
+    Cancelling a reservation that never checked in frees the room directly
+    and isn't counted as a departure.
+    """
+    def txn(conn):
+        booking = _get_booking(conn, booking_id)
+        if not booking:
+            raise BookingNotFound("Booking not found")
+        if booking["status"] not in ["Booked", "Checked In"]:
+            raise BookingError("This booking cannot be checked out")
+        
+        today = date.today().isoformat()
+        if booking["status"] == "Checked In":
+            conn.execute(
+                "UPDATE bookings SET status = 'Completed', checked_out_on = ? WHERE id = ?", (today, booking_id)
+            )
+            open_turnover(conn, booking["room_id"], booking_id)
+            _add_daily_stat(conn, today, "departures")
+        else:
+            conn.execute("UPDATE bookings SET status = 'Completed' WHERE id = ?", (booking_id,))
+        refresh_room_state(conn, [booking["room_id"]])
+        release_booking_nights(conn, booking_id, today)
+        bump_data_version(conn)
+        write_activity(conn, user, "Check-Out",
+                       f"Room {booking['room_number']} checked out for {booking['guest_name']}")
+        return booking
+    
+    booking = run_transaction(conn, txn)
+    publish_booking_change(conn, booking_id)
+    publish_log(user, "Check-Out", f"Room {booking['room_number']} checked out for {booking['guest_name']}")
+    if booking["status"] == "Checked In":
+        housekeeping_scheduler.wake()
+    return booking
+
+
+# Housekeeping. Checking a guest out opens a turnover task for the room,
+# which moves Dirty -> Cleaning -> Inspected -> Available. While a task is
+# open room_state shows its status and the room can't be checked into.
+HOUSEKEEPING_STATUSES = ("Dirty", "Cleaning", "Inspected")
+HOUSEKEEPING_TRANSITIONS = {
+    # action: (from status, to status, timestamp column)
+    "start": ("Dirty", "Cleaning", "assigned_at"),
+    "inspect": ("Cleaning", "Inspected", "inspected_at"),
+    "release": ("Inspected", "Available", "completed_at"),
+}
+HOUSEKEEPING_SCHEDULE_INTERVAL = 30  # seconds between scheduler passes when not woken
+NO_ARRIVAL = "9999-12-31"            # sorts rooms with no upcoming guest last
+
+# Earliest upcoming arrival for the task's room: one probe of
+# idx_bookings_room_status_dates per task
+_NEXT_ARRIVAL_SQL = """
+    (SELECT MIN(b.check_in) FROM bookings b
+     WHERE b.room_id = t.room_id AND b.status = 'Booked' AND b.check_out > ?)
+"""
+
+
+def open_turnover(conn, room_id, booking_id):
+    """Queue a Dirty task for the room unless it already has an open one"""
+    conn.execute("""
+        INSERT OR IGNORE INTO housekeeping_tasks (room_id, booking_id, status)
+        VALUES (?, ?, 'Dirty')
+    """, (room_id, booking_id))
+
+
+def room_turnover_status(conn, room_id):
+    """Status of the room's open turnover task, or None if it is ready"""
+    row = conn.execute(
+        "SELECT status FROM housekeeping_tasks WHERE room_id = ? AND status != 'Available'", (room_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def get_housekeeping_board(conn):
+    """Open turnovers with their room, housekeeper and next arrival, most urgent first
+
+    A single query over the open-task partial index, whatever the number
+    of rooms.
+    """
+    return conn.execute(f"""
+        SELECT t.id, t.room_id, r.room_number, r.room_type, t.status, t.booking_id,
+               t.housekeeper_id, h.name AS housekeeper,
+               t.created_at, t.assigned_at, t.inspected_at,
+               {_NEXT_ARRIVAL_SQL} AS next_arrival
+        FROM housekeeping_tasks t
+        JOIN rooms r ON r.id = t.room_id
+        LEFT JOIN housekeepers h ON h.id = t.housekeeper_id
+        WHERE t.status != 'Available'
+        ORDER BY next_arrival IS NULL, next_arrival, t.created_at, t.id
+    """, (date.today().isoformat(),)).fetchall()
+
+
+def publish_room_change(conn, room_ids):
+    """Push the changed rooms and the new room counts"""
+    for room_id in room_ids:
+        room = get_rooms_overview(conn, room_id)
+        if room:
+            events.publish("room", dict(room[0]))
+    events.publish("stats", dict(get_room_stats(conn)))
+
+
+def assign_housekeeping(conn):
+    """Hand queued Dirty tasks to free housekeepers; returns the assignments
+
+    Queued tasks go into a heap ordered by their room's next arrival
+    (rooms with no arrival last, then oldest task first). Free
+    housekeepers, those not cleaning a room, are served least recently
+    assigned first. Runs as one transaction, so schedulers in several
+    worker processes never hand out the same task twice.
+    """
+    def txn(conn):
+        free = conn.execute("""
+            SELECT h.id, h.name FROM housekeepers h
+            WHERE h.active = 1 AND NOT EXISTS (
+                SELECT 1 FROM housekeeping_tasks t
+                WHERE t.status != 'Available' AND t.status = 'Cleaning' AND t.housekeeper_id = h.id
+            )
+            ORDER BY h.last_assigned_at IS NOT NULL, h.last_assigned_at, h.id
+        """).fetchall()
+        if not free:
+            return []
+        queue = [
+            (row["next_arrival"] or NO_ARRIVAL, row["created_at"], row["id"], row["room_id"], row["room_number"])
+            for row in conn.execute(f"""
+                SELECT t.id, t.room_id, r.room_number, t.created_at, {_NEXT_ARRIVAL_SQL} AS next_arrival
+                FROM housekeeping_tasks t
+                JOIN rooms r ON r.id = t.room_id
+                WHERE t.status != 'Available' AND t.status = 'Dirty'
+            """, (date.today().isoformat(),))
+        ]
+        heapq.heapify(queue)
+        
+        assignments = []
+        for housekeeper in free:
+            if not queue:
+                break
+            next_arrival, _, task_id, room_id, room_number = heapq.heappop(queue)
+            conn.execute("""
+                UPDATE housekeeping_tasks
+                SET status = 'Cleaning', housekeeper_id = ?, assigned_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (housekeeper["id"], task_id))
+            conn.execute(
+                "UPDATE housekeepers SET last_assigned_at = CURRENT_TIMESTAMP WHERE id = ?", (housekeeper["id"],)
+            )
+            write_activity(conn, "System", "Housekeeping",
+                           f"Room {room_number} assigned to {housekeeper['name']}"
+                           + (f" (next arrival {next_arrival})" if next_arrival != NO_ARRIVAL else ""))
+            assignments.append({"task_id": task_id, "room_id": room_id, "housekeeper_id": housekeeper["id"]})
+        if assignments:
+            refresh_room_state(conn, [a["room_id"] for a in assignments])
+            bump_data_version(conn)
+        return assignments
+    
+    assignments = run_transaction(conn, txn)
+    if assignments:
+        publish_room_change(conn, [a["room_id"] for a in assignments])
+    return assignments
+
+
+def advance_turnover(conn, task_id, action, user):
+    """Move a task one step along its lifecycle; returns the task as it was
+
+    action is a key of HOUSEKEEPING_TRANSITIONS. Raises BookingNotFound
+    for an unknown task and BookingError if it isn't in the right state.
+    """
+    from_status, to_status, column = HOUSEKEEPING_TRANSITIONS[action]
+    def txn(conn):
+        task = conn.execute("""
+            SELECT t.*, r.room_number FROM housekeeping_tasks t
+            JOIN rooms r ON r.id = t.room_id
+            WHERE t.id = ?
+        """, (task_id,)).fetchone()
+        if task is None:
+            raise BookingNotFound("Housekeeping task not found")
+        if task["status"] != from_status:
+            raise BookingError(f"Room {task['room_number']} is {task['status']}, not {from_status}")
+        
+        conn.execute(
+            f"UPDATE housekeeping_tasks SET status = ?, {column} = CURRENT_TIMESTAMP WHERE id = ?",
+            (to_status, task_id)
+        )
+        refresh_room_state(conn, [task["room_id"]])
+        bump_data_version(conn)
+        write_activity(conn, user, "Housekeeping", f"Room {task['room_number']} {to_status.lower()}")
+        return task
+    
+    task = run_transaction(conn, txn)
+    publish_room_change(conn, [task["room_id"]])
+    publish_log(user, "Housekeeping", f"Room {task['room_number']} {to_status.lower()}")
+    if action == "inspect":
+        # The housekeeper is free for the next room
+        housekeeping_scheduler.wake()
+    return task
+
+
+class HousekeepingScheduler:
+    """Background thread that assigns queued turnovers to free housekeepers
+
+    A pass runs whenever the scheduler is woken (a check-out queued a
+    room, an inspection freed a housekeeper) and at least every
+    HOUSEKEEPING_SCHEDULE_INTERVAL seconds, which picks up changes made
+    by other worker processes.
+    """
+
+    def __init__(self, interval=HOUSEKEEPING_SCHEDULE_INTERVAL):
+        self.interval = interval
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.passes = 0
+        self.assigned = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker thread if it isn't running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="housekeeping-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def wake(self):
+        """Run a pass as soon as possible"""
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        conn = None
+        database = None
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if conn is None or database != DATABASE:
+                if conn is not None:
+                    conn.close()
+                conn = _connect()
+                database = DATABASE
+            try:
+                self.assigned += len(assign_housekeeping(conn))
+                self.passes += 1
+            except sqlite3.Error:
+                self.failed += 1
+                app.logger.exception("Housekeeping scheduler pass failed")
+
+
+housekeeping_scheduler = HousekeepingScheduler()
+
+
+# Rates and occupancy reporting
+DEFAULT_NIGHTLY_RATE = 100.0  # used for nights with no row in rates
+MAX_RANGE_DAYS = 3660  # longest span one report or rate change may cover (ten years)
+
+
+def record_booking_nights(conn, where, params=()):
+    """Price the nights of the bookings matching where and add them to daily_stats
+
+    where filters "bookings b"; call inside the writing transaction. Each
+    night is priced from rates for the room's type at the time of booking,
+    so later rate changes don't rewrite past revenue.
+    """
+    conn.execute(f"""
+        WITH RECURSIVE nights (booking_id, room_type, night, check_out) AS (
+            SELECT b.id, r.room_type, date(b.check_in), date(b.check_out)
+            FROM bookings b JOIN rooms r ON r.id = b.room_id
+            WHERE {where}
+            UNION ALL
+            SELECT booking_id, room_type, date(night, '+1 day'), check_out
+            FROM nights WHERE date(night, '+1 day') < check_out
+        )
+        INSERT OR IGNORE INTO booking_nights (booking_id, night, rate)
+        SELECT n.booking_id, n.night, COALESCE(rt.rate, ?)
+        FROM nights n
+        LEFT JOIN rates rt ON rt.room_type = n.room_type AND rt.date = n.night
+    """, (*params, DEFAULT_NIGHTLY_RATE))
+    conn.execute(f"""
+        INSERT INTO daily_stats (date, rooms_sold, revenue)
+        SELECT bn.night, COUNT(*), SUM(bn.rate)
+        FROM booking_nights bn
+        WHERE bn.booking_id IN (SELECT b.id FROM bookings b WHERE {where})
+        GROUP BY bn.night
+        ON CONFLICT (date) DO UPDATE SET
+            rooms_sold = rooms_sold + excluded.rooms_sold,
+            revenue = revenue + excluded.revenue
+    """, params)
+
+
+def release_booking_nights(conn, booking_id, from_date):
+    """Take a booking's nights from from_date on back out of daily_stats and room_type_nights"""
+    conn.execute("""
+        UPDATE daily_stats SET
+            rooms_sold = rooms_sold - 1,
+            revenue = revenue - (
+                SELECT rate FROM booking_nights
+                WHERE booking_id = ? AND night = daily_stats.date
+            )
+        WHERE date IN (
+            SELECT night FROM booking_nights WHERE booking_id = ? AND night >= ?
+        )
+    """, (booking_id, booking_id, from_date))
+    conn.execute("""
+        UPDATE room_type_nights SET rooms_sold = rooms_sold - 1
+        WHERE room_type = (
+            SELECT r.room_type FROM bookings b JOIN rooms r ON r.id = b.room_id WHERE b.id = ?
+        )
+        AND night IN (
+            SELECT night FROM booking_nights WHERE booking_id = ? AND night >= ?
+        )
+    """, (booking_id, booking_id, from_date))
+    conn.execute(
+        "DELETE FROM booking_nights WHERE booking_id = ? AND night >= ?",
+        (booking_id, from_date)
+    )
+
+
+def record_room_type_nights(conn, where, params=()):
+    """Add the priced nights of the active bookings matching where to room_type_nights
+
+    Call after record_booking_nights(), in the same transaction.
+    """
+    conn.execute(f"""
+        INSERT INTO room_type_nights (room_type, night, rooms_sold)
+        SELECT r.room_type, bn.night, COUNT(*)
+        FROM booking_nights bn
+        JOIN bookings bk ON bk.id = bn.booking_id
+        JOIN rooms r ON r.id = bk.room_id
+        WHERE bn.booking_id IN (SELECT b.id FROM bookings b WHERE {where})
+        AND bk.status IN ('Booked', 'Checked In')
+        GROUP BY r.room_type, bn.night
+        ON CONFLICT (room_type, night) DO UPDATE SET
+            rooms_sold = rooms_sold + excluded.rooms_sold
+    """, params)
+
+
+def rebuild_room_type_nights(conn):
+    """Recompute room_type_nights from the nights of active bookings; does not commit"""
+    conn.execute("DELETE FROM room_type_nights")
+    conn.execute("""
+        INSERT INTO room_type_nights (room_type, night, rooms_sold)
+        SELECT r.room_type, bn.night, COUNT(*)
+        FROM booking_nights bn
+        JOIN bookings b ON b.id = bn.booking_id
+        JOIN rooms r ON r.id = b.room_id
+        WHERE b.status IN ('Booked', 'Checked In')
+        GROUP BY r.room_type, bn.night
+    """)
+
+
+def _add_daily_stat(conn, day, column):
+    conn.execute(f"""
+        INSERT INTO daily_stats (date, {column}) VALUES (?, 1)
+        ON CONFLICT (date) DO UPDATE SET {column} = {column} + 1
+    """, (day,))
+
+
+def record_stay_days(conn, where, params=()):
+    """Fill checked_in_on/checked_out_on from the booked dates
+
+    For bookings that arrive with a status rather than through check-in and
+    check-out: imports, sample data and rows from before the columns.
+    """
+    conn.execute(f"""
+        UPDATE bookings SET
+            checked_in_on = CASE WHEN status IN ('Checked In', 'Completed') THEN check_in END,
+            checked_out_on = CASE WHEN status = 'Completed' THEN check_out END
+        WHERE {where}
+    """, params)
+
+
+def rebuild_daily_stats(conn, backfill=False):
+    """Recompute daily_stats from booking_nights
+
+    With backfill, bookings that have no priced nights yet (created before
+    rates existed) are expanded first. Arrivals and departures are counted
+    on the days recorded by check-in and check-out, as they are live, so
+    cancelled reservations aren't departures. Does not commit.
+    """
+    if backfill:
+        record_booking_nights(conn, """
+            NOT EXISTS (SELECT 1 FROM booking_nights bn WHERE bn.booking_id = b.id)
+        """)
+    conn.execute("DELETE FROM daily_stats")
+    conn.execute("""
+        INSERT INTO daily_stats (date, rooms_sold, revenue)
+        SELECT night, COUNT(*), SUM(rate) FROM booking_nights GROUP BY night
+    """)
+    rebuild_stay_counts(conn)
+
+
+def rebuild_stay_counts(conn):
+    """Recount daily_stats arrivals and departures from the recorded stay days"""
+    if "checked_in_on" not in {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}:
+        return  # an earlier migration step; _migrate_stay_days recounts
+    conn.execute("UPDATE daily_stats SET arrivals = 0, departures = 0")
+    for column, day in (("arrivals", "checked_in_on"), ("departures", "checked_out_on")):
+        conn.execute(f"""
+            INSERT INTO daily_stats (date, {column})
+            SELECT {day}, COUNT(*) FROM bookings WHERE {day} IS NOT NULL GROUP BY {day}
+            ON CONFLICT (date) DO UPDATE SET {column} = excluded.{column}
+        """)
+
+
+def set_rates(conn, room_type, start, end, rate):
+    """Set the nightly rate for room_type on every date from start to end inclusive"""
+    conn.execute("""
+        WITH RECURSIVE days (day) AS (
+            SELECT date(?)
+            UNION ALL
+            SELECT date(day, '+1 day') FROM days WHERE day < date(?)
+        )
+        INSERT INTO rates (room_type, date, rate)
+        SELECT ?, day, ? FROM days WHERE true
+        ON CONFLICT (room_type, date) DO UPDATE SET rate = excluded.rate
+    """, (start, end, room_type, rate))
+
+
+def occupancy_report(conn, start, end, group="day"):
+    """Occupancy, ADR and RevPAR per day or month from start to end inclusive
+
+    Reads only the daily_stats rollup. Available room nights use the
+    current room count.
+    """
+    total_rooms = conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
+    period = "date" if group == "day" else "substr(date, 1, 7)"
+    stats = {
+        row["period"]: row
+        for row in conn.execute(f"""
+            SELECT {period} AS period,
+                   SUM(rooms_sold) AS rooms_sold,
+                   SUM(revenue) AS revenue,
+                   SUM(arrivals) AS arrivals,
+                   SUM(departures) AS departures
+            FROM daily_stats
+            WHERE date BETWEEN ? AND ?
+            GROUP BY period
+        """, (start.isoformat(), end.isoformat()))
+    }
+    
+    # Available room nights per period
+    nights_available = {}
+    day = start
+    while day <= end:
+        key = day.isoformat() if group == "day" else day.isoformat()[:7]
+        nights_available[key] = nights_available.get(key, 0) + total_rooms
+        day += timedelta(days=1)
+    
+    def summarise(key, available, row):
+        rooms_sold = row["rooms_sold"] if row else 0
+        revenue = round(row["revenue"], 2) if row else 0.0
+        return {
+            "period": key,
+            "rooms_sold": rooms_sold,
+            "room_nights_available": available,
+            "occupancy": round(rooms_sold / available, 4) if available else 0.0,
+            "revenue": revenue,
+            "adr": round(revenue / rooms_sold, 2) if rooms_sold else 0.0,
+            "revpar": round(revenue / available, 2) if available else 0.0,
+            "arrivals": row["arrivals"] if row else 0,
+            "departures": row["departures"] if row else 0,
+        }
+    
+    periods = [summarise(key, available, stats.get(key)) for key, available in nights_available.items()]
+    totals = {
+        "rooms_sold": sum(p["rooms_sold"] for p in periods),
+        "revenue": sum(p["revenue"] for p in periods),
+        "arrivals": sum(p["arrivals"] for p in periods),
+        "departures": sum(p["departures"] for p in periods),
+    }
+    total = summarise("total", sum(nights_available.values()), totals)
+    return {"periods": periods, "total": total}
+
+
+# Actions offered in the /logs filter
+LOG_ACTIONS = ("Login", "Logout", "Booking Created", "Check-In", "Check-Out", "Housekeeping", "Bulk Import", "Rates Updated", "System")
+LOGS_PAGE_SIZE = 100
+
+
+def query_activity_logs(conn, user=None, action=None, since=None, until=None,
+                        cursor=None, limit=LOGS_PAGE_SIZE, include_archived=False):
+    """Return one page of activity logs, newest first, and the next cursor
+
+    Pages are keyed on (timestamp, id) rather than OFFSET, so every page is
+    an index range scan no matter how far back it is. since/until are
+    inclusive ISO dates; cursor is the value returned for the previous page.
+    With include_archived, a page the table can't fill continues into the
+    archive files written by archive_activity_logs().
+    """
+    clauses = []
+    params = []
+    if user:
+        clauses.append("user = ?")
+        params.append(user)
+    if action:
+        clauses.append("action = ?")
+        params.append(action)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since.isoformat())
+    if until:
+        clauses.append("timestamp < ?")
+        params.append((until + timedelta(days=1)).isoformat())
+    if cursor:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(cursor)
+    
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(f"""
+        SELECT * FROM activity_logs
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, (*params, limit + 1)).fetchall()
+    
+    if include_archived and len(rows) <= limit:
+        # Archived days are all older than the oldest row left in the
+        # table, so they simply continue the same ordering
+        if rows:
+            cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+        rows = list(rows)
+        for row in iter_archived_logs(user, action, since, until, cursor):
+            rows.append(row)
+            if len(rows) > limit:
+                break
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1]['timestamp']},{rows[-1]['id']}"
+    return rows, next_cursor
+
+
+def parse_log_cursor(value):
+    """Split a "timestamp,id" cursor, returning None if it is malformed"""
+    timestamp, _, log_id = (value or "").rpartition(",")
+    if not timestamp or not log_id.isdigit():
+        return None
+    return timestamp, int(log_id)
+
+
+# Activity log retention. Rows older than the LOG_RETENTION_DAYS setting are
+# moved into one gzip NDJSON file per UTC day under log_archive_dir(), oldest
+# day first, and then deleted in small batches so no write lock is held for
+# long. Retention, directory and interval are the LOG_* keys of Config.
+LOG_ARCHIVE_BATCH_SIZE = 1000    # rows deleted per transaction
+LOG_ARCHIVE_LOCK_STALE = 3600    # seconds before an abandoned lock file is taken over
+VACUUM_STEP_PAGES = 256          # free pages handed back per incremental_vacuum transaction
+ARCHIVE_PREFIX = "activity_logs-"
+ARCHIVE_SUFFIX = ".ndjson.gz"
+
+
+def log_archive_dir():
+    directory = app.config["LOG_ARCHIVE_DIR"]
+    return directory or os.path.join(os.path.dirname(os.path.abspath(DATABASE)), "log_archive")
+
+
+def _archive_path(day):
+    return os.path.join(log_archive_dir(), f"{ARCHIVE_PREFIX}{day}{ARCHIVE_SUFFIX}")
+
+
+def archived_log_days():
+    """ISO dates that have an archive file, newest first"""
+    try:
+        names = os.listdir(log_archive_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)] for name in names
+         if name.startswith(ARCHIVE_PREFIX) and name.endswith(ARCHIVE_SUFFIX)),
+        reverse=True,
+    )
+
+
+def read_log_archive(day):
+    """All rows archived for an ISO date, in the order they were written"""
+    with gzip.open(_archive_path(day), "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def iter_archived_logs(user=None, action=None, since=None, until=None, cursor=None):
+    """Yield archived log rows newest first, filtered like query_activity_logs()
+
+    Only files for days inside since/until and at or before the cursor are
+    opened, so a filtered page touches a handful of files at most.
+    """
+    for day in archived_log_days():
+        if (until and day > until.isoformat()) or (cursor and day > cursor[0][:10]):
+            continue
+        if since and day < since.isoformat():
+            break
+        rows = [
+            row for row in read_log_archive(day)
+            if (not user or row["user"] == user)
+            and (not action or row["action"] == action)
+            and (not cursor or (row["timestamp"], row["id"]) < tuple(cursor))
+        ]
+        rows.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+        yield from rows
+
+
+def _write_log_archive(conn, day, next_day):
+    """Write a day's rows to its archive file; returns the highest id written
+
+    Rows already in the file from an interrupted run are kept and not
+    duplicated. The new file is synced and swapped in with os.replace, so
+    it is complete on disk before any row is deleted.
+    """
+    path = _archive_path(day)
+    existing = read_log_archive(day) if os.path.exists(path) else []
+    seen = {row["id"] for row in existing}
+    max_id = 0
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as raw:
+        with gzip.open(raw, "wt", encoding="utf-8") as out:
+            for row in existing:
+                out.write(json.dumps(row) + "\n")
+            for row in conn.execute("""
+                SELECT id, timestamp, user, action, details FROM activity_logs
+                WHERE timestamp >= ? AND timestamp < ?
+                ORDER BY timestamp, id
+            """, (day, next_day)):
+                max_id = max(max_id, row["id"])
+                if row["id"] not in seen:
+                    out.write(json.dumps(dict(row)) + "\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return max_id
+
+
+def _delete_archived_logs(conn, day, next_day, max_id, batch_size):
+    """Delete a day's archived rows, batch_size per short transaction"""
+    def txn(conn):
+        return conn.execute("""
+            DELETE FROM activity_logs WHERE id IN (
+                SELECT id FROM activity_logs
+                WHERE timestamp >= ? AND timestamp < ? AND id <= ?
+                LIMIT ?
+            )
+        """, (day, next_day, max_id, batch_size)).rowcount
+    
+    deleted = 0
+    while True:
+        count = run_transaction(conn, txn)
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def _acquire_lock_file(path, stale_after):
+    """Create a lock file; returns its path, or None if it is held
+
+    A lock file older than stale_after seconds was left by a process that
+    died, and is taken over.
+    """
+    try:
+        if time.time() - os.path.getmtime(path) > stale_after:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return None
+    return path
+
+
+def archive_activity_logs(conn, retention_days=None, batch_size=LOG_ARCHIVE_BATCH_SIZE):
+    """Move activity logs older than the retention period to archive files
+
+    Returns {"days": n, "rows": n}, or None if another process holds the
+    archive lock. Each day's file is on disk before its rows are deleted,
+    so an interrupted run loses nothing and the next one carries on.
+    """
+    if retention_days is None:
+        retention_days = app.config["LOG_RETENTION_DAYS"]
+    cutoff = (datetime.now(timezone.utc).date() - timedelta(days=retention_days)).isoformat()
+    os.makedirs(log_archive_dir(), exist_ok=True)
+    lock = _acquire_lock_file(os.path.join(log_archive_dir(), "archive.lock"), LOG_ARCHIVE_LOCK_STALE)
+    if lock is None:
+        return None
+    
+    archived = {"days": 0, "rows": 0}
+    try:
+        while True:
+            oldest = conn.execute(
+                "SELECT MIN(timestamp) FROM activity_logs WHERE timestamp < ?", (cutoff,)
+            ).fetchone()[0]
+            if oldest is None:
+                break
+            day = str(oldest)[:10]
+            next_day = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+            max_id = _write_log_archive(conn, day, next_day)
+            if not max_id:
+                break  # timestamp that isn't an ISO date; leave it alone
+            archived["rows"] += _delete_archived_logs(conn, day, next_day, max_id, batch_size)
+            archived["days"] += 1
+    finally:
+        os.remove(lock)
+    
+    if archived["rows"]:
+        invalidate_dashboard_cache()
+        app.logger.info("Archived %d activity logs from %d days", archived["rows"], archived["days"])
+    return archived
+
+
+def incremental_vacuum(conn, step_pages=VACUUM_STEP_PAGES):
+    """Hand free pages back to the filesystem; returns pages freed
+
+    Runs PRAGMA incremental_vacuum step_pages at a time, each step its own
+    short write transaction. Returns None unless the database uses
+    auto_vacuum = INCREMENTAL (see enable_incremental_vacuum()).
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return None
+    freed = 0
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    while free:
+        try:
+            conn.execute(f"PRAGMA incremental_vacuum({int(step_pages)})").fetchall()
+        except sqlite3.OperationalError:
+            break  # busy; the next run continues
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining >= free:
+            break
+        freed += free - remaining
+        free = remaining
+    return freed
+
+
+def enable_incremental_vacuum(conn):
+    """Switch an existing database to auto_vacuum = INCREMENTAL
+
+    Takes a full VACUUM, which rewrites the file under an exclusive lock;
+    run it once, off-peak. New databases are created this way.
+    """
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+_log_archiver_thread = None
+
+
+def _run_log_archiver():
+    interval = app.config["LOG_ARCHIVE_INTERVAL"]
+    while True:
+        time.sleep(interval)
+        conn = _connect()
+        try:
+            archive_activity_logs(conn)
+            incremental_vacuum(conn)
+        except (OSError, sqlite3.Error):
+            app.logger.exception("Activity log archiving failed")
+        finally:
+            conn.close()
+
+
+def start_log_archiver():
+    """Archive old logs every LOG_ARCHIVE_INTERVAL seconds in a daemon thread"""
+    global _log_archiver_thread
+    if app.config["LOG_ARCHIVE_INTERVAL"] <= 0 or _log_archiver_thread is not None:
+        return
+    _log_archiver_thread = threading.Thread(
+        target=_run_log_archiver, name="activity-log-archiver", daemon=True
+    )
+    _log_archiver_thread.start()
+
+
+# Online backups. A snapshot copies the live database with the SQLite backup
+# API a few hundred pages per step, inside one read transaction: in WAL mode
+# writers carry on while it runs, and every step sees the same version of
+# the database, so the copy never restarts and is consistent as of its
+# start. The copy is gzipped, its SHA-256 recorded in a JSON manifest next
+# to it, and old snapshots are pruned. Where, how often and how many are
+# kept are the BACKUP_* keys of Config.
+BACKUP_PAGES_PER_STEP = 256      # pages copied per backup step
+BACKUP_GZIP_LEVEL = 6
+BACKUP_CHUNK_SIZE = 1024 * 1024  # bytes read at a time when compressing and checking
+BACKUP_LOCK_STALE = 3600         # seconds before an abandoned lock file is taken over
+SNAPSHOT_PREFIX = "hotel-"
+SNAPSHOT_SUFFIX = ".db.gz"
+
+
+class SnapshotError(Exception):
+    """A snapshot that is missing, damaged or can't be restored"""
+
+
+def backup_dir():
+    return app.config["BACKUP_DIR"] or os.path.join(os.path.dirname(os.path.abspath(DATABASE)), "backups")
+
+
+def _fsync_dir(directory):
+    """Make renames in directory durable (a no-op where directories can't be opened)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def copy_database(conn, path, pages=BACKUP_PAGES_PER_STEP, pause=0):
+    """Copy conn's database to path pages at a time; returns its page count
+    
+    conn holds a read transaction for the whole copy. Without it, any
+    commit between two steps makes the backup API start over, and under a
+    steady stream of check-ins it may never finish.
+    """
+    total = []
+    
+    def progress(status, remaining, pages_total):
+        total[:] = [pages_total]
+        if pause and remaining:
+            time.sleep(pause)
+    
+    dest = sqlite3.connect(path)
+    try:
+        conn.execute("BEGIN")
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()  # starts the read snapshot
+        conn.backup(dest, pages=pages, progress=progress)
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        dest.close()
+    return total[0] if total else 0
+
+
+def _manifest_path(archive):
+    return archive[:-len(SNAPSHOT_SUFFIX)] + ".json"
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        json.dump(data, out, indent=2)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+
+
+def create_snapshot(conn=None, pages=BACKUP_PAGES_PER_STEP, pause=None):
+    """Write a compressed, checksummed snapshot of DATABASE; returns its manifest
+    
+    Opens its own connection unless one is given (it must not be in a
+    transaction). pause defaults to the BACKUP_STEP_PAUSE setting. Returns
+    None if another process is taking a snapshot.
+    The archive is synced and renamed into place before its manifest is
+    written, so a snapshot with a manifest is always complete.
+    """
+    if pause is None:
+        pause = app.config["BACKUP_STEP_PAUSE"]
+    directory = backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    lock = _acquire_lock_file(os.path.join(directory, "backup.lock"), BACKUP_LOCK_STALE)
+    if lock is None:
+        return None
+    
+    own_conn = conn is None
+    if own_conn:
+        conn = _connect()
+    created = datetime.now(timezone.utc)
+    name = f"{SNAPSHOT_PREFIX}{created.strftime('%Y%m%dT%H%M%S%fZ')}"
+    raw = os.path.join(directory, f"{name}.db.tmp")
+    archive = os.path.join(directory, name + SNAPSHOT_SUFFIX)
+    try:
+        start = time.perf_counter()
+        schema_version = get_schema_version(conn)
+        page_count = copy_database(conn, raw, pages, pause)
+        copied = time.perf_counter()
+        
+        digest = hashlib.sha256()
+        with open(raw, "rb") as src, open(f"{archive}.tmp", "wb") as out:
+            with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=BACKUP_GZIP_LEVEL, mtime=0) as gz:
+                for chunk in iter(lambda: src.read(BACKUP_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    gz.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(f"{archive}.tmp", archive)
+        manifest = {
+            "snapshot": name + SNAPSHOT_SUFFIX,
+            "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+            "database": os.path.basename(DATABASE),
+            "schema_version": schema_version,
+            "pages": page_count,
+            "size": os.path.getsize(raw),
+            "compressed_size": os.path.getsize(archive),
+            "sha256": digest.hexdigest(),
+            "copy_seconds": round(copied - start, 3),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        _write_json(_manifest_path(archive), manifest)
+        _fsync_dir(directory)
+        prune_snapshots()
+    finally:
+        for leftover in (raw, f"{archive}.tmp"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        if own_conn:
+            conn.close()
+        os.remove(lock)
+    
+    app.logger.info("Wrote snapshot %s (%d bytes from %d) in %.1fs", manifest["snapshot"],
+                    manifest["compressed_size"], manifest["size"], manifest["seconds"])
+    return manifest
+
+
+def list_snapshots():
+    """Manifests of the complete snapshots in backup_dir(), newest first"""
+    directory = backup_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for name in names:
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        try:
+            with open(_manifest_path(os.path.join(directory, name)), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (FileNotFoundError, ValueError):
+            continue  # interrupted before its manifest was written
+    snapshots.sort(key=lambda m: m["snapshot"], reverse=True)
+    return snapshots
+
+
+def prune_snapshots(keep_last=None, keep_daily=None):
+    """Delete snapshots outside the retention policy; returns their names
+    
+    The newest keep_last snapshots are kept, and the newest snapshot of each
+    of the last keep_daily days that have one.
+    """
+    if keep_last is None:
+        keep_last = app.config["BACKUP_KEEP_LAST"]
+    if keep_daily is None:
+        keep_daily = app.config["BACKUP_KEEP_DAILY"]
+    snapshots = list_snapshots()
+    keep = {m["snapshot"] for m in snapshots[:keep_last]}
+    newest_per_day = {}
+    for m in snapshots:
+        newest_per_day.setdefault(m["created_at"][:10], m["snapshot"])
+    keep.update(list(newest_per_day.values())[:keep_daily])
+    
+    removed = []
+    for m in snapshots:
+        if m["snapshot"] in keep:
+            continue
+        archive = os.path.join(backup_dir(), m["snapshot"])
+        os.remove(_manifest_path(archive))  # first, so a half-deleted snapshot is never listed
+        os.remove(archive)
+        removed.append(m["snapshot"])
+    return removed
+
+
+def find_snapshot(name):
+    """Manifest for a snapshot file name or path; "latest" is the newest"""
+    if name == "latest":
+        snapshots = list_snapshots()
+        if not snapshots:
+            raise SnapshotError(f"No snapshots in {backup_dir()}")
+        return snapshots[0], os.path.join(backup_dir(), snapshots[0]["snapshot"])
+    archive = name if os.path.dirname(name) else os.path.join(backup_dir(), name)
+    if not archive.endswith(SNAPSHOT_SUFFIX):
+        archive += SNAPSHOT_SUFFIX
+    try:
+        with open(_manifest_path(archive), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"{archive} has no manifest")
+    except ValueError:
+        raise SnapshotError(f"{_manifest_path(archive)} is not valid JSON")
+    if not os.path.exists(archive):
+        raise SnapshotError(f"{archive} not found")
+    return manifest, archive
+
+
+def verify_snapshot(archive, manifest, path):
+    """Decompress archive to path and check it; raises SnapshotError
+    
+    The bytes must match the manifest's SHA-256, and the database must pass
+    PRAGMA integrity_check and have a schema this application can run.
+    """
+    digest = hashlib.sha256()
+    try:
+        with gzip.open(archive, "rb") as src, open(path, "wb") as out:
+            for chunk in iter(lambda: src.read(BACKUP_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except (OSError, EOFError) as e:
+        raise SnapshotError(f"{os.path.basename(archive)} can't be decompressed: {e}")
+    if digest.hexdigest() != manifest["sha256"]:
+        raise SnapshotError(f"{os.path.basename(archive)} does not match its checksum")
+    
+    check = sqlite3.connect(path)
+    try:
+        problems = [row[0] for row in check.execute("PRAGMA integrity_check")]
+        version = get_schema_version(check)
+    except sqlite3.DatabaseError as e:
+        problems, version = [str(e)], 0
+    finally:
+        check.close()
+    if problems != ["ok"]:
+        raise SnapshotError(f"{os.path.basename(archive)} failed integrity_check: {'; '.join(problems[:5])}")
+    if version > SCHEMA_VERSION:
+        raise SnapshotError(f"Snapshot schema version {version} is newer than this application ({SCHEMA_VERSION})")
+
+
+def database_in_use(path):
+    """True if another connection has the database at path open"""
+    conn = sqlite3.connect(path, timeout=0)
+    try:
+        # In WAL mode every open connection holds a shared lock on the
+        # -shm file, so no other connection can take this one
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("BEGIN EXCLUSIVE")
+        conn.rollback()
+        return False
+    except sqlite3.DatabaseError as e:
+        return "locked" in str(e)  # anything else is damage restoring will replace
+    finally:
+        conn.close()
+
+
+def restore_snapshot(name):
+    """Replace DATABASE with a verified snapshot; returns (manifest, kept)
+    
+    The app must be stopped. The snapshot is decompressed and checked next
+    to DATABASE, then renamed over it, so the database file is always
+    either the old one or the complete new one. The replaced database (and
+    its WAL, if not checkpointed) is kept as kept.
+    """
+    manifest, archive = find_snapshot(name)
+    target = os.path.abspath(DATABASE)
+    directory = os.path.dirname(target)
+    tmp = f"{target}.restore.tmp"
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    kept = f"{target}.pre-restore-{stamp}.bak"
+    if os.path.exists(target) and database_in_use(target):
+        raise SnapshotError(f"{DATABASE} is open in another process; stop the app first")
+    try:
+        verify_snapshot(archive, manifest, tmp)
+        if os.path.exists(target):
+            conn = sqlite3.connect(target)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            except sqlite3.DatabaseError:
+                pass  # damaged; the WAL is kept alongside it below
+            finally:
+                conn.close()
+            try:
+                os.link(target, kept)
+            except OSError:  # no hard links on this filesystem
+                shutil.copy2(target, kept)
+            if os.path.exists(f"{target}-wal"):
+                os.replace(f"{target}-wal", f"{kept}-wal")
+        else:
+            kept = None
+        os.replace(tmp, target)
+        if os.path.exists(f"{target}-shm"):
+            os.remove(f"{target}-shm")
+        _fsync_dir(directory)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    invalidate_dashboard_cache()
+    app.logger.info("Restored %s from %s", DATABASE, manifest["snapshot"])
+    return manifest, kept
+
+
+_backup_thread = None
+
+
+def _run_backups():
+    interval = app.config["BACKUP_INTERVAL"]
+    while True:
+        time.sleep(interval)
+        try:
+            latest = list_snapshots()[:1]
+            if latest:
+                taken = datetime.strptime(latest[0]["created_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+                if (datetime.now(timezone.utc) - taken).total_seconds() < interval / 2:
+                    continue  # another worker took this one
+            create_snapshot()
+        except (OSError, sqlite3.Error):
+            app.logger.exception("Snapshot failed")
+
+
+def start_backup_scheduler():
+    """Take a snapshot every BACKUP_INTERVAL seconds in a daemon thread
+    
+    Every worker runs one; the lock file in backup_dir() lets one of them
+    take each snapshot.
+    """
+    global _backup_thread
+    if app.config["BACKUP_INTERVAL"] <= 0 or _backup_thread is not None:
+        return
+    _backup_thread = threading.Thread(target=_run_backups, name="database-backups", daemon=True)
+    _backup_thread.start()
+
+
+# Storage backends. Views reach rooms, bookings, the activity log and users
+# through get_repo(), so the same views run on the local SQLite file or on a
+# PostgreSQL server shared by several app nodes. Rates, reports, bulk
+# import/export and backups still work on SQLite only.
+class StorageBusy(Exception):
+    """The database could not take the write right now; safe to retry"""
+
+
+class SQLiteRepository:
+    """Rooms, bookings, activity log and users in the local SQLite file
+
+    A thin layer over the query and transaction helpers above, bound to the
+    request's pooled connection.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _write(self, fn, *args):
+        try:
+            return fn(self.conn, *args)
+        except sqlite3.OperationalError as e:
+            # Still locked after run_transaction's retries; anything else is a real fault
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            raise StorageBusy(str(e)) from e
+
+    # Rooms
+    def rooms_overview(self, room_id=None):
+        return get_rooms_overview(self.conn, room_id)
+
+    def room_stats(self):
+        return get_room_stats(self.conn)
+
+    def available_rooms(self, check_in, check_out):
+        return get_available_rooms(self.conn, check_in, check_out)
+
+    def room_types(self):
+        return get_room_types(self.conn)
+
+    def search_availability(self, check_in, check_out, guests=1):
+        return search_availability(self.conn, check_in, check_out, guests)
+
+    # Bookings
+    def active_bookings(self):
+        return get_active_bookings(self.conn)
+
+    def list_bookings(self, status, before, limit):
+        return list_bookings(self.conn, status, before, limit)
+
+    def get_booking(self, booking_id):
+        return _get_booking(self.conn, booking_id)
+
+    def create_booking(self, guest_name, room_id, check_in, check_out, user):
+        return self._write(create_booking, guest_name, room_id, check_in, check_out, user)
+
+    def book_room_type(self, guest_name, room_type, check_in, check_out, user, guests=1):
+        return self._write(book_room_type, guest_name, room_type, check_in, check_out, user, guests)
+
+    def check_in(self, booking_id, user):
+        return self._write(check_in_booking, booking_id, user)
+
+    def check_out(self, booking_id, user):
+        return self._write(check_out_booking, booking_id, user)
+
+    def data_version(self):
+        """The data_version row, re-read only once another connection has committed
+
+        PRAGMA data_version changes when any other connection, in this
+        process or another, commits to the database, and reads no table.
+        """
+        marker = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = self.conn.data_version_seen
+        if seen is None or seen[0] != marker:
+            seen = self.conn.data_version_seen = (marker, get_data_version(self.conn))
+        return seen[1]
+
+    # Activity log
+    def log_activity(self, user, action, details=""):
+        """Insert and commit a log row, or queue it with ASYNC_ACTIVITY_LOG"""
+        if ASYNC_ACTIVITY_LOG:
+            activity_log_writer.submit(user, action, details)
+            return
+        try:
+            write_activity(self.conn, user, action, details)
+            self.conn.commit()
+        except sqlite3.OperationalError:
+            # Table might not exist yet, skip logging
+            pass
+
+    def query_logs(self, **filters):
+        return query_activity_logs(self.conn, **filters)
+
+    # Users
+    def get_user(self, username):
+        return self.conn.execute(
+            "SELECT id, password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+
+    def set_password_hash(self, user_id, password_hash):
+        self.conn.execute("UPDATE users SET password = ? WHERE id = ?", (password_hash, user_id))
+        self.conn.commit()
+
+
+_pg_pools = {}
+_pg_pools_lock = threading.Lock()
+
+POSTGRES_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        created_at TIMESTAMP(0) NOT NULL DEFAULT LOCALTIMESTAMP(0)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rooms (
+        id BIGSERIAL PRIMARY KEY,
+        room_number TEXT UNIQUE NOT NULL,
+        room_type TEXT NOT NULL DEFAULT 'Standard',
+        created_at TIMESTAMP(0) NOT NULL DEFAULT LOCALTIMESTAMP(0)
+    )
+    """,
+    # The exclusion constraint rejects overlapping active stays of a room
+    # inside the database, whichever node inserts them
+    """
+    CREATE TABLE IF NOT EXISTS bookings (
+        id BIGSERIAL PRIMARY KEY,
+        guest_name TEXT NOT NULL,
+        room_id BIGINT NOT NULL REFERENCES rooms(id),
+        check_in DATE NOT NULL,
+        check_out DATE NOT NULL,
+        status TEXT NOT NULL DEFAULT 'Booked',
+        created_at TIMESTAMP(0) NOT NULL DEFAULT LOCALTIMESTAMP(0),
+        CHECK (check_out > check_in),
+        CONSTRAINT bookings_no_overlap EXCLUDE USING gist (
+            room_id WITH =, daterange(check_in, check_out) WITH &&
+        ) WHERE (status IN ('Booked', 'Checked In'))
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_bookings_room_status_dates
+    ON bookings (room_id, status, check_in, check_out)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS activity_logs (
+        id BIGSERIAL PRIMARY KEY,
+        action TEXT NOT NULL,
+        details TEXT,
+        "user" TEXT,
+        "timestamp" TIMESTAMP(0) NOT NULL DEFAULT (date_trunc('second', now() AT TIME ZONE 'utc'))
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS idx_activity_logs_timestamp ON activity_logs ("timestamp", id)',
+    'CREATE INDEX IF NOT EXISTS idx_activity_logs_user ON activity_logs ("user", "timestamp", id)',
+    'CREATE INDEX IF NOT EXISTS idx_activity_logs_action ON activity_logs (action, "timestamp", id)',
+    """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version BIGINT NOT NULL
+    )
+    """,
+    "INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT DO NOTHING",
+    """
+    CREATE TABLE IF NOT EXISTS room_types (
+        name TEXT PRIMARY KEY,
+        capacity INTEGER NOT NULL DEFAULT 2,
+        description TEXT NOT NULL DEFAULT ''
+    )
+    """,
+    "INSERT INTO room_types (name) SELECT DISTINCT room_type FROM rooms ON CONFLICT DO NOTHING",
+    "INSERT INTO room_types (name) VALUES ('Standard') ON CONFLICT DO NOTHING",
+    "CREATE INDEX IF NOT EXISTS idx_rooms_type ON rooms (room_type, room_number)",
+]
+
+# Dates and timestamps come back as text, matching what SQLite returns
+_PG_BOOKING_COLUMNS = """
+    b.id, b.guest_name, b.room_id, b.check_in::text AS check_in,
+    b.check_out::text AS check_out, b.status, b.created_at::text AS created_at
+"""
+
+
+class PostgresRepository:
+    """Rooms, bookings, activity log and users in a shared PostgreSQL database
+
+    Connections come from a psycopg_pool pool shared by the process; each
+    write is one transaction. Overlapping active bookings are rejected by
+    the bookings_no_overlap exclusion constraint, so app nodes need no
+    shared lock. Room status is derived from bookings on read.
+    """
+
+    def __init__(self, dsn, pool_size):
+        if psycopg is None:
+            raise RuntimeError('STORAGE_BACKEND "postgres" needs: pip install "psycopg[binary]" psycopg_pool')
+        with _pg_pools_lock:
+            pool = _pg_pools.get(dsn)
+            if pool is None:
+                pool = ConnectionPool(
+                    dsn, min_size=1, max_size=pool_size,
+                    kwargs={"row_factory": dict_row}, open=True,
+                )
+                _pg_pools[dsn] = pool
+        self.pool = pool
+
+    def _read(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _transaction(self, fn, *args):
+        """Run fn(conn, *args) in one transaction; lost connections are StorageBusy"""
+        try:
+            with self.pool.connection() as conn:
+                with conn.transaction():
+                    return fn(conn, *args)
+        except psycopg.OperationalError as e:
+            raise StorageBusy(str(e)) from e
+
+    @staticmethod
+    def _bump_version(conn):
+        conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+        if has_app_context():
+            g.pop("_data_version", None)
+
+    @staticmethod
+    def _log(conn, user, action, details):
+        conn.execute(
+            'INSERT INTO activity_logs (action, details, "user") VALUES (%s, %s, %s)',
+            (action, details, user),
+        )
+
+    def create_schema(self):
+        """Create tables, constraints and seed data; safe to run on every node"""
+        def txn(conn):
+            # Serialise nodes starting at the same time
+            conn.execute("SELECT pg_advisory_xact_lock(hashtext('hotel-schema'))")
+            for statement in POSTGRES_SCHEMA:
+                conn.execute(statement)
+            if conn.execute("SELECT 1 FROM users WHERE username = 'admin'").fetchone() is None:
+                conn.execute(
+                    "INSERT INTO users (username, password) VALUES (%s, %s)",
+                    ("admin", hash_password("admin123")),
+                )
+                self._log(conn, "System", "System", "Default admin user created")
+            if conn.execute("SELECT 1 FROM rooms LIMIT 1").fetchone() is None:
+                for number in ("101", "102", "103", "201", "202", "301", "302", "401"):
+                    conn.execute("INSERT INTO rooms (room_number) VALUES (%s)", (number,))
+                self._log(conn, "System", "System", "Sample rooms initialized")
+        
+        self._transaction(txn)
+
+    # Rooms
+    def rooms_overview(self, room_id=None):
+        return self._read(f"""
+            SELECT r.id, r.room_number, r.room_type, r.created_at::text AS created_at,
+                   CASE b.status WHEN 'Checked In' THEN 'Occupied'
+                                 WHEN 'Booked' THEN 'Booked'
+                                 ELSE 'Available' END AS status,
+                   b.id AS booking_id, b.guest_name,
+                   b.check_in::text AS check_in, b.check_out::text AS check_out,
+                   b.status AS booking_status
+            FROM rooms r
+            LEFT JOIN LATERAL (
+                SELECT * FROM bookings
+                WHERE room_id = r.id
+                AND (status = 'Checked In'
+                     OR (status = 'Booked' AND check_in <= %(today)s AND check_out > %(today)s))
+                ORDER BY status = 'Checked In' DESC, check_in DESC
+                LIMIT 1
+            ) b ON true
+            {"WHERE r.id = %(room_id)s" if room_id is not None else ""}
+            ORDER BY r.room_number
+        """, {"today": date.today(), "room_id": room_id})
+
+    def room_stats(self):
+        rooms = self.rooms_overview()
+        return {
+            "total_rooms": len(rooms),
+            "available_rooms": sum(r["status"] == "Available" for r in rooms),
+            "booked_rooms": sum(r["status"] == "Booked" for r in rooms),
+            "occupied_rooms": sum(r["status"] == "Occupied" for r in rooms),
+            "turnover_rooms": 0,  # housekeeping is SQLite-only
+        }
+
+    def available_rooms(self, check_in, check_out):
+        return self._read("""
+            SELECT r.id, r.room_number, r.room_type FROM rooms r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.room_id = r.id
+                AND b.status IN ('Booked', 'Checked In')
+                AND daterange(b.check_in, b.check_out) && daterange(%s::date, %s::date)
+            )
+            ORDER BY r.room_number
+        """, (check_in, check_out))
+
+    def room_types(self):
+        return self._read("""
+            SELECT t.name, t.capacity, t.description,
+                   (SELECT COUNT(*) FROM rooms r WHERE r.room_type = t.name) AS inventory
+            FROM room_types t
+            ORDER BY t.capacity, t.name
+        """)
+
+    def search_availability(self, check_in, check_out, guests=1):
+        """Same result as search_availability(); nights are counted from bookings on read"""
+        rows = self._read("""
+            SELECT t.name, t.capacity, t.description,
+                   (SELECT COUNT(*) FROM rooms r WHERE r.room_type = t.name) AS inventory,
+                   (SELECT COALESCE(MAX(sold), 0) FROM (
+                        SELECT COUNT(*) AS sold
+                        FROM bookings b
+                        JOIN rooms r ON r.id = b.room_id
+                        CROSS JOIN generate_series(
+                            GREATEST(b.check_in, %(check_in)s::date),
+                            LEAST(b.check_out, %(check_out)s::date) - 1,
+                            interval '1 day'
+                        ) AS night
+                        WHERE r.room_type = t.name
+                        AND b.status IN ('Booked', 'Checked In')
+                        AND daterange(b.check_in, b.check_out) && daterange(%(check_in)s::date, %(check_out)s::date)
+                        GROUP BY night
+                   ) nights) AS peak_sold
+            FROM room_types t
+            WHERE t.capacity >= %(guests)s
+            ORDER BY t.capacity, t.name
+        """, {"check_in": check_in, "check_out": check_out, "guests": guests})
+        return [{**row, "available": max(row["inventory"] - row["peak_sold"], 0)} for row in rows]
+
+    # Bookings
+    def active_bookings(self):
+        return self._read(f"""
+            SELECT {_PG_BOOKING_COLUMNS}, r.room_number
+            FROM bookings b
+            JOIN rooms r ON b.room_id = r.id
+            WHERE b.status IN ('Booked', 'Checked In')
+            ORDER BY b.check_in ASC
+        """)
+
+    def list_bookings(self, status, before, limit):
+        clauses = []
+        params = []
+        if status:
+            clauses.append("b.status = %s")
+            params.append(status)
+        if before:
+            clauses.append("b.id < %s")
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._read(f"""
+            SELECT {_PG_BOOKING_COLUMNS}, r.room_number
+            FROM bookings b
+            JOIN rooms r ON b.room_id = r.id
+            {where}
+            ORDER BY b.id DESC
+            LIMIT %s
+        """, (*params, limit))
+
+    @staticmethod
+    def _get_booking(conn, booking_id, lock=False):
+        return conn.execute(f"""
+            SELECT {_PG_BOOKING_COLUMNS}, r.room_number
+            FROM bookings b
+            JOIN rooms r ON b.room_id = r.id
+            WHERE b.id = %s
+            {"FOR UPDATE OF b" if lock else ""}
+        """, (booking_id,)).fetchone()
+
+    def get_booking(self, booking_id):
+        with self.pool.connection() as conn:
+            return self._get_booking(conn, booking_id)
+
+    def _publish_change(self, booking_id):
+        booking = self.get_booking(booking_id)
+        if booking is None:
+            return
+        events.publish("booking", booking)
+        room = self.rooms_overview(booking["room_id"])
+        if room:
+            events.publish("room", room[0])
+        events.publish("stats", self.room_stats())
+
+    def create_booking(self, guest_name, room_id, check_in, check_out, user):
+        """Book a room; returns (room, booking_id) like create_booking()"""
+        details = f"booked for {guest_name} ({check_in} to {check_out})"
+        
+        def txn(conn):
+            try:
+                room_key = int(room_id)
+            except (TypeError, ValueError):
+                raise BookingNotFound("Room not found") from None
+            # Locking the room row serialises bookings of one room across nodes
+            room = conn.execute(
+                "SELECT id, room_number FROM rooms WHERE id = %s FOR UPDATE", (room_key,)
+            ).fetchone()
+            if room is None:
+                raise BookingNotFound("Room not found")
+            if check_in <= date.today().isoformat() and conn.execute(
+                "SELECT 1 FROM bookings WHERE room_id = %s AND status = 'Checked In'", (room_key,)
+            ).fetchone():
+                raise BookingError(f"Room {room['room_number']} is not available")
+            try:
+                booking_id = conn.execute("""
+                    INSERT INTO bookings (guest_name, room_id, check_in, check_out, status)
+                    VALUES (%s, %s, %s, %s, 'Booked')
+                    RETURNING id
+                """, (guest_name, room_key, check_in, check_out)).fetchone()["id"]
+            except psycopg.errors.ExclusionViolation:
+                raise BookingError(f"Room {room['room_number']} is already booked for the selected dates") from None
+            self._bump_version(conn)
+            self._log(conn, user, "Booking Created", f"Room {room['room_number']} {details}")
+            return room, booking_id
+        
+        room, booking_id = self._transaction(txn)
+        self._publish_change(booking_id)
+        publish_log(user, "Booking Created", f"Room {room['room_number']} {details}")
+        return room, booking_id
+
+    def book_room_type(self, guest_name, room_type, check_in, check_out, user, guests=1):
+        """Book the best-fitting free room of room_type, like book_room_type()
+
+        Candidates are tried in best-fit order; one taken by another node
+        in the meantime is rejected by the exclusion constraint and the
+        next is tried.
+        """
+        types = {t["name"]: t for t in self.room_types()}
+        if room_type not in types:
+            raise BookingNotFound("Room type not found")
+        if types[room_type]["capacity"] < guests:
+            raise BookingError(f"A {room_type} room sleeps at most {types[room_type]['capacity']}")
+        candidates = self._read("""
+            SELECT r.id, r.room_number, r.room_type,
+                   (SELECT MAX(b.check_out)::text FROM bookings b
+                    WHERE b.room_id = r.id AND b.status IN ('Booked', 'Checked In')
+                    AND b.check_out <= %(check_in)s::date) AS free_from,
+                   (SELECT MIN(b.check_in)::text FROM bookings b
+                    WHERE b.room_id = r.id AND b.status IN ('Booked', 'Checked In')
+                    AND b.check_in >= %(check_out)s::date) AS free_until
+            FROM rooms r
+            WHERE r.room_type = %(room_type)s
+            AND NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.room_id = r.id
+                AND b.status IN ('Booked', 'Checked In')
+                AND daterange(b.check_in, b.check_out) && daterange(%(check_in)s::date, %(check_out)s::date)
+            )
+        """, {"check_in": check_in, "check_out": check_out, "room_type": room_type})
+        for room in rank_best_fit(candidates, check_in, check_out):
+            try:
+                return self.create_booking(guest_name, room["id"], check_in, check_out, user)
+            except BookingError:
+                continue  # taken since the candidates were read, or its guest overstayed
+        raise BookingError(f"No {room_type} room is free for the selected dates")
+
+    def _transition(self, booking_id, user, allowed, new_status, action, verb):
+        def txn(conn):
+            booking = self._get_booking(conn, booking_id, lock=True)
+            if not booking:
+                raise BookingNotFound("Booking not found")
+            if booking["status"] not in allowed:
+                raise BookingError(f"This booking cannot be {verb}")
+            conn.execute("UPDATE bookings SET status = %s WHERE id = %s", (new_status, booking_id))
+            self._bump_version(conn)
+            self._log(conn, user, action,
+                      f"Room {booking['room_number']} {verb} for {booking['guest_name']}")
+            return booking
+        
+        booking = self._transaction(txn)
+        self._publish_change(booking_id)
+        publish_log(user, action, f"Room {booking['room_number']} {verb} for {booking['guest_name']}")
+        return booking
+
+    def check_in(self, booking_id, user):
+        return self._transition(booking_id, user, ("Booked",), "Checked In", "Check-In", "checked in")
+
+    def check_out(self, booking_id, user):
+        return self._transition(booking_id, user, ("Booked", "Checked In"), "Completed", "Check-Out", "checked out")
+
+    def data_version(self):
+        return self._read("SELECT version FROM data_version WHERE id = 1")[0]["version"]
+
+    # Activity log
+    def log_activity(self, user, action, details=""):
+        self._transaction(self._log, user, action, details)
+
+    def query_logs(self, user=None, action=None, since=None, until=None,
+                   cursor=None, limit=LOGS_PAGE_SIZE, include_archived=False):
+        """Same paging as query_activity_logs(); nothing is archived here"""
+        clauses = []
+        params = []
+        if user:
+            clauses.append('"user" = %s')
+            params.append(user)
+        if action:
+            clauses.append("action = %s")
+            params.append(action)
+        if since:
+            clauses.append('"timestamp" >= %s')
+            params.append(since)
+        if until:
+            clauses.append('"timestamp" < %s')
+            params.append(until + timedelta(days=1))
+        if cursor:
+            clauses.append('("timestamp", id) < (%s::timestamp, %s)')
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._read(f"""
+            SELECT id, action, details, "user", "timestamp"::text AS "timestamp"
+            FROM activity_logs
+            {where}
+            ORDER BY "timestamp" DESC, id DESC
+            LIMIT %s
+        """, (*params, limit + 1))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['timestamp']},{rows[-1]['id']}"
+        return rows, next_cursor
+
+    # Users
+    def get_user(self, username):
+        rows = self._read("SELECT id, password FROM users WHERE username = %s", (username,))
+        return rows[0] if rows else None
+
+    def set_password_hash(self, user_id, password_hash):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE users SET password = %s WHERE id = %s", (password_hash, user_id)
+        ))
+
+
+def get_repo():
+    """Repository for the configured STORAGE_BACKEND, one per request"""
+    repo = g.get("_repo") if has_app_context() else None
+    if repo is None:
+        if app.config["STORAGE_BACKEND"] == "postgres":
+            repo = PostgresRepository(app.config["POSTGRES_DSN"], app.config["POSTGRES_POOL_SIZE"])
+        else:
+            repo = SQLiteRepository(get_db())
+        if has_app_context():
+            g._repo = repo
+    return repo
+
+
+def sqlite_backend_required(f):
+    """Answer 501 for features that exist only on the SQLite backend"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if app.config["STORAGE_BACKEND"] != "sqlite":
+            return api_error("Not available with the configured storage backend", 501)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# Password hashing. Changing the cost rehashes each password at its next login.
+PASSWORD_SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", 2 ** 14))
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_PBKDF2_ITERATIONS = 600000  # used where hashlib.scrypt is unavailable
+PASSWORD_SALT_BYTES = 16
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _derive(scheme, params, password, salt):
+    if scheme == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0])
+
+
+def _current_hash_params():
+    if hasattr(hashlib, "scrypt"):
+        return "scrypt", (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return "pbkdf2_sha256", (PASSWORD_PBKDF2_ITERATIONS,)
+
+
+def hash_password(password):
+    """Return a salted hash of password, formatted scheme$params$salt$hash"""
+    scheme, params = _current_hash_params()
+    salt = os.urandom(PASSWORD_SALT_BYTES)
+    key = _derive(scheme, params, password, salt)
+    return "$".join([scheme, ",".join(map(str, params)), _b64(salt), _b64(key)])
+
+
+def is_password_hash(stored):
+    return stored.split("$", 1)[0] in ("scrypt", "pbkdf2_sha256") and stored.count("$") == 3
+
+
+def verify_password(stored, password):
+    """Check password against a stored hash in constant time"""
+    if not is_password_hash(stored):
+        # Plain text left over from before hashing; rehashed on login
+        return hmac.compare_digest(stored.encode(), password.encode())
+    scheme, params, salt, key = stored.split("$")
+    try:
+        derived = _derive(scheme, tuple(int(p) for p in params.split(",")), password, _unb64(salt))
+    except ValueError:
+        return False
+    return hmac.compare_digest(derived, _unb64(key))
+
+
+def password_needs_rehash(stored):
+    """True if stored was hashed with a different scheme or cost than today's"""
+    if not is_password_hash(stored):
+        return True
+    scheme, params = _current_hash_params()
+    return stored.split("$")[:2] != [scheme, ",".join(map(str, params))]
+
+
+_dummy_password_hash = None
+
+
+def _dummy_hash():
+    """Hash checked for unknown usernames so they take as long as known ones"""
+    global _dummy_password_hash
+    if _dummy_password_hash is None or password_needs_rehash(_dummy_password_hash):
+        _dummy_password_hash = hash_password(_b64(os.urandom(16)))
+    return _dummy_password_hash
+
+
+# Login rate limiting: token buckets per username and per client address
+LOGIN_USER_BURST = 5             # attempts allowed back to back per username
+LOGIN_USER_REFILL = 5 / 60       # ...then this many per second
+LOGIN_IP_BURST = 20
+LOGIN_IP_REFILL = 1.0
+LOGIN_BUCKETS_MAX = 10000        # idle buckets are pruned beyond this
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets keyed by an arbitrary hashable
+
+    Each key starts with `burst` tokens and regains `refill` per second.
+    State is per process, so with several workers the effective limit is
+    multiplied by the worker count.
+    """
+
+    def __init__(self, burst, refill, max_keys=LOGIN_BUCKETS_MAX):
+        self.burst = burst
+        self.refill = refill
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, last update)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.refill)
+
+    def acquire(self, key):
+        """Take a token for key; returns 0 on success, else seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.refill
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now):
+        # Buckets that have refilled completely behave like missing ones
+        for key in [k for k in self._buckets if self._tokens(k, now) >= self.burst]:
+            del self._buckets[key]
+
+
+login_user_limiter = TokenBucketLimiter(LOGIN_USER_BURST, LOGIN_USER_REFILL)
+login_ip_limiter = TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_REFILL)
+
+
+def login_retry_after(username, address):
+    """Charge one login attempt; returns 0 if allowed, else seconds to wait"""
+    wait = login_ip_limiter.acquire(address)
+    if wait:
+        return wait
+    return login_user_limiter.acquire(username.lower())
+
+
+def authenticate(repo, username, password):
+    """Return True if the credentials match, upgrading the stored hash if needed"""
+    user = repo.get_user(username)
+    if user is None:
+        verify_password(_dummy_hash(), password)
+        return False
+    if not verify_password(user["password"], password):
+        return False
+    if password_needs_rehash(user["password"]):
+        repo.set_password_hash(user["id"], hash_password(password))
+    return True
+
+
+def login_required(f):
+    """Decorator to protect routes requiring authentication"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if "user" not in session:
+            return redirect(url_for("login"))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@app.route("/", methods=["GET", "POST"])
+def login():
+    """Handle user login"""
+    if "user" in session:
+        return redirect(url_for("dashboard"))
+    
+    if request.method == "POST":
+        username = request.form.get("username", "").strip()
+        password = request.form.get("password", "").strip()
+        
+        if not username or not password:
+            flash("Please enter both username and password", "error")
+            return render_template("login.html")
+        
+        # Throttled attempts are turned away before any hashing or database work
+        wait = login_retry_after(username, request.remote_addr or "")
+        if wait:
+            flash(f"Too many login attempts, please try again in {int(wait) + 1} seconds", "error")
+            return render_template("login.html"), 429, {"Retry-After": str(int(wait) + 1)}
+        
+        if authenticate(get_repo(), username, password):
+            session["user"] = username
+            log_activity(username, "Login", f"User {username} logged in")
+            flash("Login successful!", "success")
+            return redirect(url_for("dashboard"))
+        else:
+            flash("Invalid username or password", "error")
+    
+    return render_template("login.html")
+
+
+@app.route("/logout")
 @login_required
-def checkin(booking_id):
-    """Handle check-in"""
-    conn = get_db()
+def logout():
+    """Handle user logout"""
+    username = session.get("user", "Unknown")
+    session.clear()
+    log_activity(username, "Logout", f"User {username} logged out")
+    flash("You have been logged out", "info")
+    return redirect(url_for("login"))
+
+
+# Request profiling settings
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SERVER_TIMING_MAX_QUERIES = 20   # per-statement entries in the Server-Timing header
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _metric_add(name, labels, value):
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        _metrics[key] = _metrics.get(key, 0) + value
+
+
+def record_query(sql, elapsed):
+    """Record one statement's execution time against the current request
+
+    Times the execute() call, which includes stepping to the first row but
+    not fetching the rest. Statements slower than SLOW_QUERY_MS are logged.
+    """
+    statement = " ".join(sql.split())
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _metric_add("hotel_slow_queries_total", {}, 1)
+        app.logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement[:500])
+    if has_app_context():
+        profile = g.get("_profile")
+        if profile is not None:
+            profile["queries"].append((statement, elapsed))
+            profile["db"] += elapsed
+
+
+@app.before_request
+def start_profile():
+    if PROFILE_REQUESTS:
+        g._profile = {"start": time.perf_counter(), "queries": [], "db": 0.0, "render": 0.0}
+
+
+@before_render_template.connect_via(app)
+def _template_render_started(sender, template, context, **extra):
+    profile = g.get("_profile")
+    if profile is not None:
+        profile["render_start"] = time.perf_counter()
+
+
+@template_rendered.connect_via(app)
+def _template_render_finished(sender, template, context, **extra):
+    profile = g.get("_profile")
+    if profile is not None and "render_start" in profile:
+        profile["render"] += time.perf_counter() - profile.pop("render_start")
+
+
+@app.after_request
+def finish_profile(response):
+    """Add a Server-Timing header and update the /metrics counters"""
+    profile = g.get("_profile")
+    if profile is None:
+        return response
+    total = time.perf_counter() - profile["start"]
+    endpoint = request.endpoint or "unknown"
+    
+    timings = [
+        f'db;dur={profile["db"] * 1000:.2f};desc="{len(profile["queries"])} queries"',
+        f'tpl;dur={profile["render"] * 1000:.2f}',
+        f'total;dur={total * 1000:.2f}',
+    ]
+    for n, (statement, elapsed) in enumerate(profile["queries"][:SERVER_TIMING_MAX_QUERIES]):
+        desc = statement[:60].replace('"', "'").replace("\\", "/")
+        timings.append(f'q{n};dur={elapsed * 1000:.2f};desc="{desc}"')
+    response.headers["Server-Timing"] = ", ".join(timings)
+    
+    labels = {"endpoint": endpoint}
+    _metric_add("hotel_http_requests_total",
+                {**labels, "method": request.method, "status": str(response.status_code)}, 1)
+    _metric_add("hotel_http_request_duration_seconds_sum", labels, total)
+    _metric_add("hotel_http_request_duration_seconds_count", labels, 1)
+    _metric_add("hotel_db_queries_total", labels, len(profile["queries"]))
+    _metric_add("hotel_db_time_seconds_total", labels, profile["db"])
+    _metric_add("hotel_template_render_seconds_total", labels, profile["render"])
+    return response
+
+
+def render_metrics():
+    """Format the collected counters in the Prometheus text format"""
+    with _metrics_lock:
+        samples = sorted(_metrics.items())
+    gauges = {
+        "hotel_activity_log_queue_depth": activity_log_writer.metrics()["queue_depth"],
+        "hotel_activity_log_dropped_total": activity_log_writer.metrics()["dropped"],
+        "hotel_event_subscribers": len(events._subscribers),
+    }
+    lines = []
+    seen = set()
+    for (name, labels), value in samples:
+        base = name.rsplit("_sum", 1)[0].rsplit("_count", 1)[0] if name.endswith(("_sum", "_count")) else name
+        if base not in seen:
+            seen.add(base)
+            kind = "summary" if base != name else ("counter" if name.endswith("_total") else "gauge")
+            lines.append(f"# TYPE {base} {kind}")
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Static assets. `flask build-assets` compiles static/src/app.css with the
+# Tailwind CLI into static/dist/, naming the file after a hash of its
+# contents. A changed stylesheet gets a new URL, so built files are cached
+# by browsers for a year. The build output is committed; serving the app
+# needs neither Node nor a CDN.
+TAILWIND_CLI = os.environ.get("TAILWIND_CLI", "tailwindcss")  # e.g. from `pip install tailwindcss-bin`
+ASSET_DIR = "dist"                  # build output, under the static folder
+ASSET_MAX_AGE = 365 * 24 * 3600     # seconds; fingerprinted files never change
+
+# Response compression, applied when the COMPRESS_RESPONSES setting is on
+COMPRESS_MIN_SIZE = 512             # bytes; smaller bodies aren't worth it
+COMPRESS_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/csv",
+    "application/json", "application/javascript", "image/svg+xml",
+}
+GZIP_LEVEL = 6                      # per response; assets use the maximum, once
+BROTLI_QUALITY = 5
+
+_asset_manifest = None
+_compressed_assets = {}             # (filename, encoding) -> compressed bytes
+
+
+def asset_manifest():
+    """Map of asset names to their fingerprinted files, read once"""
+    global _asset_manifest
+    if _asset_manifest is None:
+        try:
+            with open(os.path.join(app.static_folder, ASSET_DIR, "manifest.json"), encoding="utf-8") as f:
+                _asset_manifest = json.load(f)
+        except FileNotFoundError:
+            _asset_manifest = {}
+    return _asset_manifest
+
+
+@app.template_global()
+def asset_url(name):
+    """URL of the current build of a static asset, e.g. asset_url("app.css")"""
+    return url_for("static", filename=f"{ASSET_DIR}/{asset_manifest().get(name, name)}")
+
+
+def build_assets():
+    """Compile, minify and fingerprint the stylesheet; returns the manifest
+
+    Tailwind emits only the utilities used in templates/. Earlier builds
+    are removed from static/dist.
+    """
+    global _asset_manifest
+    css = subprocess.run(
+        [*shlex.split(TAILWIND_CLI), "--input", os.path.join(app.static_folder, "src", "app.css"), "--minify"],
+        cwd=app.root_path, check=True, capture_output=True,
+    ).stdout
+    name = f"app.{hashlib.sha256(css).hexdigest()[:12]}.css"
+    out_dir = os.path.join(app.static_folder, ASSET_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    for old in os.listdir(out_dir):
+        if old.startswith("app.") and old.endswith(".css") and old != name:
+            os.remove(os.path.join(out_dir, old))
+    with open(os.path.join(out_dir, name), "wb") as f:
+        f.write(css)
+    manifest = {"app.css": name}
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    _asset_manifest = manifest
+    _compressed_assets.clear()
+    return manifest
+
+
+def _compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def _compressed_asset(filename, encoding):
+    """Compressed bytes of a fingerprinted asset, built once per process"""
+    key = (filename, encoding)
+    body = _compressed_assets.get(key)
+    if body is None:
+        with open(os.path.join(app.static_folder, filename), "rb") as f:
+            body = _compressed_assets[key] = _compress(f.read(), encoding, best=True)
+    return body
+
+
+@app.after_request
+def compress_response(response):
+    """Cache fingerprinted assets for good and gzip/brotli text responses
+
+    Streamed responses (exports, live events) pass through untouched.
+    Compressed responses get a weak ETag, which still matches
+    If-None-Match, as the bytes differ from the uncompressed ones.
+    """
+    filename = (request.view_args or {}).get("filename", "") if request.endpoint == "static" else None
+    fingerprinted = filename is not None and filename[len(ASSET_DIR) + 1:] in asset_manifest().values()
+    if fingerprinted:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    
+    if (not app.config["COMPRESS_RESPONSES"] or response.status_code != 200
+            or response.mimetype not in COMPRESS_MIMETYPES or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli else ["gzip"])
+    if encoding is None:
+        return response
+    
+    if fingerprinted:
+        body = _compressed_asset(filename, encoding)
+        response.close()
+    elif response.is_streamed or response.direct_passthrough:
+        return response
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        body = _compress(data, encoding)
+    response.direct_passthrough = False
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# Dashboard cache settings
+DASHBOARD_CACHE_TTL = 5  # seconds; bounds staleness from writes that don't invalidate
+
+_dashboard_cache = {}
+_dashboard_cache_generation = 0
+_dashboard_cache_lock = threading.Lock()
+
+
+def invalidate_dashboard_cache():
+    """Drop cached dashboard data after a booking state change"""
+    global _dashboard_cache_generation
+    with _dashboard_cache_lock:
+        _dashboard_cache.clear()
+        _dashboard_cache_generation += 1
+
+
+def load_dashboard_data(repo):
+    """Run the dashboard queries and return the template context"""
+    # Get room statistics
+    stats = repo.room_stats()
+    
+    # Get active bookings
+    active_bookings = repo.active_bookings()
+    
+    # Get all rooms with their current booking status
+    rooms = repo.rooms_overview()
+    
+    # Get recent activity logs
+    recent_logs, _ = repo.query_logs(limit=10)
+    
+    return {
+        "total_rooms": stats["total_rooms"],
+        "available_rooms": stats["available_rooms"],
+        "booked_rooms": stats["booked_rooms"],
+        "occupied_rooms": stats["occupied_rooms"],
+        "turnover_rooms": stats["turnover_rooms"],
+        "active_bookings": active_bookings,
+        "rooms": rooms,
+        "recent_logs": recent_logs,
+    }
+
+
+def current_data_version(repo):
+    """repo.data_version(), read at most once per request"""
+    if not has_app_context():
+        return repo.data_version()
+    if "_data_version" not in g:
+        g._data_version = repo.data_version()
+    return g._data_version
+
+
+def get_dashboard_data():
+    """Dashboard context, served from the in-process cache while fresh
+
+    Entries are keyed on the data version as well as the date, so a booking
+    saved by another worker process is picked up on the next request.
+    """
+    repo = get_repo()
+    key = (date.today().isoformat(), current_data_version(repo))
+    with _dashboard_cache_lock:
+        entry = _dashboard_cache.get(key)
+        if entry and time.monotonic() - entry[0] < DASHBOARD_CACHE_TTL:
+            return entry[1]
+        generation = _dashboard_cache_generation
+    
+    data = load_dashboard_data(repo)
+    
+    with _dashboard_cache_lock:
+        # Don't store results that raced with an invalidation
+        if generation == _dashboard_cache_generation:
+            _dashboard_cache.clear()
+            _dashboard_cache[key] = (time.monotonic(), data)
+    return data
+
+
+# Rendered fragment cache settings
+FRAGMENT_CACHE_SIZE = 16  # rendered fragments kept per process
+
+_fragment_cache = {}
+_fragment_cache_lock = threading.Lock()
+
+
+def render_fragment(template, build, **params):
+    """Render a partial template once per data version and reuse its HTML
+
+    build(repo) returns the partial's context and only runs on a miss.
+    Entries are keyed on the template, params, the date and the data
+    version, so any booking change renders a fresh copy. Partials cached
+    this way must not show anything specific to the user or request.
+    """
+    repo = get_repo()
+    key = (template, tuple(sorted(params.items())), date.today().isoformat(), current_data_version(repo))
+    with _fragment_cache_lock:
+        html = _fragment_cache.get(key)
+    if html is not None:
+        return html
+    
+    html = Markup(render_template(template, **params, **build(repo)))
+    
+    with _fragment_cache_lock:
+        if len(_fragment_cache) >= FRAGMENT_CACHE_SIZE:
+            _fragment_cache.clear()
+        _fragment_cache[key] = html
+    return html
+
+
+@app.route("/dashboard")
+@login_required
+def dashboard():
+    """Admin dashboard with statistics"""
+    data = get_dashboard_data()
+    rooms_grid = render_fragment("_rooms_grid.html", lambda repo: {"rooms": data["rooms"]}, compact=True)
+    return render_template("dashboard.html", rooms_grid=rooms_grid, **data)
+
+
+def _watched_stream(q):
+    conn = _connect()
+    try:
+        yield from events.stream(q, SQLiteRepository(conn).data_version)
+    finally:
+        conn.close()
+
+
+@app.route("/events")
+@login_required
+def dashboard_events():
+    """Server-sent events with room, booking, stats and log deltas
+
+    Each open stream holds a worker thread, so serve the app with a
+    threaded server. On SQLite the stream polls the data version on its
+    own connection, so pages also reload after changes made by other
+    worker processes.
+    """
+    q = events.subscribe()
+    if app.config["STORAGE_BACKEND"] != "sqlite":
+        stream = events.stream(q)
+    else:
+        stream = _watched_stream(q)
+    return Response(
+        stream,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/rooms")
+@login_required
+def rooms():
+    """Display all rooms"""
+    rooms_grid = render_fragment("_rooms_grid.html", lambda repo: {"rooms": repo.rooms_overview()}, compact=False)
+    return render_template("rooms.html", rooms_grid=rooms_grid)
+
+
+def render_booking_form(repo):
+    """Render the booking form, with free rooms per type once dates are entered"""
+    check_in = request.values.get("check_in", "")
+    check_out = request.values.get("check_out", "")
+    guests = max(request.values.get("guests", 1, type=int), 1)
+    availability = None
+    if check_in and check_out and validate_stay(check_in, check_out) is None:
+        availability = repo.search_availability(check_in, check_out, guests)
+    return render_template(
+        "booking.html",
+        room_types=repo.room_types(),
+        availability=availability,
+        form=request.values,
+        guests=guests,
+        today=date.today().isoformat(),
+    )
+
+
+@app.route("/book", methods=["GET", "POST"])
+@login_required
+def book():
+    """Handle room booking
+
+    The clerk picks a room type; the best-fitting free room of that type is
+    assigned. Submitting with action=search only shows what is free.
+    """
+    try:
+        repo = get_repo()
+    except Exception as e:
+        flash(f"Database error: {str(e)}", "error")
+        return redirect(url_for("dashboard"))
     
-    booking = conn.execute("""
-        SELECT b.*, r.room_number 
-        FROM bookings b
-        JOIN rooms r ON b.room_id = r.id
-        WHERE b.id = ?
-    """, (booking_id,)).fetchone()
+    if request.method == "POST" and request.form.get("action") == "search":
+        error = validate_stay(request.form.get("check_in", ""), request.form.get("check_out", ""))
+        if error:
+            flash(error, "error")
+        return render_booking_form(repo)
     
-    if not booking:
-        flash("Booking not found", "error")
-        conn.close()
+    if request.method == "POST":
+        guest_name = request.form.get("guest_name", "").strip()
+        room_type = request.form.get("room_type", "")
+        check_in = request.form.get("check_in")
+        check_out = request.form.get("check_out")
+        guests = max(request.form.get("guests", 1, type=int), 1)
+        
+        # Validation
+        error = validate_booking(guest_name, room_type, check_in, check_out)
+        if error:
+            flash(error, "error")
+            return render_booking_form(repo)
+        
+        username = session.get("user", "Unknown")
+        try:
+            room, _ = repo.book_room_type(guest_name, room_type, check_in, check_out, username, guests)
+        except BookingError as e:
+            flash(str(e), "error")
+            return render_booking_form(repo)
+        except StorageBusy:
+            flash("The database is busy, please try again", "error")
+            return render_booking_form(repo)
+        invalidate_dashboard_cache()
+        
+        flash(f"Room {room['room_number']} booked successfully for {guest_name}!", "success")
         return redirect(url_for("dashboard"))
     
-    if booking["status"] != "Booked":
-        flash("This booking cannot be checked in", "error")
-        conn.close()
+    # GET request - show booking form
+    try:
+        return render_booking_form(repo)
+    except sqlite3.DatabaseError as e:
+        flash(f"Error loading rooms: {str(e)}. Please try again.", "error")
         return redirect(url_for("dashboard"))
-    
-    # Update booking status
-    conn.execute("UPDATE bookings SET status = 'Checked In' WHERE id = ?", (booking_id,))
-    
-    # Update room status
-    conn.execute("UPDATE rooms SET status = 'Occupied' WHERE id = ?", (booking["room_id"],))
-    
-    conn.commit()
+
+
+@app.route("/checkin/<int:booking_id>")
+@login_required
+def checkin(booking_id):
+    """Handle check-in"""
     username = session.get("user", "Unknown")
-    log_activity(username, "Check-In", 
-                f"Room {booking['room_number']} checked in for {booking['guest_name']}")
-    conn.close()
+    try:
+        booking = get_repo().check_in(booking_id, username)
+    except BookingError as e:
+        flash(str(e), "error")
+        return redirect(url_for("dashboard"))
+    except StorageBusy:
+        flash("The database is busy, please try again", "error")
+        return redirect(url_for("dashboard"))
+    invalidate_dashboard_cache()
     
     flash(f"Check-in successful for Room {booking['room_number']}!", "success")
     return redirect(url_for("dashboard"))
@@ -505,61 +3566,1062 @@ def checkin(booking_id):
 @login_required
 def checkout(booking_id):
     """Handle check-out"""
-    conn = get_db()
+    username = session.get("user", "Unknown")
+    try:
+        booking = get_repo().check_out(booking_id, username)
+    except BookingError as e:
+        flash(str(e), "error")
+        return redirect(url_for("dashboard"))
+    except StorageBusy:
+        flash("The database is busy, please try again", "error")
+        return redirect(url_for("dashboard"))
+    invalidate_dashboard_cache()
     
-    booking = conn.execute("""
-        SELECT b.*, r.room_number 
+    flash(f"Check-out successful for Room {booking['room_number']}!", "success")
+    return redirect(url_for("dashboard"))
+
+
+@app.route("/housekeeping")
+@login_required
+@sqlite_backend_required
+def housekeeping():
+    """Turnover board: rooms waiting to be cleaned, inspected or released"""
+    return render_template(
+        "housekeeping.html",
+        tasks=get_housekeeping_board(get_db()),
+        next_action={from_status: action for action, (from_status, _, _) in HOUSEKEEPING_TRANSITIONS.items()},
+    )
+
+
+@app.route("/housekeeping/<int:task_id>/<any(start, inspect, release):action>", methods=["POST"])
+@login_required
+@sqlite_backend_required
+def housekeeping_action(task_id, action):
+    """Start, pass inspection of or release a turnover from the board"""
+    username = session.get("user", "Unknown")
+    try:
+        task = advance_turnover(get_db(), task_id, action, username)
+    except BookingError as e:
+        flash(str(e), "error")
+        return redirect(url_for("housekeeping"))
+    except sqlite3.OperationalError:
+        flash("The database is busy, please try again", "error")
+        return redirect(url_for("housekeeping"))
+    invalidate_dashboard_cache()
+    
+    flash(f"Room {task['room_number']} is now {HOUSEKEEPING_TRANSITIONS[action][1]}", "success")
+    return redirect(url_for("housekeeping"))
+
+
+@app.route("/logs")
+@login_required
+def logs():
+    """Display activity logs, filtered and paged newest first"""
+    filters = {
+        "user": request.args.get("user", "").strip(),
+        "action": request.args.get("action", "").strip(),
+        "since": request.args.get("since", "").strip(),
+        "until": request.args.get("until", "").strip(),
+        "archived": "1" if request.args.get("archived") == "1" else "",
+    }
+    
+    try:
+        since = datetime.strptime(filters["since"], "%Y-%m-%d").date() if filters["since"] else None
+        until = datetime.strptime(filters["until"], "%Y-%m-%d").date() if filters["until"] else None
+    except ValueError:
+        flash("Invalid date format", "error")
+        since = until = None
+        filters["since"] = filters["until"] = ""
+    
+    cursor = parse_log_cursor(request.args.get("cursor"))
+    all_logs, next_cursor = get_repo().query_logs(
+        user=filters["user"] or None,
+        action=filters["action"] or None,
+        since=since,
+        until=until,
+        cursor=cursor,
+        include_archived=bool(filters["archived"]),
+    )
+    return render_template(
+        "logs.html",
+        logs=all_logs,
+        filters=filters,
+        actions=LOG_ACTIONS,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+    )
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics; only served when PROFILE_REQUESTS is enabled"""
+    if not PROFILE_REQUESTS:
+        return "Request profiling is disabled\n", 404, {"Content-Type": "text/plain"}
+    return render_metrics(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
+# JSON API
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+
+def api_login_required(f):
+    """Like login_required, but answers 401 JSON instead of redirecting"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if "user" not in session:
+            return jsonify({"error": "Authentication required"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def api_error(message, status):
+    return jsonify({"error": message}), status
+
+
+def conditional_json(build):
+    """Respond with build(repo) as JSON, or 304 if the client's ETag is current
+
+    The ETag is the data version plus today's local date, the date the room
+    listings are computed for, so an unchanged resource is answered without
+    running its queries or serialising anything. build may instead return
+    an api_error() response, which is sent without an ETag.
+    """
+    repo = get_repo()
+    etag = f"v{current_data_version(repo)}-{date.today().isoformat()}"
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        body = build(repo)
+        if isinstance(body, tuple):
+            return body
+        response = jsonify(body)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def list_bookings(conn, status=None, before=None, limit=API_PAGE_SIZE):
+    """Return bookings newest first, optionally by status and before an id"""
+    clauses = []
+    params = []
+    if status:
+        clauses.append("b.status = ?")
+        params.append(status)
+    if before:
+        clauses.append("b.id < ?")
+        params.append(before)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(f"""
+        SELECT b.*, r.room_number
         FROM bookings b
         JOIN rooms r ON b.room_id = r.id
-        WHERE b.id = ?
-    """, (booking_id,)).fetchone()
+        {where}
+        ORDER BY b.id DESC
+        LIMIT ?
+    """, (*params, limit)).fetchall()
+
+
+@app.route("/api/v1/rooms")
+@api_login_required
+def api_rooms():
+    """All rooms with the booking covering today"""
+    return conditional_json(lambda repo: {
+        "rooms": [dict(room) for room in repo.rooms_overview()]
+    })
+
+
+@app.route("/api/v1/bookings")
+@api_login_required
+def api_bookings():
+    """Active bookings, or bookings of one status paged by ?before=<id>"""
+    status = request.args.get("status", "").strip()
+    before = request.args.get("before", type=int)
+    limit = max(1, min(request.args.get("limit", API_PAGE_SIZE, type=int), API_MAX_PAGE_SIZE))
     
-    if not booking:
-        flash("Booking not found", "error")
-        conn.close()
-        return redirect(url_for("dashboard"))
+    def build(repo):
+        if not status and before is None:
+            return {"bookings": [dict(b) for b in repo.active_bookings()]}
+        bookings = [dict(b) for b in repo.list_bookings(status or None, before, limit)]
+        next_before = bookings[-1]["id"] if len(bookings) == limit else None
+        return {"bookings": bookings, "next_before": next_before}
     
-    if booking["status"] not in ["Booked", "Checked In"]:
-        flash("This booking cannot be checked out", "error")
-        conn.close()
-        return redirect(url_for("dashboard"))
+    return conditional_json(build)
+
+
+@app.route("/api/v1/bookings/<int:booking_id>")
+@api_login_required
+def api_booking(booking_id):
+    def build(repo):
+        booking = repo.get_booking(booking_id)
+        if not booking:
+            return api_error("Booking not found", 404)
+        return {"booking": dict(booking)}
     
-    # Update booking status
-    conn.execute("UPDATE bookings SET status = 'Completed' WHERE id = ?", (booking_id,))
+    return conditional_json(build)
+
+
+@app.route("/api/v1/bookings", methods=["POST"])
+@api_login_required
+def api_create_booking():
+    """Create a booking from a JSON body (guest_name, check_in, check_out and room_id or room_type)
+
+    With room_type (and optionally guests) the best-fitting free room of
+    that type is assigned.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return api_error("The body must be a JSON object", 400)
+    guest_name = str(data.get("guest_name", "")).strip()
+    room_id = data.get("room_id")
+    room_type = data.get("room_type")
+    check_in = data.get("check_in")
+    check_out = data.get("check_out")
+    if room_id is not None and not isinstance(room_id, (int, str)):
+        return api_error("room_id must be a number", 400)
+    try:
+        guests = int(data.get("guests", 1))
+    except (TypeError, ValueError):
+        return api_error("guests must be a number", 400)
     
-    # Update room status to Available
-    conn.execute("UPDATE rooms SET status = 'Available' WHERE id = ?", (booking["room_id"],))
+    error = validate_booking(guest_name, room_id or room_type, check_in, check_out)
+    if error:
+        return api_error(error, 400)
     
-    conn.commit()
+    repo = get_repo()
     username = session.get("user", "Unknown")
-    log_activity(username, "Check-Out", 
-                f"Room {booking['room_number']} checked out for {booking['guest_name']}")
-    conn.close()
+    try:
+        if room_id:
+            _, booking_id = repo.create_booking(guest_name, room_id, check_in, check_out, username)
+        else:
+            _, booking_id = repo.book_room_type(
+                guest_name, str(room_type), check_in, check_out, username, max(guests, 1)
+            )
+    except BookingNotFound as e:
+        return api_error(str(e), 404)
+    except BookingError as e:
+        return api_error(str(e), 409)
+    except StorageBusy:
+        return api_error("The database is busy, please try again", 503)
+    invalidate_dashboard_cache()
     
-    flash(f"Check-out successful for Room {booking['room_number']}!", "success")
-    return redirect(url_for("dashboard"))
+    response = jsonify({"booking": dict(repo.get_booking(booking_id))})
+    response.status_code = 201
+    response.headers["Location"] = url_for("api_booking", booking_id=booking_id)
+    return response
 
 
-@app.route("/logs")
-@login_required
-def logs():
-    """Display activity logs"""
+def _api_transition(transition, booking_id):
+    repo = get_repo()
+    try:
+        booking = getattr(repo, transition)(booking_id, session.get("user", "Unknown"))
+    except BookingNotFound as e:
+        return api_error(str(e), 404)
+    except BookingError as e:
+        return api_error(str(e), 409)
+    except StorageBusy:
+        return api_error("The database is busy, please try again", 503)
+    invalidate_dashboard_cache()
+    return jsonify({"booking": dict(repo.get_booking(booking["id"]))})
+
+
+@app.route("/api/v1/bookings/<int:booking_id>/checkin", methods=["POST"])
+@api_login_required
+def api_checkin(booking_id):
+    return _api_transition("check_in", booking_id)
+
+
+@app.route("/api/v1/bookings/<int:booking_id>/checkout", methods=["POST"])
+@api_login_required
+def api_checkout(booking_id):
+    return _api_transition("check_out", booking_id)
+
+
+@app.route("/api/v1/housekeeping")
+@api_login_required
+@sqlite_backend_required
+def api_housekeeping():
+    """Open turnovers with housekeeper and next arrival, most urgent first"""
+    return conditional_json(lambda repo: {
+        "tasks": [dict(task) for task in get_housekeeping_board(repo.conn)],
+    })
+
+
+@app.route("/api/v1/housekeeping/<int:task_id>/<any(start, inspect, release):action>", methods=["POST"])
+@api_login_required
+@sqlite_backend_required
+def api_advance_turnover(task_id, action):
     conn = get_db()
-    all_logs = conn.execute("""
-        SELECT * FROM activity_logs 
-        ORDER BY timestamp DESC 
-        LIMIT 100
-    """).fetchall()
-    conn.close()
-    return render_template("logs.html", logs=all_logs)
+    try:
+        advance_turnover(conn, task_id, action, session.get("user", "Unknown"))
+    except BookingNotFound as e:
+        return api_error(str(e), 404)
+    except BookingError as e:
+        return api_error(str(e), 409)
+    except sqlite3.OperationalError:
+        return api_error("The database is busy, please try again", 503)
+    invalidate_dashboard_cache()
+    task = conn.execute("SELECT * FROM housekeeping_tasks WHERE id = ?", (task_id,)).fetchone()
+    return jsonify({"task": dict(task)})
 
 
-if __name__ == "__main__":
-    # Initialize database - handles both new and existing databases
-    # Will recreate if corrupted
+@app.route("/api/v1/availability")
+@api_login_required
+def api_availability():
+    """Rooms and free inventory per room type for ?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD
+
+    ?guests= limits room_types to those sleeping at least that many.
+    """
+    check_in = request.args.get("check_in", "")
+    check_out = request.args.get("check_out", "")
+    guests = max(request.args.get("guests", 1, type=int), 1)
+    try:
+        check_in_date = datetime.strptime(check_in, "%Y-%m-%d").date()
+        check_out_date = datetime.strptime(check_out, "%Y-%m-%d").date()
+    except ValueError:
+        return api_error("check_in and check_out must be YYYY-MM-DD dates", 400)
+    if check_out_date <= check_in_date:
+        return api_error("Check-out date must be after check-in date", 400)
+    
+    return conditional_json(lambda repo: {
+        "check_in": check_in,
+        "check_out": check_out,
+        "rooms": [
+            {"id": room["id"], "room_number": room["room_number"], "room_type": room["room_type"]}
+            for room in repo.available_rooms(check_in, check_out)
+        ],
+        "room_types": repo.search_availability(check_in, check_out, guests),
+    })
+
+
+def _parse_date_args(*names):
+    """Parse YYYY-MM-DD query arguments; returns (dates, error)"""
+    try:
+        return [datetime.strptime(request.args.get(n, ""), "%Y-%m-%d").date() for n in names], None
+    except ValueError:
+        return None, f"{' and '.join(names)} must be YYYY-MM-DD dates"
+
+
+@app.route("/api/v1/reports/occupancy")
+@api_login_required
+@sqlite_backend_required
+def api_occupancy_report():
+    """Occupancy/ADR/RevPAR for ?start=&end= (inclusive), ?group=day|month"""
+    dates, error = _parse_date_args("start", "end")
+    if error:
+        return api_error(error, 400)
+    start, end = dates
+    group = request.args.get("group", "day")
+    if group not in ("day", "month"):
+        return api_error("group must be day or month", 400)
+    if end < start or (end - start).days > MAX_RANGE_DAYS:
+        return api_error("end must be on or after start and within ten years", 400)
+    return conditional_json(lambda repo: {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "group": group,
+        **occupancy_report(repo.conn, start, end, group),
+    })
+
+
+@app.route("/api/v1/rates")
+@api_login_required
+@sqlite_backend_required
+def api_rates():
+    """Nightly rates for ?room_type= between ?start= and ?end= (inclusive)"""
+    dates, error = _parse_date_args("start", "end")
+    if error:
+        return api_error(error, 400)
+    rates = get_db().execute("""
+        SELECT room_type, date, rate FROM rates
+        WHERE room_type = ? AND date BETWEEN ? AND ?
+        ORDER BY date
+    """, (request.args.get("room_type", "Standard"), dates[0].isoformat(), dates[1].isoformat())).fetchall()
+    return jsonify({"default_rate": DEFAULT_NIGHTLY_RATE, "rates": [dict(r) for r in rates]})
+
+
+@app.route("/api/v1/rates", methods=["PUT"])
+@api_login_required
+@sqlite_backend_required
+def api_set_rates():
+    """Set one rate for a room type over a date range (JSON room_type, start, end, rate)"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return api_error("The body must be a JSON object", 400)
+    room_type = str(data.get("room_type", "")).strip()
+    try:
+        start = datetime.strptime(str(data.get("start", "")), "%Y-%m-%d").date()
+        end = datetime.strptime(str(data.get("end", "")), "%Y-%m-%d").date()
+        rate = float(data.get("rate"))
+    except (TypeError, ValueError):
+        return api_error("room_type, start, end (YYYY-MM-DD) and a numeric rate are required", 400)
+    if not room_type or end < start or not math.isfinite(rate) or rate < 0:
+        return api_error("room_type, start <= end and a non-negative rate are required", 400)
+    if (end - start).days > MAX_RANGE_DAYS:
+        return api_error("end must be within ten years of start", 400)
+    
+    conn = get_db()
+    run_transaction(conn, set_rates, room_type, start.isoformat(), end.isoformat(), rate)
+    username = session.get("user", "Unknown")
+    log_activity(username, "Rates Updated", f"{room_type} set to {rate:.2f} from {start} to {end}")
+    return jsonify({"room_type": room_type, "start": start.isoformat(), "end": end.isoformat(), "rate": rate})
+
+
+# Bulk import / export
+IMPORT_CHUNK_SIZE = 500
+IMPORT_STATUSES = ("Booked", "Checked In", "Completed")
+ACTIVE_STATUSES = ("Booked", "Checked In")
+BOOKING_EXPORT_COLUMNS = ("id", "guest_name", "room_id", "room_number", "check_in", "check_out", "status", "created_at")
+LOG_EXPORT_COLUMNS = ("id", "timestamp", "user", "action", "details")
+
+
+def read_booking_rows(stream, fmt):
+    """Yield (row_number, record) from a CSV or NDJSON text stream
+
+    record is a dict, or an error message when the line can't be parsed.
+    """
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, "Invalid JSON"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _validate_import_row(record):
+    """Normalise one import record; returns (booking, None) or (None, error)"""
+    guest_name = str(record.get("guest_name") or "").strip()
+    room = str(record.get("room_id") or record.get("room_number") or "").strip()
+    check_in = str(record.get("check_in") or "").strip()
+    check_out = str(record.get("check_out") or "").strip()
+    status = str(record.get("status") or "Booked").strip()
+    
+    if not all([guest_name, room, check_in, check_out]):
+        return None, "guest_name, room_id or room_number, check_in and check_out are required"
+    try:
+        check_in_date = datetime.strptime(check_in, "%Y-%m-%d").date()
+        check_out_date = datetime.strptime(check_out, "%Y-%m-%d").date()
+    except ValueError:
+        return None, "Invalid date format"
+    if check_out_date <= check_in_date:
+        return None, "Check-out date must be after check-in date"
+    if status not in IMPORT_STATUSES:
+        return None, f"Status must be one of {', '.join(IMPORT_STATUSES)}"
+    return {
+        "guest_name": guest_name,
+        "room": room,
+        "by_id": record.get("room_id") not in (None, ""),
+        "check_in": check_in,
+        "check_out": check_out,
+        "status": status,
+    }, None
+
+
+def _import_chunk(conn, chunk, user):
+    """Validate and insert one chunk inside a single write transaction
+
+    chunk is a list of (row_number, booking). Returns the number of
+    bookings inserted and the errors for rejected rows.
+    """
+    def txn(conn):
+        errors = []
+        # Resolve every referenced room in one query
+        ids = [b["room"] for _, b in chunk if b["by_id"]]
+        numbers = [b["room"] for _, b in chunk if not b["by_id"]]
+        rooms_by_id = {}
+        rooms_by_number = {}
+        if ids or numbers:
+            rows = conn.execute(f"""
+                SELECT r.*, COALESCE(s.status, 'Available') AS current_status
+                FROM rooms r LEFT JOIN room_state s ON s.room_id = r.id
+                WHERE r.id IN ({",".join("?" for _ in ids) or "NULL"})
+                OR r.room_number IN ({",".join("?" for _ in numbers) or "NULL"})
+            """, (*ids, *numbers)).fetchall()
+            for room in rows:
+                rooms_by_id[str(room["id"])] = room
+                rooms_by_number[room["room_number"]] = room
+        
+        candidates = []
+        for number, booking in chunk:
+            room = (rooms_by_id if booking["by_id"] else rooms_by_number).get(booking["room"])
+            if room is None:
+                errors.append({"row": number, "error": "Room not found"})
+                continue
+            candidates.append((number, booking, room))
+        
+        # Active rows that overlap an existing active booking, in one query
+        active = [(n, b, r) for n, b, r in candidates if b["status"] in ACTIVE_STATUSES]
+        clashing = set()
+        if active:
+            values = ",".join("(?, ?, ?, ?)" for _ in active)
+            params = [p for n, b, r in active for p in (n, r["id"], b["check_in"], b["check_out"])]
+            clashing = {row[0] for row in conn.execute(f"""
+                WITH incoming (row_number, room_id, check_in, check_out) AS (VALUES {values})
+                SELECT DISTINCT i.row_number FROM incoming i
+                JOIN bookings b ON b.room_id = i.room_id
+                    AND b.status IN ('Booked', 'Checked In')
+                    AND b.check_in < i.check_out
+                    AND b.check_out > i.check_in
+            """, params)}
+        
+        accepted = []
+        held = {}  # room id -> active stays accepted earlier in this chunk
+        occupied = {r["id"] for n, b, r in candidates if r["current_status"] == "Occupied"}
+        today = date.today().isoformat()
+        for number, booking, room in candidates:
+            if booking["status"] in ACTIVE_STATUSES:
+                if number in clashing:
+                    errors.append({"row": number, "error": f"Room {room['room_number']} is already booked for the selected dates"})
+                    continue
+                stays = held.setdefault(room["id"], [])
+                if any(booking["check_in"] < out and booking["check_out"] > inn for inn, out in stays):
+                    errors.append({"row": number, "error": f"Overlaps another row for Room {room['room_number']} in this import"})
+                    continue
+                if room["id"] in occupied and (booking["status"] == "Checked In" or booking["check_in"] <= today):
+                    errors.append({"row": number, "error": f"Room {room['room_number']} is not available"})
+                    continue
+                if booking["status"] == "Checked In":
+                    occupied.add(room["id"])
+                stays.append((booking["check_in"], booking["check_out"]))
+            accepted.append((booking, room))
+        
+        if not accepted:
+            return 0, errors
+        first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM bookings").fetchone()[0]
+        conn.executemany("""
+            INSERT INTO bookings (guest_name, room_id, check_in, check_out, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(b["guest_name"], r["id"], b["check_in"], b["check_out"], b["status"]) for b, r in accepted])
+        record_booking_nights(conn, "b.id >= ?", (first_id,))
+        record_room_type_nights(conn, "b.id >= ?", (first_id,))
+        record_stay_days(conn, "id >= ?", (first_id,))
+        refresh_room_state(conn, {r["id"] for b, r in accepted if b["status"] in ACTIVE_STATUSES})
+        bump_data_version(conn)
+        write_activity(conn, user, "Bulk Import", f"{len(accepted)} bookings imported")
+        return len(accepted), errors
+    
+    return run_transaction(conn, txn)
+
+
+def import_bookings(conn, records, user, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import (row_number, record) pairs in chunked transactions
+
+    Returns {"imported": n, "errors": [{"row": ..., "error": ...}]}. Rows
+    with errors are skipped; the rest of their chunk is still imported.
+    """
+    imported = 0
+    errors = []
+    chunk = []
+    for number, record in records:
+        if isinstance(record, str):
+            errors.append({"row": number, "error": record})
+            continue
+        booking, error = _validate_import_row(record)
+        if error:
+            errors.append({"row": number, "error": error})
+            continue
+        chunk.append((number, booking))
+        if len(chunk) >= chunk_size:
+            count, chunk_errors = _import_chunk(conn, chunk, user)
+            imported += count
+            errors.extend(chunk_errors)
+            chunk = []
+    if chunk:
+        count, chunk_errors = _import_chunk(conn, chunk, user)
+        imported += count
+        errors.extend(chunk_errors)
+    errors.sort(key=lambda e: e["row"])
+    return {"imported": imported, "errors": errors}
+
+
+def iter_export(query, columns, fmt):
+    """Yield a table as CSV or NDJSON text, one row at a time
+
+    Uses its own connection so the stream can outlive the request's
+    connection; in WAL mode the long read doesn't block writers.
+    """
+    conn = _connect()
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for row in conn.execute(query):
+                writer.writerow([row[c] for c in columns])
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for row in conn.execute(query):
+                yield json.dumps({c: row[c] for c in columns}) + "\n"
+    finally:
+        conn.close()
+
+
+EXPORT_QUERIES = {
+    "bookings": (
+        "SELECT b.*, r.room_number FROM bookings b JOIN rooms r ON b.room_id = r.id ORDER BY b.id",
+        BOOKING_EXPORT_COLUMNS,
+    ),
+    "activity-logs": (
+        "SELECT * FROM activity_logs ORDER BY id",
+        LOG_EXPORT_COLUMNS,
+    ),
+}
+EXPORT_MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _request_format():
+    fmt = request.args.get("format", "")
+    if not fmt:
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    return fmt if fmt in EXPORT_MIMETYPES else None
+
+
+@app.route("/api/v1/bookings/import", methods=["POST"])
+@api_login_required
+@sqlite_backend_required
+def api_import_bookings():
+    """Bulk-import bookings from a CSV or NDJSON request body
+
+    The format comes from ?format= or the Content-Type. The body is read as
+    a stream, so large files aren't held in memory.
+    """
+    fmt = _request_format()
+    if fmt is None:
+        return api_error("format must be csv or ndjson", 400)
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    try:
+        report = import_bookings(get_db(), read_booking_rows(stream, fmt), session.get("user", "Unknown"))
+    except sqlite3.OperationalError:
+        return api_error("The database is busy, please try again", 503)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Chunks read before the bad line are already imported
+        invalidate_dashboard_cache()
+        return api_error(f"The body could not be read as UTF-8 {fmt}: {e}", 400)
+    if report["imported"]:
+        invalidate_dashboard_cache()
+        events.publish("reload", {"imported": report["imported"]})
+    return jsonify(report)
+
+
+@app.route("/api/v1/export/<table>")
+@api_login_required
+@sqlite_backend_required
+def api_export(table):
+    """Stream bookings or activity-logs as ?format=csv or ndjson"""
+    if table not in EXPORT_QUERIES:
+        return api_error("Unknown export", 404)
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_MIMETYPES:
+        return api_error("format must be csv or ndjson", 400)
+    query, columns = EXPORT_QUERIES[table]
+    return Response(
+        stream_with_context(iter_export(query, columns, fmt)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={table}.{fmt}"},
+    )
+
+
+# Synthetic sample data. `flask seed-data` fills a database that has no
+# bookings yet with rooms, a booking history and activity logs drawn from a
+# seeded random generator, so benchmarks can exercise every view at scale.
+SAMPLE_ROOM_TYPES = (
+    # name, capacity, share of rooms
+    ("Single", 1, 0.2),
+    ("Double", 2, 0.5),
+    ("Family", 4, 0.2),
+    ("Suite", 4, 0.1),
+)
+SAMPLE_FIRST_NAMES = ("Aisha", "Ben", "Carlos", "Divya", "Elena", "Farah", "George", "Hana", "Ivan", "Jun",
+                      "Kofi", "Lena", "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tara")
+SAMPLE_LAST_NAMES = ("Ahmed", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jones",
+                     "Kumar", "Lopez", "Martin", "Nguyen", "Okafor", "Patel", "Rossi", "Silva", "Tanaka", "Weber")
+SAMPLE_CLERKS = ("admin", "frontdesk1", "frontdesk2", "frontdesk3", "nightaudit")
+SAMPLE_ROOMS_PER_FLOOR = 20
+SAMPLE_MEAN_STAY = 2.8   # nights; the mean of sample_stay_length()
+SAMPLE_MEAN_LEAD = 21    # days between booking and arrival
+SAMPLE_INSERT_BATCH = 10_000
+
+
+def sample_stay_length(rng):
+    """Nights in one stay: mostly one to three, with a long tail up to three weeks"""
+    return min(1 + int(rng.lognormvariate(0.5, 0.8)), 21)
+
+
+def _sample_timestamp(day, rng, first_hour=0, last_hour=23):
+    return datetime.combine(day, datetime.min.time()) + timedelta(
+        hours=rng.randint(first_hour, last_hour), minutes=rng.randrange(60), seconds=rng.randrange(60)
+    )
+
+
+def _insert_batches(conn, sql, rows):
+    for i in range(0, len(rows), SAMPLE_INSERT_BATCH):
+        conn.executemany(sql, rows[i:i + SAMPLE_INSERT_BATCH])
+
+
+def generate_sample_data(conn, rooms, bookings, logs, seed=0, history_days=365, horizon_days=180):
+    """Replace the rooms of a database without bookings by synthetic data
+
+    Creates rooms of SAMPLE_ROOM_TYPES on floors of SAMPLE_ROOMS_PER_FLOOR,
+    about `bookings` stays from history_days before today to horizon_days
+    after it (fewer if the rooms can't hold them) and `logs` activity log
+    rows. Stays of a room never overlap. Those that have ended are
+    Completed, those running today Checked In and the rest Booked. Dates
+    are relative to today; otherwise the same arguments give the same
+    rows. Returns the number of rows written per table. Does not commit.
+    """
+    if conn.execute("SELECT 1 FROM bookings LIMIT 1").fetchone() is not None:
+        raise ValueError("The database already has bookings; seed an empty one")
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.combine(today, datetime.min.time())  # latest timestamp written
+    first_day = today - timedelta(days=history_days)
+    last_day = today + timedelta(days=horizon_days)
+    
+    conn.execute("DELETE FROM room_state")
+    conn.execute("DELETE FROM rooms")
+    conn.executemany(
+        "INSERT OR IGNORE INTO room_types (name, capacity) VALUES (?, ?)",
+        [(name, capacity) for name, capacity, _ in SAMPLE_ROOM_TYPES],
+    )
+    types = [name for name, _, _ in SAMPLE_ROOM_TYPES]
+    shares = [share for _, _, share in SAMPLE_ROOM_TYPES]
+    room_rows = [
+        (f"{i // SAMPLE_ROOMS_PER_FLOOR + 1}{i % SAMPLE_ROOMS_PER_FLOOR + 1:02d}", rng.choices(types, shares)[0])
+        for i in range(rooms)
+    ]
+    conn.executemany("INSERT INTO rooms (room_number, room_type) VALUES (?, ?)", room_rows)
+    room_ids = {number: room_id for room_id, number in conn.execute("SELECT id, room_number FROM rooms")}
+    
+    # Each room's calendar is a run of stays separated by random gaps sized
+    # so that all the rooms together hold about `bookings` stays
+    span = (last_day - first_day).days
+    mean_gap = max(span * rooms / max(bookings, 1) - SAMPLE_MEAN_STAY, 0)
+    stays = []
+    for number, _ in room_rows:
+        day = first_day + timedelta(days=int(rng.expovariate(1 / mean_gap)) if mean_gap else 0)
+        while day < last_day:
+            check_out = day + timedelta(days=sample_stay_length(rng))
+            stays.append((number, day, check_out))
+            day = check_out + timedelta(days=int(rng.expovariate(1 / mean_gap)) if mean_gap else 0)
+    if len(stays) > bookings:
+        stays = rng.sample(stays, bookings)
+    
+    booking_rows = []
+    log_events = []
+    for number, check_in, check_out in stays:
+        guest = f"{rng.choice(SAMPLE_FIRST_NAMES)} {rng.choice(SAMPLE_LAST_NAMES)}"
+        if check_out <= today:
+            status = "Completed"
+        elif check_in < today or (check_in == today and rng.random() < 0.5):
+            status = "Checked In"
+        else:
+            status = "Booked"
+        lead = timedelta(days=int(rng.expovariate(1 / SAMPLE_MEAN_LEAD)))
+        created_at = min(_sample_timestamp(check_in - lead, rng, 8, 22), now)
+        booking_rows.append((created_at, guest, room_ids[number], check_in.isoformat(), check_out.isoformat(), status))
+        log_events.append((created_at, rng.choice(SAMPLE_CLERKS), "Booking Created",
+                           f"Room {number} booked for {guest} ({check_in} to {check_out})"))
+        if status != "Booked":
+            log_events.append((min(_sample_timestamp(check_in, rng, 14, 22), now), rng.choice(SAMPLE_CLERKS),
+                               "Check-In", f"Room {number} checked in for {guest}"))
+        if status == "Completed":
+            log_events.append((min(_sample_timestamp(check_out, rng, 7, 11), now), rng.choice(SAMPLE_CLERKS),
+                               "Check-Out", f"Room {number} checked out for {guest}"))
+    booking_rows.sort()
+    _insert_batches(conn, """
+        INSERT INTO bookings (created_at, guest_name, room_id, check_in, check_out, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(created_at.strftime("%Y-%m-%d %H:%M:%S"), *rest) for created_at, *rest in booking_rows])
+    record_stay_days(conn, "1")
+    
+    # Booking events first, then clerk logins to make up the number
+    if len(log_events) > logs:
+        log_events = rng.sample(log_events, logs)
+    history_seconds = int((now - datetime.combine(first_day, datetime.min.time())).total_seconds())
+    while len(log_events) < logs:
+        clerk = rng.choice(SAMPLE_CLERKS)
+        moment = now - timedelta(seconds=rng.randrange(history_seconds))
+        action = rng.choice(("Login", "Logout"))
+        log_events.append((moment, clerk, action, f"User {clerk} logged {'in' if action == 'Login' else 'out'}"))
+    log_rows = sorted((moment.strftime("%Y-%m-%d %H:%M:%S"), *rest) for moment, *rest in log_events)
+    _insert_batches(conn, """
+        INSERT INTO activity_logs (timestamp, user, action, details) VALUES (?, ?, ?, ?)
+    """, log_rows)
+    
+    rebuild_daily_stats(conn, backfill=True)
+    rebuild_room_type_nights(conn)
+    refresh_room_state(conn)
+    bump_data_version(conn)
+    return {"rooms": len(room_rows), "bookings": len(booking_rows), "activity_logs": len(log_rows)}
+
+
+@app.cli.command("import-bookings")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]),
+              help="Defaults to the file extension.")
+@click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, show_default=True)
+def import_bookings_command(path, fmt, chunk_size):
+    """Bulk-import bookings from a CSV or NDJSON file."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    conn = get_db()
+    try:
+        with open(path, encoding="utf-8", newline="") as stream:
+            report = import_bookings(conn, read_booking_rows(stream, fmt), "System", chunk_size)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise click.ClickException(f"{path} could not be read as UTF-8 {fmt}: {e}; earlier chunks were imported")
+    for error in report["errors"]:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f"Imported {report['imported']} bookings, {len(report['errors'])} rows rejected")
+
+
+@app.cli.command("export")
+@click.argument("table", type=click.Choice(sorted(EXPORT_QUERIES)))
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="csv", show_default=True)
+def export_command(table, path, fmt):
+    """Stream bookings or activity-logs to a CSV or NDJSON file."""
+    query, columns = EXPORT_QUERIES[table]
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        for chunk in iter_export(query, columns, fmt):
+            out.write(chunk)
+    click.echo(f"Exported {table} to {path}")
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    old, new = migrate_db(get_db())
+    if old == new:
+        click.echo(f"Schema is current (version {new})")
+    else:
+        click.echo(f"Migrated schema from version {old} to {new}")
+
+
+@app.cli.command("seed-data")
+@click.option("--rooms", type=click.IntRange(min=1), default=200, show_default=True)
+@click.option("--bookings", type=click.IntRange(min=0), default=20_000, show_default=True)
+@click.option("--logs", type=click.IntRange(min=0), default=100_000, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--history-days", type=click.IntRange(min=0), default=365, show_default=True)
+@click.option("--horizon-days", type=click.IntRange(min=1), default=180, show_default=True)
+def seed_data_command(rooms, bookings, logs, seed, history_days, horizon_days):
+    """Fill a new database, or one with no bookings, with synthetic rooms, bookings and logs."""
     init_db()
+    conn = get_db()
+    try:
+        counts = run_transaction(conn, generate_sample_data, rooms, bookings, logs, seed, history_days, horizon_days)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    conn.execute("ANALYZE")
+    invalidate_dashboard_cache()
+    click.echo(", ".join(f"{count} {table}" for table, count in counts.items()))
+
+
+@app.cli.command("rebuild-rollups")
+@click.option("--backfill", is_flag=True, help="Also price bookings that have no nights recorded yet.")
+def rebuild_rollups_command(backfill):
+    """Recompute the daily occupancy/revenue rollup and nightly rooms sold per type."""
+    conn = get_db()
+    run_transaction(conn, rebuild_daily_stats, backfill)
+    run_transaction(conn, rebuild_room_type_nights)
+    days = conn.execute("SELECT COUNT(*) FROM daily_stats").fetchone()[0]
+    click.echo(f"Rebuilt daily_stats: {days} days, and room_type_nights")
+
+
+@app.cli.command("archive-logs")
+@click.option("--retention-days", type=int, default=None,
+              help="Keep this many days in the database (default: the LOG_RETENTION_DAYS setting).")
+@click.option("--convert-vacuum", is_flag=True,
+              help="First switch an existing database to incremental auto-vacuum (full VACUUM).")
+def archive_logs_command(retention_days, convert_vacuum):
+    """Move old activity logs to gzip archives and release the space."""
+    conn = get_db()
+    if convert_vacuum:
+        enable_incremental_vacuum(conn)
+    archived = archive_activity_logs(conn, retention_days)
+    if archived is None:
+        click.echo("Another process is archiving activity logs", err=True)
+        return
+    click.echo(f"Archived {archived['rows']} activity logs from {archived['days']} days to {log_archive_dir()}")
+    freed = incremental_vacuum(conn)
+    if freed is None:
+        click.echo("auto_vacuum is not INCREMENTAL; rerun with --convert-vacuum to release free pages")
+    else:
+        click.echo(f"Released {freed} free pages")
+
+
+@app.cli.command("backup")
+@click.option("--pages", type=click.IntRange(min=-1), default=BACKUP_PAGES_PER_STEP, show_default=True,
+              help="Pages copied per step; -1 copies the whole file in one step.")
+@click.option("--pause", type=click.FloatRange(min=0), default=None,
+              help="Seconds to sleep between steps.  [default: BACKUP_STEP_PAUSE]")
+def backup_command(pages, pause):
+    """Write a compressed, checksummed snapshot of the live database."""
+    manifest = create_snapshot(pages=pages or -1, pause=pause)
+    if manifest is None:
+        click.echo("Another process is taking a snapshot", err=True)
+        return
+    click.echo(f"Wrote {manifest['snapshot']} to {backup_dir()}: {manifest['size']} bytes, "
+               f"{manifest['compressed_size']} compressed, in {manifest['seconds']:.1f}s")
+
+
+@app.cli.command("backups")
+def list_backups_command():
+    """List snapshots, newest first."""
+    snapshots = list_snapshots()
+    if not snapshots:
+        click.echo(f"No snapshots in {backup_dir()}")
+    for m in snapshots:
+        click.echo(f"{m['snapshot']}  {m['created_at']} UTC  schema {m['schema_version']}  "
+                   f"{m['size']:>12} bytes  {m['compressed_size']:>12} compressed")
+
 
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+@app.cli.command("restore")
+@click.argument("snapshot")
+@click.option("--yes", is_flag=True, help="Don't ask for confirmation.")
+def restore_command(snapshot, yes):
+    """Replace the database with SNAPSHOT (a file in the backup directory, a path, or "latest").
+
+    Stop the app first.
+    """
+    try:
+        manifest, archive = find_snapshot(snapshot)
+        if not yes:
+            click.confirm(f"Replace {DATABASE} with {manifest['snapshot']} taken {manifest['created_at']} UTC?",
+                          abort=True)
+        manifest, kept = restore_snapshot(archive)
+    except SnapshotError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored {DATABASE} from {manifest['snapshot']}")
+    if kept:
+        click.echo(f"The replaced database was kept as {kept}")
+    if manifest["schema_version"] < SCHEMA_VERSION:
+        click.echo(f"Its schema (version {manifest['schema_version']}) is upgraded at the next start or `flask migrate`")
+
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Rebuild the fingerprinted stylesheet in static/dist."""
+    try:
+        manifest = build_assets()
+    except FileNotFoundError:
+        raise click.ClickException(f"{TAILWIND_CLI} not found; pip install tailwindcss-bin or set TAILWIND_CLI")
+    except subprocess.CalledProcessError as e:
+        raise click.ClickException(e.stderr.decode(errors="replace"))
+    for name, built in manifest.items():
+        click.echo(f"{name} -> {ASSET_DIR}/{built}")
+
+
+@app.cli.command("add-room-type")
+@click.argument("name")
+@click.option("--capacity", type=click.IntRange(min=1), default=2, show_default=True, help="Guests a room sleeps.")
+@click.option("--description", default="")
+def add_room_type_command(name, capacity, description):
+    """Add a room type, or update its capacity and description."""
+    conn = get_db()
+    conn.execute("""
+        INSERT INTO room_types (name, capacity, description) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET capacity = excluded.capacity, description = excluded.description
+    """, (name, capacity, description))
+    conn.commit()
+    click.echo(f"Room type {name} sleeps {capacity}")
+
+
+@app.cli.command("add-room")
+@click.argument("number")
+@click.option("--type", "room_type", default="Standard", show_default=True)
+def add_room_command(number, room_type):
+    """Add a room of an existing room type."""
+    def txn(conn):
+        if conn.execute("SELECT 1 FROM room_types WHERE name = ?", (room_type,)).fetchone() is None:
+            raise click.ClickException(f"No room type named {room_type}; add it with add-room-type")
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO rooms (room_number, room_type) VALUES (?, ?)", (number, room_type)
+        )
+        if cursor.rowcount == 0:
+            raise click.ClickException(f"Room {number} already exists")
+        refresh_room_state(conn, [cursor.lastrowid])
+        bump_data_version(conn)
+        write_activity(conn, "System", "System", f"Room {number} ({room_type}) added")
+    
+    run_transaction(get_db(), txn)
+    invalidate_dashboard_cache()
+    click.echo(f"Added {room_type} room {number}")
+
+
+@app.cli.command("add-housekeeper")
+@click.argument("name")
+def add_housekeeper_command(name):
+    """Add a housekeeper, or reactivate one, for turnover assignments."""
+    conn = get_db()
+    conn.execute("""
+        INSERT INTO housekeepers (name) VALUES (?)
+        ON CONFLICT (name) DO UPDATE SET active = 1
+    """, (name,))
+    conn.commit()
+    click.echo(f"Housekeeper {name} is active")
+
+
+@app.cli.command("remove-housekeeper")
+@click.argument("name")
+def remove_housekeeper_command(name):
+    """Stop assigning turnovers to a housekeeper (their history is kept)."""
+    conn = get_db()
+    if conn.execute("UPDATE housekeepers SET active = 0 WHERE name = ?", (name,)).rowcount == 0:
+        raise click.ClickException(f"No housekeeper named {name}")
+    conn.commit()
+    click.echo(f"Housekeeper {name} will get no new rooms")
+
+
+@app.cli.command("assign-housekeeping")
+def assign_housekeeping_command():
+    """Assign queued turnovers to free housekeepers now."""
+    assignments = assign_housekeeping(get_db())
+    click.echo(f"Assigned {len(assignments)} rooms")
+
+
+@app.cli.command("reconcile-room-state")
+def reconcile_room_state_command():
+    """Recompute every room's current status from bookings."""
+    rooms = reconcile_room_state(get_db())
+    click.echo(f"Reconciled room_state: {rooms} rooms")
+
+
+def create_app(config=Config):
+    """Configure the app, bring its database up to date and return it
+
+    This module defines a single app, so each call reconfigures it. Use
+    wsgi.py to serve it with several worker processes.
+    """
+    configure(config)
+    if not app.config.get("SECRET_KEY"):
+        raise RuntimeError("SECRET_KEY is not set; export HOTEL_SECRET_KEY")
+    if app.config["STORAGE_BACKEND"] not in ("sqlite", "postgres"):
+        raise RuntimeError(f"Unknown STORAGE_BACKEND {app.config['STORAGE_BACKEND']!r}")
+    if app.config["STORAGE_BACKEND"] == "postgres":
+        get_repo().create_schema()
+    else:
+        init_db()
+        start_log_archiver()
+        start_backup_scheduler()
+        housekeeping_scheduler.start()
+    return app
+
+
+if __name__ == "__main__":
+    # Create or upgrade the database schema before serving requests
+    create_app().run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
 
 
 
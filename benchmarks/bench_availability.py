@@ -0,0 +1,126 @@
+"""Conflict-check latency with a large booking history.
+
+Seeds a throwaway database with historical bookings spread over many
+rooms, then times the booking conflict check and the free-rooms query.
+The legacy three-way OR predicate is timed on the same data for
+comparison.
+
+    python benchmarks/bench_availability.py
+    python benchmarks/bench_availability.py --bookings 200000 --rooms 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+LEGACY_CONFLICT_QUERY = """
+    SELECT * FROM bookings
+    WHERE room_id = ?
+    AND status IN ('Booked', 'Checked In')
+    AND (
+        (check_in <= ? AND check_out >= ?) OR
+        (check_in <= ? AND check_out >= ?) OR
+        (check_in >= ? AND check_out <= ?)
+    )
+"""
+
+
+def seed(conn, rooms, bookings, rng):
+    conn.execute("DELETE FROM room_state")
+    conn.execute("DELETE FROM bookings")
+    conn.execute("DELETE FROM rooms")
+    conn.executemany(
+        "INSERT INTO rooms (id, room_number, status) VALUES (?, ?, 'Available')",
+        [(i, f"{i:04d}") for i in range(1, rooms + 1)],
+    )
+    # Each room gets a back-to-back history of stays ending around today
+    per_room = bookings // rooms
+    start = date.today() - timedelta(days=per_room * 4)
+    rows = []
+    for room_id in range(1, rooms + 1):
+        day = start
+        for n in range(per_room):
+            day += timedelta(days=rng.randint(0, 2))
+            nights = rng.randint(1, 4)
+            check_out = day + timedelta(days=nights)
+            status = "Completed" if check_out < date.today() else "Booked"
+            rows.append((f"Guest {room_id}-{n}", room_id, day.isoformat(), check_out.isoformat(), status))
+            day = check_out
+        if len(rows) >= 100_000:
+            conn.executemany(
+                "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            rows = []
+    conn.executemany(
+        "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(label, n, fn):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p99 = percentiles(samples)
+    print(f"{label:<30} {n:>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("-n", "--checks", type=int, default=2000)
+    parser.add_argument("--legacy-checks", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+
+    start = time.perf_counter()
+    seed(conn, args.rooms, args.bookings, rng)
+    total = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"seeded {total} bookings across {args.rooms} rooms in {time.perf_counter() - start:.1f}s")
+
+    def random_range(_):
+        check_in = date.today() + timedelta(days=rng.randint(-30, 60))
+        check_out = check_in + timedelta(days=rng.randint(1, 7))
+        return rng.randint(1, args.rooms), check_in.isoformat(), check_out.isoformat()
+
+    ranges = [random_range(i) for i in range(max(args.checks, args.legacy_checks))]
+
+    bench("conflict check (indexed)", args.checks,
+          lambda i: hotel.find_booking_conflict(conn, *ranges[i]))
+    bench("free rooms for range", max(1, args.checks // 20),
+          lambda i: hotel.get_available_rooms(conn, *ranges[i][1:]))
+    conn.execute("DROP INDEX idx_bookings_room_status_dates")
+    bench("conflict check (legacy scan)", args.legacy_checks,
+          lambda i: conn.execute(LEGACY_CONFLICT_QUERY, (
+              ranges[i][0], ranges[i][1], ranges[i][1], ranges[i][2],
+              ranges[i][2], ranges[i][1], ranges[i][2],
+          )).fetchone())
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
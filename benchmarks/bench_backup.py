@@ -0,0 +1,118 @@
+"""Snapshot throughput, and the write latency a live workload sees meanwhile.
+
+Seeds a throwaway database with generate_sample_data(), then starts a
+writer process that commits one short transaction every few milliseconds,
+the way check-ins and bookings do. Its commit latency is recorded with no
+backup running, during a page-stepped snapshot (the default), during one
+with a pause between steps, and during a one-step copy of the whole file.
+Also reports copy and total snapshot throughput, the compression ratio and
+how long a verified restore takes.
+
+    python benchmarks/bench_backup.py
+    python benchmarks/bench_backup.py --rooms 1000 --bookings 300000 --logs 1000000 --pages 1024
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def writer(path, interval, stop, samples):
+    """Commit one activity log row every interval seconds until stop is set"""
+    hotel.DATABASE = path
+    conn = hotel.get_db()
+    timings = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        hotel.run_transaction(conn, hotel.write_activity, "bench", "Check-In", "live workload")
+        timings.append((time.time(), (time.perf_counter() - start) * 1000))
+        time.sleep(interval)
+    conn.close()
+    samples.put(timings)
+
+
+def under_load(path, interval, job, warmup=0.5):
+    """Run job() while the writer runs; returns its result and the latencies seen meanwhile"""
+    ctx = multiprocessing.get_context("spawn")
+    stop, samples = ctx.Event(), ctx.Queue()
+    process = ctx.Process(target=writer, args=(path, interval, stop, samples))
+    process.start()
+    time.sleep(warmup)
+    started = time.time()
+    result = job()
+    finished = time.time()
+    stop.set()
+    timings = samples.get()
+    process.join()
+    return result, [ms for at, ms in timings if started <= at <= finished]
+
+
+def latency_line(label, latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return f"{label:<28} no commits"
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (f"{label:<28} {len(latencies):>6} commits  p50 {p50:>7.3f} ms  p99 {p99:>7.3f} ms  "
+            f"max {latencies[-1]:>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--logs", type=int, default=500_000)
+    parser.add_argument("--pages", type=int, default=hotel.BACKUP_PAGES_PER_STEP, help="pages per backup step")
+    parser.add_argument("--pause", type=float, default=0.005, help="seconds between steps in the throttled run")
+    parser.add_argument("--interval", type=float, default=0.002, help="seconds between writer commits")
+    parser.add_argument("--baseline", type=float, default=2.0, help="seconds of writes with no backup running")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="hotel-bench-")
+    hotel.DATABASE = os.path.join(directory, "hotel.db")
+    hotel.app.config["BACKUP_DIR"] = os.path.join(directory, "backups")
+    hotel.init_db()
+    conn = hotel.get_db()
+    start = time.perf_counter()
+    hotel.run_transaction(conn, hotel.generate_sample_data, args.rooms, args.bookings, args.logs)
+    conn.close()
+    size_mb = os.path.getsize(hotel.DATABASE) / 1e6
+    print(f"{args.rooms} rooms, {args.bookings} bookings, {args.logs} logs: {size_mb:.1f} MB, "
+          f"seeded in {time.perf_counter() - start:.1f}s")
+
+    _, baseline = under_load(hotel.DATABASE, args.interval, lambda: time.sleep(args.baseline))
+    print(latency_line("no backup", baseline))
+    runs = (
+        (f"stepped, {args.pages} pages", args.pages, 0),
+        (f"stepped, {args.pause * 1000:g} ms pause", args.pages, args.pause),
+        ("one step", -1, 0),
+    )
+    for label, pages, pause in runs:
+        manifest, latencies = under_load(
+            hotel.DATABASE, args.interval, lambda: hotel.create_snapshot(pages=pages, pause=pause)
+        )
+        print(latency_line(label, latencies))
+        mb = manifest["size"] / 1e6
+        print(f"{'':<28} copy {mb / max(manifest['copy_seconds'], 1e-6):>7.1f} MB/s  "
+              f"with gzip + sha256 {mb / manifest['seconds']:>6.1f} MB/s  "
+              f"compressed to {manifest['compressed_size'] / manifest['size']:.1%}")
+
+    snapshot = hotel.list_snapshots()[0]["snapshot"]
+    start = time.perf_counter()
+    hotel.restore_snapshot(snapshot)
+    restored = time.perf_counter() - start
+    check = sqlite3.connect(hotel.DATABASE)
+    integrity = check.execute("PRAGMA integrity_check").fetchone()[0]
+    check.close()
+    print(f"restore (verify + swap)      {restored:.2f}s, {size_mb / restored:.1f} MB/s, integrity_check {integrity}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Housekeeping board and scheduler cost with hundreds of rooms in turnover.
+
+Seeds a throwaway database with rooms, a booking history, a turnover task
+for most rooms (as a busy check-out morning leaves them) and upcoming
+arrivals, then times the one-query board against looking each room up
+separately, a scheduler pass that assigns every queued room, and
+GET /api/v1/housekeeping.
+
+    python benchmarks/bench_housekeeping.py
+    python benchmarks/bench_housekeeping.py --rooms 2000 --housekeepers 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def seed(conn, rooms, history, rng):
+    conn.executemany(
+        "INSERT OR IGNORE INTO rooms (room_number) VALUES (?)",
+        [(f"H{i:04d}",) for i in range(rooms)],
+    )
+    room_ids = [row[0] for row in conn.execute("SELECT id FROM rooms")]
+    today = date.today()
+    rows = []
+    for room_id in room_ids:
+        for n in range(history):
+            day = today - timedelta(days=3 * (n + 1))
+            rows.append((f"Past {room_id}-{n}", room_id, day.isoformat(),
+                         (day + timedelta(days=2)).isoformat(), "Completed"))
+        arrival = today + timedelta(days=rng.randint(0, 14))
+        rows.append((f"Next {room_id}", room_id, arrival.isoformat(),
+                     (arrival + timedelta(days=2)).isoformat(), "Booked"))
+    conn.executemany(
+        "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, ?, ?, ?, ?)", rows
+    )
+    dirty = rng.sample(room_ids, int(len(room_ids) * 0.8))
+    conn.executemany("INSERT INTO housekeeping_tasks (room_id) VALUES (?)", [(room_id,) for room_id in dirty])
+    conn.commit()
+    conn.execute("ANALYZE")
+    hotel.reconcile_room_state(conn)
+    return room_ids, len(dirty)
+
+
+def per_room_board(conn, room_ids):
+    """The naive board: one task lookup and one arrival lookup per room"""
+    today = date.today().isoformat()
+    board = []
+    for room_id in room_ids:
+        task = conn.execute(
+            "SELECT * FROM housekeeping_tasks WHERE room_id = ? AND status != 'Available'", (room_id,)
+        ).fetchone()
+        if task is None:
+            continue
+        arrival = conn.execute(
+            "SELECT MIN(check_in) FROM bookings WHERE room_id = ? AND status = 'Booked' AND check_out > ?",
+            (room_id, today),
+        ).fetchone()[0]
+        board.append((arrival or hotel.NO_ARRIVAL, task["created_at"], task["id"]))
+    board.sort()
+    return board
+
+
+def reset_assignments(conn):
+    conn.execute("UPDATE housekeeping_tasks SET status = 'Dirty', housekeeper_id = NULL WHERE status = 'Cleaning'")
+    conn.execute("UPDATE housekeepers SET last_assigned_at = NULL")
+    conn.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(label, n, fn, setup=None):
+    samples = []
+    for i in range(n):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p99 = percentiles(samples)
+    print(f"{label:<32} {n:>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--history", type=int, default=50, help="past bookings per room")
+    parser.add_argument("--housekeepers", type=int, default=25)
+    parser.add_argument("-n", "--reads", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+    room_ids, dirty = seed(conn, args.rooms, args.history, random.Random(args.seed))
+    conn.executemany("INSERT INTO housekeepers (name) VALUES (?)",
+                     [(f"Housekeeper {i}",) for i in range(args.housekeepers)])
+    conn.commit()
+    print(f"{len(room_ids)} rooms, {dirty} in turnover, {args.housekeepers} housekeepers")
+
+    bench("board (one query)", args.reads, lambda i: hotel.get_housekeeping_board(conn))
+    bench("board (per-room lookups)", args.reads, lambda i: per_room_board(conn, room_ids))
+    bench("scheduler pass", max(1, args.reads // 5), lambda i: hotel.assign_housekeeping(conn),
+          setup=lambda: reset_assignments(conn))
+
+    client = hotel.app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+    bench("GET /api/v1/housekeeping", args.reads, lambda i: client.get("/api/v1/housekeeping"))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
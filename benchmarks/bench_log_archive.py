@@ -0,0 +1,134 @@
+"""Activity log archiving: throughput, writer stalls and reclaimed space.
+
+Seeds a throwaway database with a year of activity logs, then archives
+everything past the retention period while a background thread keeps
+logging, the way request handlers do. Reports rows archived per second,
+the worst insert latency seen during the run (how long the batched
+deletes held the write lock), the database size before and after the
+incremental vacuum, the size of the archive files, and the time to read
+a /logs page from the table and from the archive.
+
+    python benchmarks/bench_log_archive.py
+    python benchmarks/bench_log_archive.py --rows 2000000 --batch-size 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def seed(conn, rows, days, rng):
+    now = datetime.now(timezone.utc)
+    actions = hotel.LOG_ACTIONS
+    batch = []
+    for i in range(rows):
+        timestamp = now - timedelta(seconds=rng.randint(0, days * 86400))
+        batch.append((rng.choice(actions), f"details for entry {i}", f"user{rng.randint(0, 49)}",
+                      timestamp.strftime("%Y-%m-%d %H:%M:%S")))
+        if len(batch) >= 100_000:
+            conn.executemany(
+                "INSERT INTO activity_logs (action, details, user, timestamp) VALUES (?, ?, ?, ?)", batch
+            )
+            batch = []
+    conn.executemany(
+        "INSERT INTO activity_logs (action, details, user, timestamp) VALUES (?, ?, ?, ?)", batch
+    )
+    conn.commit()
+
+
+def database_size(conn):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def writer(stop, latencies):
+    """Log an entry every few milliseconds until stopped"""
+    conn = hotel._connect()
+    while not stop.is_set():
+        start = time.perf_counter()
+        hotel.write_activity(conn, "bench", "System", "concurrent write")
+        conn.commit()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+    conn.close()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(label, n, fn):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p99 = percentiles(samples)
+    print(f"{label:<30} {n:>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--retention-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=hotel.LOG_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("-n", "--reads", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+
+    start = time.perf_counter()
+    seed(conn, args.rows, args.days, random.Random(args.seed))
+    print(f"seeded {args.rows} activity logs over {args.days} days in {time.perf_counter() - start:.1f}s, "
+          f"database {database_size(conn) / 1e6:.1f} MB")
+
+    stop = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=writer, args=(stop, latencies))
+    thread.start()
+    start = time.perf_counter()
+    archived = hotel.archive_activity_logs(conn, args.retention_days, args.batch_size)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    p50, p99 = percentiles(latencies)
+    print(f"archived {archived['rows']} rows from {archived['days']} days in {elapsed:.1f}s "
+          f"({archived['rows'] / elapsed:.0f} rows/s, batch size {args.batch_size})")
+    print(f"concurrent inserts: {len(latencies)}  p50 {p50:.3f} ms  p99 {p99:.3f} ms  max {max(latencies):.3f} ms")
+
+    start = time.perf_counter()
+    freed = hotel.incremental_vacuum(conn)
+    print(f"incremental vacuum released {freed} pages in {time.perf_counter() - start:.2f}s, "
+          f"database {database_size(conn) / 1e6:.1f} MB, "
+          f"archive {directory_size(hotel.log_archive_dir()) / 1e6:.1f} MB")
+
+    archived_day = date.today() - timedelta(days=(args.retention_days + args.days) // 2)
+    bench("/logs page (table)", args.reads, lambda i: hotel.query_activity_logs(conn))
+    bench("/logs page (archived day)", args.reads, lambda i: hotel.query_activity_logs(
+        conn, since=archived_day, until=archived_day, include_archived=True))
+    bench("/logs page (archived, user)", args.reads, lambda i: hotel.query_activity_logs(
+        conn, user="user7", since=archived_day - timedelta(days=30), until=archived_day,
+        include_archived=True))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
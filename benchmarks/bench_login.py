@@ -0,0 +1,123 @@
+"""Login latency and throughput under a brute-force style load.
+
+Times password verification at the configured cost and a successful
+POST / login, then runs many threads of wrong-password attempts from a
+handful of addresses, once with the login rate limits in place and once
+with them lifted. Reports attempts/sec, how many were throttled and how
+many activity log rows were written.
+
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --threads 32 --seconds 60
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(label, n, fn):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p99 = percentiles(samples)
+    print(f"{label:<30} {n:>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def unlimited():
+    return hotel.TokenBucketLimiter(float("inf"), float("inf"))
+
+
+def attack(threads, seconds, addresses, usernames, seed):
+    """Hammer POST / with wrong passwords; returns (status counts, elapsed)"""
+    counts = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        client = hotel.app.test_client()
+        local = {}
+        while time.monotonic() < deadline:
+            response = client.post("/", data={
+                "username": rng.choice(usernames),
+                "password": f"guess-{rng.random()}",
+            }, environ_base={"REMOTE_ADDR": rng.choice(addresses)})
+            local[response.status_code] = local.get(response.status_code, 0) + 1
+        with lock:
+            for status, count in local.items():
+                counts[status] = counts.get(status, 0) + count
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return counts, time.perf_counter() - start
+
+
+def report(label, counts, elapsed, logged):
+    total = sum(counts.values())
+    throttled = counts.get(429, 0)
+    print(f"{label:<30} {total / elapsed:>8.0f} attempts/s  "
+          f"{throttled / max(total, 1):>6.1%} throttled  "
+          f"{total - throttled:>6} password checks  {logged} log rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--addresses", type=int, default=4)
+    parser.add_argument("-n", "--logins", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    scheme, params = hotel._current_hash_params()
+    print(f"password hashing: {scheme} {params}")
+
+    stored = hotel.hash_password("admin123")
+    bench("verify_password", args.logins, lambda i: hotel.verify_password(stored, "admin123"))
+
+    hotel.login_ip_limiter = unlimited()
+    hotel.login_user_limiter = unlimited()
+    bench("POST / (successful login)", args.logins,
+          lambda i: hotel.app.test_client().post("/", data={"username": "admin", "password": "admin123"}))
+
+    addresses = [f"203.0.113.{i + 1}" for i in range(args.addresses)]
+    usernames = ["admin"] + [f"user{i}" for i in range(20)]
+    conn = hotel.get_db()
+
+    for label, limited in (("attack, rate limited", True), ("attack, unlimited", False)):
+        if limited:
+            hotel.login_ip_limiter = hotel.TokenBucketLimiter(hotel.LOGIN_IP_BURST, hotel.LOGIN_IP_REFILL)
+            hotel.login_user_limiter = hotel.TokenBucketLimiter(hotel.LOGIN_USER_BURST, hotel.LOGIN_USER_REFILL)
+        else:
+            hotel.login_ip_limiter = unlimited()
+            hotel.login_user_limiter = unlimited()
+        before = conn.execute("SELECT COUNT(*) FROM activity_logs").fetchone()[0]
+        counts, elapsed = attack(args.threads, args.seconds, addresses, usernames, args.seed)
+        logged = conn.execute("SELECT COUNT(*) FROM activity_logs").fetchone()[0] - before
+        report(label, counts, elapsed, logged)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Page render time and transfer size with fragment caching and compression.
+
+Seeds a throwaway database with many rooms, some booked or checked in,
+then times GET /rooms and GET /dashboard with the rooms grid served from
+the fragment cache and re-rendered on every request. Also reports each
+page's size uncompressed, gzipped and brotli-compressed (when the brotli
+package is installed), and the size of the built stylesheet.
+
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --rooms 2000 -n 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def seed(conn, rooms):
+    conn.executemany(
+        "INSERT OR IGNORE INTO rooms (room_number) VALUES (?)",
+        [(f"R{i:04d}",) for i in range(rooms)],
+    )
+    today = date.today()
+    room_ids = [row[0] for row in conn.execute("SELECT id FROM rooms")]
+    conn.executemany(
+        "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, ?, ?, ?, ?)",
+        [(f"Guest {room_id}", room_id, today.isoformat(), (today + timedelta(days=2)).isoformat(),
+          "Checked In" if room_id % 2 else "Booked")
+         for room_id in room_ids if room_id % 3 == 0],
+    )
+    conn.commit()
+    hotel.reconcile_room_state(conn)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(label, n, fn):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p99 = percentiles(samples)
+    print(f"{label:<34} {n:>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def uncached(client, path):
+    def get(i):
+        hotel._fragment_cache.clear()
+        hotel.invalidate_dashboard_cache()
+        client.get(path, headers={"Accept-Encoding": "identity"})
+    return get
+
+
+def sizes(client, path):
+    encodings = ["identity", "gzip"] + (["br"] if hotel.brotli else [])
+    result = []
+    for encoding in encodings:
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        result.append(f"{encoding} {len(response.data) / 1024:.1f} KB")
+    return ", ".join(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+    seed(conn, args.rooms)
+    conn.close()
+    print(f"{args.rooms} rooms, brotli {'available' if hotel.brotli else 'not installed'}")
+
+    client = hotel.app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+    for path in ("/rooms", "/dashboard"):
+        bench(f"GET {path} (fragment cached)", args.requests,
+              lambda i: client.get(path, headers={"Accept-Encoding": "identity"}))
+        bench(f"GET {path} (rendered)", args.requests, uncached(client, path))
+        bench(f"GET {path} (cached, gzip)", args.requests,
+              lambda i: client.get(path, headers={"Accept-Encoding": "gzip"}))
+        print(f"{path} size: {sizes(client, path)}")
+
+    with hotel.app.test_request_context():
+        stylesheet = hotel.asset_url("app.css")
+    print(f"{stylesheet} size: {sizes(client, stylesheet)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Requests/sec micro-benchmark for /dashboard and /book.
+
+Runs the views through the Flask test client against a throwaway copy of
+the database, so hotel.db is never touched.
+
+    python benchmarks/bench_requests.py               # pooled connections
+    python benchmarks/bench_requests.py --pool-size 0 # new connection (and PRAGMAs) per request
+    python benchmarks/bench_requests.py --baseline    # the connection handling before pooling
+
+--baseline reproduces what get_db() did before connections were pooled:
+a rollback-journal database (no WAL), and a new connection opened and
+probed with SELECT 1 on every call, closed by the caller.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n:>6} req  {n / elapsed:>9.1f} req/s  {elapsed * 1000 / n:>7.3f} ms/req")
+
+
+def legacy_get_db():
+    """get_db() before pooling: connect and probe on every call"""
+    conn = sqlite3.connect(hotel.DATABASE, factory=hotel.PooledConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("SELECT 1")
+    return conn
+
+
+def use_baseline():
+    conn = hotel.get_db()
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    hotel.get_db = legacy_get_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("--pool-size", type=int, default=hotel.DB_POOL_SIZE)
+    parser.add_argument("--baseline", action="store_true", help="open and probe a connection per get_db() call, no WAL")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="hotel-bench-")
+    hotel.DATABASE = os.path.join(workdir, "hotel.db")
+    hotel.DB_POOL_SIZE = args.pool_size
+    hotel.init_db()
+    if args.baseline:
+        use_baseline()
+
+    client = hotel.app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+
+    check_in = date.today().isoformat()
+    check_out = (date.today() + timedelta(days=1)).isoformat()
+
+    def book_cycle(i):
+        # Book a Standard room, then check out again so the next iteration can rebook it
+        client.post("/book", data={
+            "guest_name": f"Guest {i}",
+            "room_type": "Standard",
+            "check_in": check_in,
+            "check_out": check_out,
+        })
+        conn = hotel.get_db()
+        booking_id = conn.execute("SELECT MAX(id) FROM bookings").fetchone()[0]
+        conn.close()
+        client.get(f"/checkout/{booking_id}")
+        with client.session_transaction() as sess:
+            sess.pop("_flashes", None)  # never rendered here; would grow the cookie
+
+    mode = "baseline (connection per call, no WAL)" if args.baseline else f"pool size: {args.pool_size}"
+    print(f"database: {hotel.DATABASE}  {mode}")
+    timed("GET  /dashboard", args.requests, lambda i: client.get("/dashboard"))
+    timed("GET  /book", args.requests, lambda i: client.get("/book"))
+    timed("POST /book + /checkout", args.requests, book_cycle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Availability search latency and fill rate over a simulated season.
+
+Seeds a throwaway database with rooms of several types, then replays a
+season of randomly generated booking requests in the order guests make
+them (arrival date minus lead time). Each request searches availability
+for its dates, then books a room of the wanted type when the search shows
+one free. Reports search latency from room_type_nights and from expanding
+every overlapping booking, and for best-fit and first-fit (lowest room
+number) assignment: requests accepted, requests the search accepted but no
+single room could take, and the share of room nights sold.
+
+    python benchmarks/bench_room_assignment.py
+    python benchmarks/bench_room_assignment.py --rooms 300 --requests 20000 --season-days 120
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+ROOM_TYPES = [("Single", 1, 0.2), ("Double", 2, 0.5), ("Family", 4, 0.2), ("Suite", 4, 0.1)]
+
+# Nightly counts expanded from bookings on every search, for comparison
+NAIVE_SEARCH_SQL = """
+    WITH RECURSIVE nights (room_type, night, check_out) AS (
+        SELECT r.room_type, max(b.check_in, :check_in), min(b.check_out, :check_out)
+        FROM bookings b JOIN rooms r ON r.id = b.room_id
+        WHERE b.status IN ('Booked', 'Checked In')
+        AND b.check_in < :check_out AND b.check_out > :check_in
+        UNION ALL
+        SELECT room_type, date(night, '+1 day'), check_out FROM nights
+        WHERE date(night, '+1 day') < check_out
+    )
+    SELECT t.name,
+           (SELECT COUNT(*) FROM rooms r WHERE r.room_type = t.name) -
+           COALESCE((SELECT MAX(sold) FROM (
+               SELECT COUNT(*) AS sold FROM nights n WHERE n.room_type = t.name GROUP BY n.night
+           )), 0) AS available
+    FROM room_types t WHERE t.capacity >= :guests
+"""
+
+
+def first_fit(candidates, check_in, check_out):
+    return sorted(candidates, key=lambda room: room["room_number"])
+
+
+def generate_requests(count, season_days, rng):
+    """(booked_at, room_type, guests, check_in, check_out) in the order guests book"""
+    requests = []
+    types, weights = [t[0] for t in ROOM_TYPES], [t[2] for t in ROOM_TYPES]
+    for _ in range(count):
+        arrival = rng.randrange(season_days)
+        nights = min(1 + int(rng.expovariate(1 / 2.5)), 14)
+        lead = int(rng.expovariate(1 / 21))
+        room_type = rng.choices(types, weights)[0]
+        capacity = next(t[1] for t in ROOM_TYPES if t[0] == room_type)
+        requests.append((arrival - lead, room_type, rng.randint(1, capacity), arrival, arrival + nights))
+    requests.sort()
+    return requests
+
+
+def setup(rooms):
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+    conn.execute("DELETE FROM room_state")
+    conn.execute("DELETE FROM rooms")  # the sample rooms
+    for name, capacity, share in ROOM_TYPES:
+        conn.execute("INSERT OR IGNORE INTO room_types (name, capacity) VALUES (?, ?)", (name, capacity))
+        conn.executemany(
+            "INSERT INTO rooms (room_number, room_type) VALUES (?, ?)",
+            [(f"{name[:2].upper()}{i:03d}", name) for i in range(max(1, int(rooms * share)))],
+        )
+    conn.commit()
+    hotel.reconcile_room_state(conn)
+    return conn
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def report(label, samples):
+    p50, p99 = percentiles(samples)
+    print(f"{label:<32} {len(samples):>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def run_season(requests, rooms, season_days, naive):
+    conn = setup(rooms)
+    today = date.today()
+    total_rooms = conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
+    searched, naive_searched = [], []
+    accepted = stranded = refused = 0
+    for _, room_type, guests, arrival, departure in requests:
+        check_in = (today + timedelta(days=arrival)).isoformat()
+        check_out = (today + timedelta(days=departure)).isoformat()
+        start = time.perf_counter()
+        free = {t["name"]: t["available"] for t in hotel.search_availability(conn, check_in, check_out, guests)}
+        searched.append((time.perf_counter() - start) * 1000)
+        if naive:
+            start = time.perf_counter()
+            conn.execute(NAIVE_SEARCH_SQL, {"check_in": check_in, "check_out": check_out, "guests": guests}).fetchall()
+            naive_searched.append((time.perf_counter() - start) * 1000)
+        if not free.get(room_type):
+            refused += 1
+            continue
+        try:
+            hotel.book_room_type(conn, "Guest", room_type, check_in, check_out, "bench", guests)
+            accepted += 1
+        except hotel.BookingError:
+            stranded += 1
+    sold = conn.execute("""
+        SELECT COALESCE(SUM(rooms_sold), 0) FROM room_type_nights WHERE night >= ? AND night < ?
+    """, (today.isoformat(), (today + timedelta(days=season_days)).isoformat())).fetchone()[0]
+    conn.close()
+    return {
+        "searched": searched,
+        "naive_searched": naive_searched,
+        "accepted": accepted,
+        "stranded": stranded,
+        "refused": refused,
+        "fill_rate": sold / (total_rooms * season_days),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--season-days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    requests = generate_requests(args.requests, args.season_days, random.Random(args.seed))
+    print(f"{args.rooms} rooms, {len(requests)} requests over {args.season_days} days")
+    best_fit = hotel.rank_best_fit
+    for label, strategy in (("best-fit", best_fit), ("first-fit", first_fit)):
+        hotel.rank_best_fit = strategy
+        result = run_season(requests, args.rooms, args.season_days, naive=strategy is best_fit)
+        if result["naive_searched"]:
+            report("search (room_type_nights)", result["searched"])
+            report("search (expand bookings)", result["naive_searched"])
+        print(f"{label:<10} accepted {result['accepted']:>6}  stranded {result['stranded']:>5}  "
+              f"sold out {result['refused']:>6}  fill rate {result['fill_rate']:.1%}")
+    hotel.rank_best_fit = best_fit
+
+
+if __name__ == "__main__":
+    main()
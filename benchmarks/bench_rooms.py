@@ -0,0 +1,129 @@
+"""Room overview latency with many rooms and a large booking history.
+
+Seeds a throwaway database with rooms and historical bookings, rebuilds
+room_state, then times the room overview read from room_state against the
+legacy query that joined every room to its bookings on each request. The
+full reconciliation and GET /rooms are timed on the same data.
+
+    python benchmarks/bench_rooms.py
+    python benchmarks/bench_rooms.py --bookings 200000 --rooms 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+LEGACY_OVERVIEW_QUERY = """
+    SELECT r.*,
+           b.guest_name,
+           b.check_in,
+           b.check_out,
+           b.status as booking_status
+    FROM rooms r
+    LEFT JOIN bookings b ON r.id = b.room_id
+        AND b.status IN ('Booked', 'Checked In')
+        AND date('now') BETWEEN b.check_in AND b.check_out
+    ORDER BY r.room_number
+"""
+
+
+def seed(conn, rooms, bookings, rng):
+    conn.execute("DELETE FROM room_state")
+    conn.execute("DELETE FROM bookings")
+    conn.execute("DELETE FROM rooms")
+    conn.executemany(
+        "INSERT INTO rooms (id, room_number, status) VALUES (?, ?, 'Available')",
+        [(i, f"{i:04d}") for i in range(1, rooms + 1)],
+    )
+    # Back-to-back stays per room; the one covering today is checked in
+    # about half the time, later ones are reservations
+    today = date.today()
+    per_room = bookings // rooms
+    start = today - timedelta(days=per_room * 4)
+    rows = []
+    for room_id in range(1, rooms + 1):
+        day = start
+        for n in range(per_room):
+            day += timedelta(days=rng.randint(0, 2))
+            check_out = day + timedelta(days=rng.randint(1, 4))
+            if check_out < today:
+                status = "Completed"
+            elif day <= today and rng.random() < 0.5:
+                status = "Checked In"
+            else:
+                status = "Booked"
+            rows.append((f"Guest {room_id}-{n}", room_id, day.isoformat(), check_out.isoformat(), status))
+            day = check_out
+        if len(rows) >= 100_000:
+            conn.executemany(
+                "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            rows = []
+    conn.executemany(
+        "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(label, n, fn):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p99 = percentiles(samples)
+    print(f"{label:<30} {n:>6} runs  p50 {p50:>8.3f} ms  p99 {p99:>8.3f} ms  mean {statistics.mean(samples):>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("-n", "--reads", type=int, default=200)
+    parser.add_argument("--legacy-reads", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+
+    start = time.perf_counter()
+    seed(conn, args.rooms, args.bookings, rng)
+    total = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"seeded {total} bookings across {args.rooms} rooms in {time.perf_counter() - start:.1f}s")
+
+    bench("reconcile room_state", 5, lambda i: hotel.reconcile_room_state(conn))
+    bench("refresh one room", args.reads,
+          lambda i: hotel.run_transaction(conn, hotel.refresh_room_state, [i % args.rooms + 1]))
+    bench("room overview (room_state)", args.reads, lambda i: hotel.get_rooms_overview(conn))
+    bench("room stats (room_state)", args.reads, lambda i: hotel.get_room_stats(conn))
+
+    client = hotel.app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+    bench("GET /rooms", max(1, args.reads // 4), lambda i: client.get("/rooms"))
+
+    bench("room overview (legacy join)", args.legacy_reads,
+          lambda i: conn.execute(LEGACY_OVERVIEW_QUERY).fetchall())
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
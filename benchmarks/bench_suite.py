@@ -0,0 +1,201 @@
+"""End-to-end request timings at several data sizes, written as JSON.
+
+For each size (ROOMS:BOOKINGS:LOGS) a throwaway database is filled with
+generate_sample_data(), then every page a clerk uses is timed through the
+Flask test client: the dashboard and rooms overview (cached and rendered),
+the booking form, a booking that succeeds and one refused for a clash,
+check-in, check-out and the activity log. Each result records latency
+percentiles and how many responses had an unexpected status.
+
+The JSON report (stdout, or --output) carries the git revision and schema
+version, so reports from successive versions can be diffed.
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes 100:10000:50000 1000:300000:1000000 -n 200 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+DEFAULT_SIZES = ["50:2000:10000", "200:20000:100000", "1000:100000:500000"]
+BENCH_TYPE = "Benchmark"  # one room, booked on dates past the generated horizon
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_size(text):
+    try:
+        rooms, bookings, logs = (int(part) for part in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ROOMS:BOOKINGS:LOGS, got {text!r}")
+    return {"rooms": rooms, "bookings": bookings, "logs": logs}
+
+
+def summarise(samples, unexpected):
+    samples = sorted(samples)
+
+    def pct(q):
+        return round(samples[min(len(samples) - 1, int(len(samples) * q))], 3)
+
+    return {
+        "runs": len(samples),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "unexpected": unexpected,
+    }
+
+
+def timed(n, request, expect, setup=None, teardown=None):
+    """Time request(i) n times; setup(i) and teardown(i, response) are not timed"""
+    samples = []
+    unexpected = 0
+    for i in range(n):
+        if setup:
+            setup(i)
+        start = time.perf_counter()
+        response = request(i)
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code != expect:
+            unexpected += 1
+        if teardown:
+            teardown(i, response)
+    return summarise(samples, unexpected)
+
+
+def seed(size, seed_value, horizon_days):
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-bench-"), "hotel.db")
+    hotel.invalidate_dashboard_cache()
+    hotel._fragment_cache.clear()
+    hotel.init_db()
+    conn = hotel.get_db()
+    start = time.perf_counter()
+    hotel.run_transaction(conn, hotel.generate_sample_data, size["rooms"], size["bookings"], size["logs"],
+                          seed_value, 365, horizon_days)
+    conn.execute("INSERT INTO room_types (name, capacity) VALUES (?, 2)", (BENCH_TYPE,))
+    conn.execute("INSERT INTO rooms (room_number, room_type) VALUES ('BENCH', ?)", (BENCH_TYPE,))
+    conn.commit()
+    conn.execute("ANALYZE")
+    hotel.reconcile_room_state(conn)
+    elapsed = time.perf_counter() - start
+    bench_room = conn.execute("SELECT id FROM rooms WHERE room_number = 'BENCH'").fetchone()[0]
+    return conn, bench_room, elapsed
+
+
+def run_size(size, n, seed_value):
+    horizon_days = 180
+    conn, bench_room, seed_seconds = seed(size, seed_value, horizon_days)
+    print(f"{size['rooms']} rooms, {size['bookings']} bookings, {size['logs']} logs "
+          f"seeded in {seed_seconds:.1f}s", file=sys.stderr)
+    client = hotel.app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+    first_free = date.today() + timedelta(days=horizon_days + 30)
+
+    def stay(offset):
+        check_in = first_free + timedelta(days=offset)
+        return check_in.isoformat(), (check_in + timedelta(days=1)).isoformat()
+
+    def book_form(i, offset):
+        check_in, check_out = stay(offset)
+        return client.post("/book", data={
+            "action": "book", "guest_name": f"Bench {i}", "room_type": BENCH_TYPE,
+            "check_in": check_in, "check_out": check_out, "guests": "1",
+        })
+
+    def uncached(path):
+        def get(i):
+            hotel.invalidate_dashboard_cache()
+            hotel._fragment_cache.clear()
+            return client.get(path)
+        return get
+
+    # Check-in/out work on stays booked just before, on dates after the
+    # ones POST /book uses; the turnover check-out opens is released after
+    stays = {}
+
+    def book_stay(i):
+        check_in, check_out = stay(2 * n + 2 * i)
+        stays[i] = hotel.create_booking(conn, "Bench guest", bench_room, check_in, check_out, "bench")[1]
+
+    def release_turnover(i, response):
+        task_id = conn.execute(
+            "SELECT id FROM housekeeping_tasks WHERE room_id = ? AND status != 'Available'", (bench_room,)
+        ).fetchone()[0]
+        for action in ("start", "inspect", "release"):
+            hotel.advance_turnover(conn, task_id, action, "bench")
+
+    some_clerk = hotel.SAMPLE_CLERKS[1]
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    results = {
+        "GET /dashboard": timed(n, uncached("/dashboard"), 200),
+        "GET /dashboard (cached)": timed(n, lambda i: client.get("/dashboard"), 200),
+        "GET /rooms": timed(n, uncached("/rooms"), 200),
+        "GET /rooms (cached)": timed(n, lambda i: client.get("/rooms"), 200),
+        "GET /book": timed(n, lambda i: client.get("/book"), 200),
+        "POST /book": timed(n, lambda i: book_form(i, 2 * i), 302),
+        "POST /book (conflict)": timed(n, lambda i: book_form(i, 0), 200),
+        "GET /checkin": timed(n, lambda i: client.get(f"/checkin/{stays[i]}"), 302, setup=book_stay),
+        "GET /checkout": timed(n, lambda i: client.get(f"/checkout/{stays[i]}"), 302, teardown=release_turnover),
+        "GET /logs": timed(n, lambda i: client.get("/logs"), 200),
+        "GET /logs (user, last week)": timed(
+            n, lambda i: client.get(f"/logs?user={some_clerk}&since={week_ago}"), 200
+        ),
+    }
+    for name, result in results.items():
+        print(f"  {name:<28} p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms"
+              f"{'  unexpected ' + str(result['unexpected']) if result['unexpected'] else ''}", file=sys.stderr)
+    conn.close()
+    return {**size, "seed_seconds": round(seed_seconds, 2), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[parse_size(s) for s in DEFAULT_SIZES],
+                        metavar="ROOMS:BOOKINGS:LOGS")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="timed requests per endpoint")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "schema_version": hotel.SCHEMA_VERSION,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "started_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "requests": args.requests,
+        "seed": args.seed,
+        "sizes": [run_size(size, args.requests, args.seed) for size in args.sizes],
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            json.dump(report, out, indent=2)
+            out.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Multi-process load test: login -> book -> check-in -> check-out -> turnover.
+
+Starts N worker processes, each serving the app (through create_app, as
+wsgi.py does) on its own port against one shared SQLite file, then runs
+client threads that log in once and loop booking flows through the JSON
+API, spreading requests across the workers. Each check-out leaves the
+room Dirty, so the flow then cleans, inspects and releases that turnover
+through the housekeeping API, as a housekeeper would; otherwise every
+later check-in of the room would be refused. Reports throughput,
+p50/p95/p99 latency per step and the rate of 503 "database is busy"
+responses, which is what a request sees when SQLite stays locked past
+the busy timeout and the transaction retries.
+
+Login rate limits are lifted in the workers, since every client connects
+from 127.0.0.1.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --workers 8 --clients 64 --seconds 60
+"""
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+STEPS = ("login", "book", "check-in", "check-out", "turnover")
+TURNOVER_ACTIONS = {  # housekeeping API calls left to release a task, by its status
+    "Dirty": ("start", "inspect", "release"),
+    "Cleaning": ("inspect", "release"),
+    "Inspected": ("release",),
+}
+
+
+def serve(database, port):
+    """Worker process: serve the app on port until terminated"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    os.environ["HOTEL_DATABASE"] = database
+    app = hotel.create_app()
+    hotel.login_ip_limiter = hotel.TokenBucketLimiter(float("inf"), float("inf"))
+    hotel.login_user_limiter = hotel.TokenBucketLimiter(float("inf"), float("inf"))
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"worker on port {port} did not start")
+
+
+def seed(database, rooms, clients):
+    hotel.DATABASE = database
+    hotel.init_db()
+    conn = hotel.get_db()
+    conn.executemany(
+        "INSERT OR IGNORE INTO rooms (room_number) VALUES (?)",
+        [(f"L{i:04d}",) for i in range(rooms)],
+    )
+    password = hotel.hash_password("load-test")
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+        [(f"load{i}", password) for i in range(clients)],
+    )
+    conn.commit()
+    hotel.reconcile_room_state(conn)
+    room_ids = [row[0] for row in conn.execute("SELECT id FROM rooms")]
+    conn.close()
+    return room_ids
+
+
+class Client:
+    """Minimal HTTP client that keeps the session cookie"""
+
+    def __init__(self, ports):
+        self.ports = ports
+        self.cookie = None
+        self.requests = 0
+
+    def request(self, method, path, body=None, form=False):
+        port = self.ports[self.requests % len(self.ports)]
+        self.requests += 1
+        headers = {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if body is not None:
+            if form:
+                body = "&".join(f"{k}={v}" for k, v in body.items())
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            else:
+                body = json.dumps(body)
+                headers["Content-Type"] = "application/json"
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            cookie = response.getheader("Set-Cookie")
+            if cookie and cookie.startswith("session="):
+                self.cookie = cookie.split(";", 1)[0]
+            return response.status, data
+        finally:
+            conn.close()
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {step: [] for step in STEPS}
+        self.statuses = {step: {} for step in STEPS}
+        self.flows = 0
+
+    def add(self, step, status, elapsed):
+        with self.lock:
+            self.latency[step].append(elapsed)
+            self.statuses[step][status] = self.statuses[step].get(status, 0) + 1
+
+
+def timed(results, step, fn, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        status, data = fn(*args, **kwargs)
+    except OSError:
+        status, data = "conn-error", b""
+    results.add(step, status, time.perf_counter() - start)
+    return status, data
+
+
+def release_turnover(client, results, room_id):
+    """Clean, inspect and release the room's open turnover; False if a step failed"""
+    status, data = timed(results, "turnover", client.request, "GET", "/api/v1/housekeeping")
+    if status != 200:
+        return False
+    for task in json.loads(data)["tasks"]:
+        if task["room_id"] != room_id:
+            continue
+        for action in TURNOVER_ACTIONS[task["status"]]:
+            status, _ = timed(results, "turnover", client.request, "POST",
+                              f"/api/v1/housekeeping/{task['id']}/{action}")
+            if status != 200:
+                return False
+    return True
+
+
+def client_loop(n, ports, room_ids, deadline, results, seed):
+    rng = random.Random(seed + n)
+    client = Client(ports)
+    status, _ = timed(results, "login", client.request, "POST", "/",
+                      {"username": f"load{n}", "password": "load-test"}, form=True)
+    if status != 302:
+        return
+    while time.monotonic() < deadline:
+        check_in = date.today() + timedelta(days=rng.randint(0, 365))
+        room_id = rng.choice(room_ids)
+        status, data = timed(results, "book", client.request, "POST", "/api/v1/bookings", {
+            "guest_name": f"Load {n}",
+            "room_id": room_id,
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=rng.randint(1, 3))).isoformat(),
+        })
+        if status != 201:
+            continue
+        booking_id = json.loads(data)["booking"]["id"]
+        for step in ("check-in", "check-out"):
+            path = f"/api/v1/bookings/{booking_id}/{step.replace('-', '')}"
+            status, _ = timed(results, step, client.request, "POST", path)
+            if status != 200:
+                break
+        else:
+            if not release_turnover(client, results, room_id):
+                continue
+            with results.lock:
+                results.flows += 1
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def report(results, elapsed):
+    print(f"{'step':<10} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'busy':>7}  statuses")
+    total = busy = 0
+    for step in STEPS:
+        samples = sorted(results.latency[step])
+        statuses = results.statuses[step]
+        count = len(samples)
+        step_busy = statuses.get(503, 0)
+        total += count
+        busy += step_busy
+        print(f"{step:<10} {count:>8} {count / elapsed:>8.1f} "
+              f"{percentile(samples, 0.50) * 1000:>8.1f} {percentile(samples, 0.95) * 1000:>8.1f} "
+              f"{percentile(samples, 0.99) * 1000:>8.1f} {step_busy / max(count, 1):>7.2%}  "
+              f"{dict(sorted(statuses.items(), key=str))}")
+    print(f"completed flows: {results.flows} ({results.flows / elapsed:.1f}/s), "
+          f"{total / elapsed:.1f} req/s, database busy rate {busy / max(total, 1):.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8600, help="first worker port")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix="hotel-load-"), "hotel.db")
+    room_ids = seed(database, args.rooms, args.clients)
+    ports = [args.port + i for i in range(args.workers)]
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=serve, args=(database, port), daemon=True) for port in ports]
+    for worker in workers:
+        worker.start()
+    try:
+        for port in ports:
+            wait_for_port(port)
+        print(f"database: {database}  workers: {args.workers}  clients: {args.clients}  rooms: {len(room_ids)}")
+
+        results = Results()
+        deadline = time.monotonic() + args.seconds
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=client_loop, args=(n, ports, room_ids, deadline, results, args.seed))
+            for n in range(args.clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        report(results, time.perf_counter() - start)
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
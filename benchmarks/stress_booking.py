@@ -0,0 +1,160 @@
+"""Concurrent booking stress test.
+
+Fires concurrent bookings at a single room from many threads, each with
+its own connection, against a throwaway database:
+
+1. race:       every thread books the same dates at once; exactly one
+               booking may succeed.
+2. throughput: threads book random short stays and check them out again
+               for a fixed duration; reports bookings/sec per second so
+               lock contention shows up as unstable throughput.
+
+Afterwards it asserts that no two bookings of the room that were active
+at the same time overlap and that every booking has its audit row.
+Exits non-zero if any assertion fails.
+
+    python benchmarks/stress_booking.py --threads 200 --duration 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+def race(room_id, threads):
+    barrier = threading.Barrier(threads)
+    check_in = (date.today() + timedelta(days=1)).isoformat()
+    check_out = (date.today() + timedelta(days=3)).isoformat()
+    results = Counter()
+    lock = threading.Lock()
+
+    def worker(n):
+        conn = hotel.get_db()
+        barrier.wait()
+        try:
+            hotel.create_booking(conn, f"Race {n}", room_id, check_in, check_out, "stress")
+            outcome = "booked"
+        except hotel.BookingError:
+            outcome = "rejected"
+        except sqlite3.OperationalError:
+            outcome = "busy"
+        finally:
+            conn.close()
+        with lock:
+            results[outcome] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return results
+
+
+def throughput(room_id, threads, duration, seed):
+    stop = time.monotonic() + duration
+    start = time.monotonic()
+    per_second = Counter()
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        conn = hotel.get_db()
+        while time.monotonic() < stop:
+            check_in = date.today() + timedelta(days=rng.randint(0, 30))
+            check_out = check_in + timedelta(days=rng.randint(1, 3))
+            try:
+                _, booking_id = hotel.create_booking(
+                    conn, f"Guest {n}", room_id, check_in.isoformat(), check_out.isoformat(), "stress"
+                )
+                hotel.check_out_booking(conn, booking_id, "stress")
+                outcome = "booked"
+            except hotel.BookingError:
+                outcome = "rejected"
+            except sqlite3.OperationalError:
+                outcome = "busy"
+            with lock:
+                outcomes[outcome] += 1
+                if outcome == "booked":
+                    per_second[int(time.monotonic() - start)] += 1
+        conn.close()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return outcomes, [per_second[s] for s in range(int(duration))]
+
+
+def check_invariants(conn, room_id):
+    failures = []
+    # Only the race phase leaves bookings active; any two of those must not overlap
+    overlaps = conn.execute("""
+        SELECT COUNT(*) FROM bookings a
+        JOIN bookings b ON a.room_id = b.room_id AND a.id < b.id
+        WHERE a.room_id = ?
+        AND a.status IN ('Booked', 'Checked In')
+        AND b.status IN ('Booked', 'Checked In')
+        AND a.check_in < b.check_out AND a.check_out > b.check_in
+    """, (room_id,)).fetchone()[0]
+    if overlaps:
+        failures.append(f"{overlaps} overlapping active bookings")
+
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    created = conn.execute(
+        "SELECT COUNT(*) FROM activity_logs WHERE action = 'Booking Created'"
+    ).fetchone()[0]
+    if bookings != created:
+        failures.append(f"{bookings} bookings but {created} 'Booking Created' log rows")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    hotel.DATABASE = os.path.join(tempfile.mkdtemp(prefix="hotel-stress-"), "hotel.db")
+    hotel.init_db()
+    conn = hotel.get_db()
+    room_id = conn.execute("SELECT id FROM rooms ORDER BY room_number LIMIT 1").fetchone()[0]
+
+    results = race(room_id, args.threads)
+    print(f"race:       {args.threads} threads -> {dict(results)}")
+    failures = []
+    if results["booked"] != 1:
+        failures.append(f"race produced {results['booked']} bookings, expected 1")
+
+    # Free the room again before the throughput phase
+    for (booking_id,) in conn.execute("SELECT id FROM bookings WHERE status = 'Booked'").fetchall():
+        hotel.check_out_booking(conn, booking_id, "stress")
+
+    outcomes, per_second = throughput(room_id, args.threads, args.duration, args.seed)
+    print(f"throughput: {dict(outcomes)}")
+    print(f"            bookings/sec by second: {per_second}")
+
+    failures += check_invariants(conn, room_id)
+    conn.close()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hotel  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A new, migrated SQLite database for the test; hotel.db is never touched"""
+    monkeypatch.setattr(hotel, "DATABASE", str(tmp_path / "hotel.db"))
+    # A check-out wakes the scheduler, which would start its thread; that
+    # thread outlives the test and would open the restored hotel.db
+    monkeypatch.setattr(hotel.housekeeping_scheduler, "start", lambda: None)
+    hotel.init_db()
+    hotel.invalidate_dashboard_cache()
+    hotel._fragment_cache.clear()
+    return hotel.DATABASE
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    """A test client logged in as the default admin"""
+    # Every test logs in as admin from 127.0.0.1; start from full buckets
+    monkeypatch.setattr(hotel, "login_ip_limiter",
+                        hotel.TokenBucketLimiter(hotel.LOGIN_IP_BURST, hotel.LOGIN_IP_REFILL))
+    monkeypatch.setattr(hotel, "login_user_limiter",
+                        hotel.TokenBucketLimiter(hotel.LOGIN_USER_BURST, hotel.LOGIN_USER_REFILL))
+    client = hotel.app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+    return client
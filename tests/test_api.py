@@ -0,0 +1,92 @@
+import csv
+from datetime import date, timedelta
+
+import app as hotel
+
+
+def book(client, days_ahead=10, room_type="Standard"):
+    check_in = date.today() + timedelta(days=days_ahead)
+    response = client.post("/api/v1/bookings", json={
+        "guest_name": "Ada Guest",
+        "room_type": room_type,
+        "check_in": check_in.isoformat(),
+        "check_out": (check_in + timedelta(days=2)).isoformat(),
+    })
+    assert response.status_code == 201
+    return response.get_json()["booking"]["id"]
+
+
+def test_etag_uses_local_date(client):
+    response = client.get("/api/v1/rooms")
+    assert response.status_code == 200
+    assert response.headers["ETag"].strip('"').endswith(date.today().isoformat())
+
+
+def test_unchanged_booking_is_304_without_reading_it(client, monkeypatch):
+    booking_id = book(client)
+    etag = client.get(f"/api/v1/bookings/{booking_id}").headers["ETag"]
+
+    def unexpected(*args):
+        raise AssertionError("booking read for a conditional request")
+
+    monkeypatch.setattr(hotel.SQLiteRepository, "get_booking", unexpected)
+    response = client.get(f"/api/v1/bookings/{booking_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_missing_booking_is_404(client):
+    response = client.get("/api/v1/bookings/9999")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_page_limit_is_clamped(client):
+    book(client, 10)
+    book(client, 20)
+    for limit in (0, -1):
+        response = client.get(f"/api/v1/bookings?status=Booked&limit={limit}")
+        assert response.status_code == 200
+        assert len(response.get_json()["bookings"]) == 1
+        assert response.get_json()["next_before"] is not None
+
+
+def test_create_booking_rejects_malformed_json(client):
+    response = client.post("/api/v1/bookings", json=["a"])
+    assert response.status_code == 400
+
+    response = client.post("/api/v1/bookings", json={
+        "guest_name": "Ada Guest", "room_type": "Standard", "check_in": 20300101, "check_out": 20300102,
+    })
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid date format"
+
+    response = client.post("/api/v1/bookings", json={
+        "guest_name": "Ada Guest", "room_id": [1], "check_in": "2030-01-01", "check_out": "2030-01-02",
+    })
+    assert response.status_code == 400
+
+
+def test_import_rejects_a_body_that_is_not_utf8(client):
+    body = "guest_name,room_number,check_in,check_out\nJos\xe9,101,2030-01-01,2030-01-02\n".encode("latin-1")
+    response = client.post("/api/v1/bookings/import?format=csv", data=body, content_type="text/csv")
+    assert response.status_code == 400
+    assert "UTF-8" in response.get_json()["error"]
+
+
+def test_import_rejects_unreadable_csv(client):
+    oversized = "x" * (csv.field_size_limit() + 1)
+    body = f'guest_name,room_number,check_in,check_out\n"{oversized}",101,2030-01-01,2030-01-02\n'.encode()
+    response = client.post("/api/v1/bookings/import?format=csv", data=body, content_type="text/csv")
+    assert response.status_code == 400
+
+
+def test_set_rates_rejects_bad_bodies(client):
+    stay = {"room_type": "Standard", "start": "2030-01-01", "end": "2030-01-31"}
+    for body in ([stay], {**stay, "rate": "nan"}, {**stay, "rate": "inf"},
+                 {**stay, "end": "2045-01-01", "rate": 120}):
+        assert client.put("/api/v1/rates", json=body).status_code == 400
+
+    response = client.put("/api/v1/rates", json={**stay, "rate": 120})
+    assert response.status_code == 200
+    rates = client.get("/api/v1/rates?room_type=Standard&start=2030-01-01&end=2030-12-31").get_json()["rates"]
+    assert len(rates) == 31
@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import app as hotel
+
+
+@pytest.fixture
+def backups(database, tmp_path, monkeypatch):
+    """Snapshots go to a directory of the test's own"""
+    monkeypatch.setitem(hotel.app.config, "BACKUP_DIR", str(tmp_path / "backups"))
+    return hotel.backup_dir()
+
+
+def _guests():
+    conn = hotel.get_db()
+    try:
+        return [row[0] for row in conn.execute("SELECT guest_name FROM bookings ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_snapshot_and_restore(backups):
+    conn = hotel.get_db()
+    hotel.create_booking(conn, "Ada", 1, "2030-01-01", "2030-01-03", "admin")
+    conn.close()
+    manifest = hotel.create_snapshot()
+    assert manifest["schema_version"] == hotel.SCHEMA_VERSION
+    assert [m["snapshot"] for m in hotel.list_snapshots()] == [manifest["snapshot"]]
+
+    conn = hotel.get_db()
+    hotel.create_booking(conn, "Grace", 2, "2030-01-01", "2030-01-03", "admin")
+    conn.close()
+    assert _guests() == ["Ada", "Grace"]
+
+    restored, kept = hotel.restore_snapshot("latest")
+    assert restored["snapshot"] == manifest["snapshot"]
+    assert _guests() == ["Ada"]
+    # The replaced database is kept beside it
+    assert os.path.exists(kept)
+
+
+def test_restore_rejects_checksum_mismatch(backups):
+    manifest = hotel.create_snapshot()
+    conn = hotel.get_db()
+    hotel.create_booking(conn, "Ada", 1, "2030-01-01", "2030-01-03", "admin")
+    conn.close()
+
+    # Same length, one byte changed: still valid gzip, wrong contents
+    archive = os.path.join(backups, manifest["snapshot"])
+    with gzip.open(archive, "rb") as f:
+        data = bytearray(f.read())
+    data[-1] ^= 0xFF
+    with gzip.open(archive, "wb") as f:
+        f.write(data)
+
+    with pytest.raises(hotel.SnapshotError, match="checksum"):
+        hotel.restore_snapshot(manifest["snapshot"])
+    # The live database is untouched and nothing is left behind
+    assert _guests() == ["Ada"]
+    assert not os.path.exists(f"{hotel.DATABASE}.restore.tmp")
+
+
+def test_restore_rejects_a_tampered_manifest(backups):
+    manifest = hotel.create_snapshot()
+    path = os.path.join(backups, manifest["snapshot"][:-len(hotel.SNAPSHOT_SUFFIX)] + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, sha256="0" * 64), f)
+
+    with pytest.raises(hotel.SnapshotError, match="checksum"):
+        hotel.restore_snapshot("latest")
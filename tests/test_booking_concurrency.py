@@ -0,0 +1,82 @@
+"""Concurrent create_booking() calls for one room and the same nights.
+
+Threads in this process and in several spawned processes, each with its
+own connection, are released together by a barrier. Exactly one booking
+may commit, and it must have exactly one activity log row.
+"""
+import multiprocessing
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import app as hotel
+
+
+def race(database, room_id, check_in, check_out, threads, barrier, results):
+    """Book the same stay from `threads` threads; puts one outcome per thread in results"""
+    hotel.DATABASE = database
+
+    def worker(n):
+        conn = hotel.get_db()
+        try:
+            barrier.wait()
+            hotel.create_booking(conn, f"Racer {n}", room_id, check_in, check_out, "racer")
+            outcome = "booked"
+        except hotel.BookingError:
+            outcome = "rejected"
+        except sqlite3.OperationalError as e:
+            outcome = f"error: {e}"
+        finally:
+            conn.close()
+        results.put(outcome)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+@pytest.mark.parametrize("processes, threads", [(0, 32), (6, 4)], ids=["threads", "processes"])
+def test_only_one_concurrent_booking_commits(database, processes, threads):
+    conn = hotel.get_db()
+    room_id = conn.execute("SELECT id FROM rooms ORDER BY room_number LIMIT 1").fetchone()[0]
+    check_in = (date.today() + timedelta(days=1)).isoformat()
+    check_out = (date.today() + timedelta(days=3)).isoformat()
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes * threads + threads)
+    results = ctx.Queue()
+    children = [
+        ctx.Process(target=race, args=(database, room_id, check_in, check_out, threads, barrier, results))
+        for _ in range(processes)
+    ]
+    for child in children:
+        child.start()
+    race(database, room_id, check_in, check_out, threads, barrier, results)
+    for child in children:
+        child.join(timeout=60)
+        assert child.exitcode == 0
+    outcomes = [results.get(timeout=10) for _ in range((processes + 1) * threads)]
+
+    assert outcomes.count("booked") == 1
+    assert outcomes.count("rejected") == len(outcomes) - 1
+
+    overlaps = conn.execute("""
+        SELECT COUNT(*) FROM bookings a
+        JOIN bookings b ON a.room_id = b.room_id AND a.id < b.id
+        WHERE a.status IN ('Booked', 'Checked In') AND b.status IN ('Booked', 'Checked In')
+        AND a.check_in < b.check_out AND a.check_out > b.check_in
+    """).fetchone()[0]
+    assert overlaps == 0
+
+    bookings = conn.execute("SELECT guest_name FROM bookings").fetchall()
+    assert len(bookings) == 1
+    logs = conn.execute(
+        "SELECT details FROM activity_logs WHERE action = 'Booking Created'"
+    ).fetchall()
+    assert len(logs) == 1
+    assert f"booked for {bookings[0]['guest_name']} " in logs[0]["details"]
+    conn.close()
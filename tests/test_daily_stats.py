@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+import app as hotel
+
+
+def daily_stats(conn):
+    """Days with anything counted; releasing nights leaves zeroed rows behind"""
+    return [tuple(row) for row in conn.execute("""
+        SELECT date, rooms_sold, revenue, arrivals, departures FROM daily_stats
+        WHERE rooms_sold OR arrivals OR departures
+        ORDER BY date
+    """)]
+
+
+def test_live_stats_match_a_rebuild(database):
+    conn = hotel.get_db()
+    rooms = [row[0] for row in conn.execute("SELECT id FROM rooms ORDER BY room_number LIMIT 3")]
+    today = date.today()
+    tomorrow = (today + timedelta(days=1)).isoformat()
+    _, stayed = hotel.create_booking(conn, "Stayed", rooms[0], today.isoformat(), tomorrow, "clerk")
+    _, cancelled = hotel.create_booking(conn, "Cancelled", rooms[1], today.isoformat(), tomorrow, "clerk")
+    _, later = hotel.create_booking(conn, "Later", rooms[2], tomorrow,
+                                    (today + timedelta(days=3)).isoformat(), "clerk")
+    hotel.check_in_booking(conn, stayed, "clerk")
+    hotel.check_out_booking(conn, stayed, "clerk")
+    hotel.check_out_booking(conn, cancelled, "clerk")  # cancelled before arriving
+    hotel.check_out_booking(conn, later, "clerk")
+
+    live = daily_stats(conn)
+    assert [(row[0], row[3], row[4]) for row in live] == [(today.isoformat(), 1, 1)]
+    hotel.run_transaction(conn, hotel.rebuild_daily_stats)
+    assert daily_stats(conn) == live
+    conn.close()
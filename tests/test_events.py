@@ -0,0 +1,44 @@
+import sqlite3
+from datetime import date, timedelta
+
+import app as hotel
+
+
+def drain(stream):
+    """Messages up to and including the next keep-alive"""
+    messages = []
+    while not messages or messages[-1] != ": keepalive\n\n":
+        messages.append(next(stream))
+    return messages
+
+
+def test_stream_reloads_after_another_process_commits(database, monkeypatch):
+    monkeypatch.setattr(hotel, "EVENT_KEEPALIVE", 0.01)
+    broker = hotel.EventBroker()
+    monkeypatch.setattr(hotel, "events", broker)
+    watcher = hotel._connect()
+    stream = broker.stream(broker.subscribe(), hotel.SQLiteRepository(watcher).data_version)
+    assert next(stream) == "retry: 3000\n\n"
+    assert drain(stream) == [": keepalive\n\n"]
+
+    # A booking made by this process arrives as events, not as a reload
+    conn = hotel.get_db()
+    room_id = conn.execute("SELECT id FROM rooms LIMIT 1").fetchone()[0]
+    check_in = date.today() + timedelta(days=3)
+    check_out = check_in + timedelta(days=1)
+    hotel.create_booking(conn, "Ada", room_id, check_in.isoformat(), check_out.isoformat(), "clerk")
+    conn.close()
+    messages = drain(stream)
+    assert any(m.startswith("event: booking") for m in messages)
+    assert not any(m.startswith("event: reload") for m in messages)
+
+    # Another worker process writes straight to the file
+    other = sqlite3.connect(database)
+    other.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+    other.commit()
+    other.close()
+    assert drain(stream)[0] == "event: reload\ndata: {}\n\n"
+    assert drain(stream) == [": keepalive\n\n"]
+
+    stream.close()
+    watcher.close()
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import pytest
+
+import app as hotel
+
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def _check_out_room(conn, room_id):
+    """Put a guest through room_id today, leaving it Dirty"""
+    _, booking_id = hotel.create_booking(conn, "Departed", room_id, _day(0), _day(1), "clerk")
+    hotel.check_in_booking(conn, booking_id, "clerk")
+    hotel.check_out_booking(conn, booking_id, "clerk")
+
+
+def test_walk_ins_get_clean_rooms_first(database):
+    conn = hotel.get_db()
+    rooms = {row["room_number"]: row["id"] for row in conn.execute("SELECT id, room_number FROM rooms")}
+    _check_out_room(conn, rooms["101"])
+
+    # Cleaning only matters for today: a later stay still gets the best fit
+    assert hotel.best_fit_room(conn, "Standard", _day(7), _day(8))["room_number"] == "101"
+
+    room, booking_id = hotel.book_room_type(conn, "Walk-in", "Standard", _day(0), _day(1), "clerk")
+    assert room["room_number"] != "101"
+    hotel.check_in_booking(conn, booking_id, "clerk")
+
+    # With every clean room taken, the room being turned over is still sold
+    for number, room_id in rooms.items():
+        if number != "101" and number != room["room_number"]:
+            hotel.create_booking(conn, "Filler", room_id, _day(0), _day(1), "clerk")
+    room, _ = hotel.book_room_type(conn, "Late", "Standard", _day(0), _day(1), "clerk")
+    assert room["room_number"] == "101"
+    conn.close()
+
+
+def test_turnover_lifecycle_gates_check_in(database):
+    conn = hotel.get_db()
+    room_id = conn.execute("SELECT id FROM rooms WHERE room_number = '101'").fetchone()[0]
+    _check_out_room(conn, room_id)
+    # The room is sold again for tonight while it is still being turned over
+    _, next_guest = hotel.create_booking(conn, "Arriving", room_id, _day(0), _day(1), "clerk")
+    task_id = conn.execute(
+        "SELECT id FROM housekeeping_tasks WHERE room_id = ? AND status != 'Available'", (room_id,)
+    ).fetchone()[0]
+
+    def status():
+        task = conn.execute("SELECT status FROM housekeeping_tasks WHERE id = ?", (task_id,)).fetchone()[0]
+        room = conn.execute("SELECT status FROM room_state WHERE room_id = ?", (room_id,)).fetchone()[0]
+        return task, room
+
+    assert status() == ("Dirty", "Dirty")
+    # Once released the room shows tonight's arrival
+    steps = (("start", "Cleaning", "Cleaning"), ("inspect", "Inspected", "Inspected"), ("release", "Available", "Booked"))
+    for action, task_status, room_status in steps:
+        with pytest.raises(hotel.BookingError, match="not ready"):
+            hotel.check_in_booking(conn, next_guest, "clerk")
+        # Steps can't be skipped
+        if action != "release":
+            with pytest.raises(hotel.BookingError):
+                hotel.advance_turnover(conn, task_id, "release", "clerk")
+        hotel.advance_turnover(conn, task_id, action, "clerk")
+        assert status() == (task_status, room_status)
+    with pytest.raises(hotel.BookingError):
+        hotel.advance_turnover(conn, task_id, "start", "clerk")
+
+    hotel.check_in_booking(conn, next_guest, "clerk")
+    assert status() == ("Available", "Occupied")
+    conn.close()
@@ -0,0 +1,55 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from html import unescape
+
+import app as hotel
+
+
+OLD_LOGS = 250  # more than two pages of LOGS_PAGE_SIZE
+
+
+def _insert_old_logs(conn):
+    """OLD_LOGS rows spread over the three days a year ago"""
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    conn.executemany(
+        "INSERT INTO activity_logs (action, details, user, timestamp) VALUES ('System', ?, 'admin', ?)",
+        [(f"old entry {i:03d}", (start + timedelta(minutes=20 * i)).strftime("%Y-%m-%d %H:%M:%S"))
+         for i in range(OLD_LOGS)]
+    )
+    conn.commit()
+
+
+def _old_entries(client, url):
+    """Details of the archived entries on every page from url on, in order"""
+    seen = []
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen.extend(re.findall(r"old entry \d{3}", html))
+        older = re.search(r'href="([^"]*cursor=[^"]*)"', html)
+        url = unescape(older.group(1)) if older else None
+    return seen
+
+
+def test_archived_logs_page_after_the_table(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(hotel.app.config, "LOG_ARCHIVE_DIR", str(tmp_path / "archive"))
+    conn = hotel.get_db()
+    _insert_old_logs(conn)
+
+    archived = hotel.archive_activity_logs(conn, retention_days=90, batch_size=50)
+    assert archived["rows"] == OLD_LOGS and archived["days"] >= 3
+    assert conn.execute("SELECT COUNT(*) FROM activity_logs WHERE details LIKE 'old entry %'").fetchone()[0] == 0
+    assert len(os.listdir(hotel.log_archive_dir())) == archived["days"]
+    # Nothing is left to archive
+    assert hotel.archive_activity_logs(conn, retention_days=90) == {"days": 0, "rows": 0}
+    conn.close()
+
+    # The table alone no longer has them
+    assert _old_entries(client, "/logs") == []
+
+    # With archived=1 the pages run on into the archive, newest first,
+    # with every row exactly once
+    expected = [f"old entry {i:03d}" for i in reversed(range(OLD_LOGS))]
+    assert _old_entries(client, "/logs?archived=1") == expected
+    assert _old_entries(client, "/logs?archived=1&action=System") == expected
+    assert _old_entries(client, "/logs?archived=1&action=Login") == []
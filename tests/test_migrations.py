@@ -0,0 +1,90 @@
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import app as hotel
+
+
+def _create_version_0(path):
+    """The schema the app created before migrations, with a plain-text password"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_number TEXT UNIQUE NOT NULL,
+            status TEXT DEFAULT 'Available',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guest_name TEXT NOT NULL,
+            room_id INTEGER NOT NULL,
+            check_in DATE NOT NULL,
+            check_out DATE NOT NULL,
+            status TEXT DEFAULT 'Booked',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (room_id) REFERENCES rooms(id)
+        );
+        CREATE TABLE activity_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            details TEXT,
+            user TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO users (username, password) VALUES ('admin', 'admin123');
+        INSERT INTO rooms (room_number) VALUES ('101'), ('102');
+    """)
+    today = date.today()
+    conn.execute(
+        "INSERT INTO bookings (guest_name, room_id, check_in, check_out, status) VALUES (?, 1, ?, ?, 'Checked In')",
+        ("Ada", (today - timedelta(days=1)).isoformat(), (today + timedelta(days=1)).isoformat())
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_version_0_database_is_upgraded(tmp_path, monkeypatch):
+    path = str(tmp_path / "hotel.db")
+    monkeypatch.setattr(hotel, "DATABASE", path)
+    _create_version_0(path)
+
+    hotel.init_db()
+
+    conn = hotel.get_db()
+    try:
+        assert hotel.get_schema_version(conn) == hotel.SCHEMA_VERSION
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"room_state", "rates", "housekeeping_tasks", "room_types", "room_type_nights"} <= tables
+
+        # Existing rows survive and the new tables are filled from them
+        password = conn.execute("SELECT password FROM users WHERE username = 'admin'").fetchone()[0]
+        assert hotel.is_password_hash(password) and hotel.verify_password(password, "admin123")
+        assert conn.execute("SELECT room_type FROM rooms WHERE id = 1").fetchone()[0] == "Standard"
+        state = conn.execute("SELECT status, guest_name FROM room_state WHERE room_id = 1").fetchone()
+        assert (state["status"], state["guest_name"]) == ("Occupied", "Ada")
+        assert conn.execute(
+            "SELECT rooms_sold FROM room_type_nights WHERE room_type = 'Standard' AND night = ?",
+            (date.today().isoformat(),)
+        ).fetchone()[0] == 1
+
+        # A current schema is left alone
+        assert hotel.migrate_db(conn) == (hotel.SCHEMA_VERSION, hotel.SCHEMA_VERSION)
+    finally:
+        conn.close()
+
+    # The version-0 file was backed up before the first step ran
+    backups = [name for name in os.listdir(tmp_path) if name.startswith("hotel.db.v0-")]
+    assert len(backups) == 1
+    backup = sqlite3.connect(str(tmp_path / backups[0]))
+    try:
+        assert hotel.get_schema_version(backup) == 0
+        assert backup.execute("SELECT password FROM users").fetchone()[0] == "admin123"
+    finally:
+        backup.close()
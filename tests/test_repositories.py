@@ -0,0 +1,127 @@
+"""Booking rules shared by SQLiteRepository and PostgresRepository
+
+The PostgreSQL cases run against TEST_POSTGRES_DSN when it is set (a
+scratch database: its public schema is dropped before each test), or else
+against a throwaway cluster started with initdb and pg_ctl from PATH. They
+are skipped when psycopg is not installed, no server binaries are found,
+or the tests run as root, which PostgreSQL refuses.
+"""
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+from datetime import date, timedelta
+
+import pytest
+
+import app as hotel
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def postgres_dsn(tmp_path_factory):
+    """DSN of a PostgreSQL database the tests may wipe"""
+    if hotel.psycopg is None:
+        pytest.skip('needs pip install "psycopg[binary]" psycopg_pool')
+    if os.environ.get("TEST_POSTGRES_DSN"):
+        yield os.environ["TEST_POSTGRES_DSN"]
+        return
+    if not (shutil.which("initdb") and shutil.which("pg_ctl")):
+        pytest.skip("set TEST_POSTGRES_DSN or put initdb and pg_ctl on PATH")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        pytest.skip("PostgreSQL will not run as root; set TEST_POSTGRES_DSN")
+
+    base = tmp_path_factory.mktemp("pg")
+    data, port = base / "data", _free_port()
+    subprocess.run(["initdb", "-D", str(data), "-A", "trust", "-U", "postgres",
+                    "-E", "UTF8", "--no-locale"], check=True, capture_output=True)
+    subprocess.run(["pg_ctl", "-D", str(data), "-l", str(base / "server.log"), "-w", "start",
+                    "-o", f"-k {base} -c listen_addresses='' -p {port}"],
+                   check=True, capture_output=True)
+    try:
+        yield f"host={base} port={port} user=postgres dbname=postgres"
+    finally:
+        for pool in hotel._pg_pools.values():
+            pool.close()
+        hotel._pg_pools.clear()
+        subprocess.run(["pg_ctl", "-D", str(data), "-m", "fast", "-w", "stop"], capture_output=True)
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def repo(request):
+    """A repository over a freshly created database with the seed rooms"""
+    if request.param == "sqlite":
+        request.getfixturevalue("database")
+        conn = hotel.get_db()
+        yield hotel.SQLiteRepository(conn)
+        conn.close()
+        return
+    dsn = request.getfixturevalue("postgres_dsn")
+    with hotel.psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute("DROP SCHEMA IF EXISTS public CASCADE")
+        conn.execute("CREATE SCHEMA public")
+    repo = hotel.PostgresRepository(dsn, 2)
+    repo.create_schema()
+    yield repo
+
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def test_book_and_conflict(repo):
+    room_id = repo.rooms_overview()[0]["id"]
+    room, booking_id = repo.create_booking("Ada", room_id, _day(0), _day(2), "admin")
+    assert room["id"] == room_id
+    assert repo.get_booking(booking_id)["status"] == "Booked"
+
+    with pytest.raises(hotel.BookingError):
+        repo.create_booking("Grace", room_id, _day(1), _day(3), "admin")
+    _, next_id = repo.create_booking("Grace", room_id, _day(2), _day(4), "admin")
+    assert next_id != booking_id
+    assert [b["guest_name"] for b in repo.active_bookings()] == ["Ada", "Grace"]
+
+
+def test_check_in_and_out(repo):
+    room_id = repo.rooms_overview()[0]["id"]
+    _, booking_id = repo.create_booking("Ada", room_id, _day(0), _day(1), "admin")
+
+    repo.check_in(booking_id, "admin")
+    assert repo.get_booking(booking_id)["status"] == "Checked In"
+    assert repo.rooms_overview(room_id)[0]["status"] == "Occupied"
+    with pytest.raises(hotel.BookingError):
+        repo.check_in(booking_id, "admin")
+
+    repo.check_out(booking_id, "admin")
+    assert repo.get_booking(booking_id)["status"] == "Completed"
+    with pytest.raises(hotel.BookingError):
+        repo.check_out(booking_id, "admin")
+
+
+def test_unknown_booking_and_room(repo):
+    with pytest.raises(hotel.BookingNotFound):
+        repo.check_in(999999, "admin")
+    with pytest.raises(hotel.BookingNotFound):
+        repo.create_booking("Ada", 999999, _day(0), _day(1), "admin")
+
+
+def test_sqlite_only_lock_errors_are_busy(database):
+    conn = hotel.get_db()
+    repo = hotel.SQLiteRepository(conn)
+
+    def fail(conn, message):
+        raise sqlite3.OperationalError(message)
+
+    try:
+        with pytest.raises(hotel.StorageBusy):
+            repo._write(fail, "database is locked")
+        with pytest.raises(sqlite3.OperationalError, match="no such table"):
+            repo._write(fail, "no such table: bookings")
+    finally:
+        conn.close()
@@ -0,0 +1,12 @@
+"""Production WSGI entry point.
+
+Serve with a multi-process WSGI server, for example:
+
+    export HOTEL_SECRET_KEY=... HOTEL_DATABASE=/srv/hotel/hotel.db
+    gunicorn --workers 4 --threads 16 wsgi:app
+
+Each open dashboard holds one thread for its /events stream.
+"""
+from app import ProductionConfig, create_app
+
+app = create_app(ProductionConfig)